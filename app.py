@@ -1,5 +1,30 @@
-from flask import Flask, render_template, request, session, redirect, url_for, flash
+from flask import (
+    Flask,
+    render_template,
+    request,
+    session,
+    redirect,
+    url_for,
+    flash,
+    jsonify,
+    make_response,
+    g,
+    Response,
+    send_file,
+    send_from_directory,
+    stream_with_context,
+    get_flashed_messages,
+    has_request_context,
+)
+from markupsafe import Markup
+import click
 from datetime import date, timedelta
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
 from models import (
     Biblioteca,
     Estudiante,
@@ -9,17 +34,51 @@ from models import (
     Revista,
     Tesis,
     MaterialDigital,
+    MaterialBibliografico,
+    Usuario,
+    Ejemplar,
+    EstadoPrestamo,
     Prestamo,
     PrestamoActivo,
     PrestamoVencido,
     PrestamoDevuelto,
     Resena,
 )
+from estado_compartido import EstadoCompartido
+from notificaciones import (
+    DespachadorNotificaciones,
+    Notificacion,
+    TransporteArchivo,
+    TransporteSMTP,
+)
+from recordatorios import DIAS_AVISO, enviar_recordatorios
+from recomendaciones import (
+    FiltroColaborativo,
+    Recomendador,
+    construir_artefactos,
+    cargar_artefactos,
+    guardar_artefactos,
+    mezclar_recomendaciones,
+    suma_verificacion,
+)
+from cache import CacheLRU
+from contextlib import contextmanager
+from perfilado import AlmacenPerfiles, reporte_memoria
+from compresion import comprimir_respuesta
+from portadas import PREFIJO_URL, AlmacenPortadas
+import tracemalloc
+from metricas import (
+    BUSQUEDAS,
+    DURACION_ETAPAS,
+    LATENCIA_RUTAS,
+    PRESTAMOS,
+    REGISTRO,
+    RESERVAS,
+)
 import random
 
 # --- IMPORTACIONES PARA RECOMENDACIONES (ML / NLP) ---
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 
 # --- IMPORTACIONES PARA GRÁFICOS ---
 import io
@@ -52,7 +111,9 @@ app.secret_key = "mi_llave_secreta_super_dificil_12345"
 # --- INICIO: LÓGICA DE SIMULACIÓN DE TIEMPO ---
 # --------------------------------------------------------
 def get_fecha_actual():
-    offset_dias = session.get("time_offset", 0)
+    # Fuera de una petición (tareas en segundo plano, comandos) no hay fecha
+    # simulada de sesión: vale la fecha real.
+    offset_dias = session.get("time_offset", 0) if has_request_context() else 0
     return date.today() + timedelta(days=offset_dias)
 
 
@@ -166,8 +227,296 @@ p_hist2.cambiar_estado(PrestamoDevuelto(p_hist2))  # Cambiamos estado
 profesor.agregar_prestamo(p_hist2)  # Agregamos el OBJETO PRÉSTAMO
 # =======================
 
+# --- OPERACIONES DE ESCRITURA ---
+# Todo cambio de préstamos, stock, reservas, reseñas o inventario pasa por una
+# operación registrada aquí, con argumentos simples (ids, fechas, textos).
+# En modo multiproceso cada operación se publica y el resto de los workers la
+# reproduce sobre su propia copia, así que deben ser deterministas: nada de
+# fechas ni azar calculados dentro (los pasa la vista).
+OPERACIONES = {}
+
+
+def operacion(nombre):
+    def registrar(funcion):
+        OPERACIONES[nombre] = funcion
+        return funcion
+
+    return registrar
+
+
+@operacion("marcar_resena_util")
+def _op_marcar_resena_util(bib, usuario_id, material_id, indice):
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    material = bib.buscar_material_por_id(material_id)
+    resena = material.buscar_resena(indice) if material else None
+    if not usuario or not resena:
+        return False
+    return resena.marcar_util(usuario)
+
+
+@operacion("agregar_resena")
+def _op_agregar_resena(bib, usuario_id, material_id, calificacion, comentario, fecha):
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    material = bib.buscar_material_por_id(material_id)
+    material.agregar_resena(Resena(usuario, calificacion, comentario, fecha))
+
+
+def _vencer_atrasados(prestamos, fecha):
+    # Activo -> Vencido para los préstamos que ya pasaron su fecha límite.
+    # Solo lo hacen las operaciones de escritura y la tarea diaria: las vistas
+    # de lectura calculan el atraso sin tocar el estado compartido.
+    for p in list(prestamos):
+        p.marcar_vencido(fecha)
+
+
+@operacion("prestar")
+def _op_prestar(bib, usuario_id, material_id, fecha):
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    _vencer_atrasados(usuario.prestamos, fecha)
+    return bib.realizar_prestamo(
+        usuario,
+        bib.buscar_material_por_id(material_id),
+        fecha,
+    )
+
+
+@operacion("reservar")
+def _op_reservar(bib, usuario_id, material_id):
+    return bib.realizar_reserva(
+        bib.buscar_usuario_por_id(usuario_id),
+        bib.buscar_material_por_id(material_id),
+    )
+
+
+@operacion("entregar_reserva")
+def _op_entregar_reserva(bib, usuario_id, material_id, fecha):
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    _vencer_atrasados(usuario.prestamos, fecha)
+    return bib.entregar_reserva(
+        usuario,
+        bib.buscar_material_por_id(material_id),
+        fecha,
+    )
+
+
+@operacion("renovar")
+def _op_renovar(bib, usuario_id, prestamo_id, fecha):
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    _vencer_atrasados(usuario.prestamos, fecha)
+    prestamo = next((p for p in usuario.prestamos if p.id == prestamo_id), None)
+    if prestamo is None:
+        return None
+    return prestamo.realizar_renovacion(fecha)
+
+
+@operacion("pagar_multas")
+def _op_pagar_multas(bib, usuario_id, fecha):
+    # Devuelve (mensaje, id del usuario avisado, id del material) por cada
+    # préstamo vencido que liberó una reserva.
+    avisos = []
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    _vencer_atrasados(usuario.prestamos, fecha)
+    for p in list(usuario.prestamos):
+        if isinstance(p.estado, PrestamoVencido):
+            nuevo_estado = p.devolver(fecha)
+            if nuevo_estado and nuevo_estado.notificacion:
+                notificado = nuevo_estado.usuario_notificado
+                avisos.append(
+                    (
+                        nuevo_estado.notificacion,
+                        notificado.id if notificado else None,
+                        p.material.id,
+                    )
+                )
+    return avisos
+
+
+CLASES_POR_TIPO = {
+    "libro": Libro,
+    "revista": Revista,
+    "tesis": Tesis,
+    "digital": MaterialDigital,
+}
+
+
+@operacion("marcar_vencidos")
+def _op_marcar_vencidos(bib, pares, fecha):
+    # pares: [(usuario_id, prestamo_id)] que ya pasaron su fecha límite.
+    for usuario_id, prestamo_id in pares:
+        usuario = bib.buscar_usuario_por_id(usuario_id)
+        for p in usuario.prestamos:
+            if p.id == prestamo_id:
+                p.marcar_vencido(fecha)
+
+
+UBICACION_POR_DEFECTO = "Sala general"
+
+
+@operacion("agregar_material")
+def _op_agregar_material(
+    bib, tipo_material, campos, codigos=(), ubicacion=UBICACION_POR_DEFECTO
+):
+    # Los códigos de barras indicados se registran como ejemplares antes de
+    # catalogar; el catálogo solo genera códigos para las unidades que falten.
+    material = CLASES_POR_TIPO[tipo_material](**campos)
+    if not isinstance(material, MaterialDigital):
+        for codigo in dict.fromkeys(codigos):
+            if bib.buscar_ejemplar_por_codigo(codigo) is None:
+                material.agregar_ejemplar(codigo, ubicacion)
+    bib.agregar_material(material)
+    return material
+
+
+@operacion("registrar_ejemplar")
+def _op_registrar_ejemplar(bib, material_id, codigo_barras, ubicacion):
+    material = bib.buscar_material_por_id(material_id)
+    return bib.catalogo.registrar_ejemplar(material, codigo_barras, ubicacion)
+
+
+@operacion("retirar_material")
+def _op_retirar_material(bib, material_id):
+    return bib.retirar_material(material_id)
+
+
+def _resolver_lote(bib, ids_materiales, codigos):
+    solicitados = [(i, bib.buscar_material_por_id(i)) for i in ids_materiales]
+    solicitados += [(c, bib.buscar_ejemplar_por_codigo(c)) for c in codigos]
+    return solicitados
+
+
+def _alinear_lote(solicitados, resultados):
+    # Un resultado por clave pedida; None para las que no existen.
+    resultados = iter(resultados)
+    return [
+        (clave, next(resultados) if item is not None else None)
+        for clave, item in solicitados
+    ]
+
+
+@operacion("prestar_lote")
+def _op_prestar_lote(bib, usuario_id, ids_materiales, codigos, fecha):
+    solicitados = _resolver_lote(bib, ids_materiales, codigos)
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    _vencer_atrasados(usuario.prestamos, fecha)
+    resultados = bib.realizar_prestamos_lote(
+        usuario,
+        [item for _, item in solicitados if item],
+        fecha,
+    )
+    return _alinear_lote(solicitados, resultados)
+
+
+@operacion("devolver_lote")
+def _op_devolver_lote(bib, usuario_id, ids_materiales, codigos, fecha):
+    solicitados = _resolver_lote(bib, ids_materiales, codigos)
+    usuario = bib.buscar_usuario_por_id(usuario_id)
+    _vencer_atrasados(usuario.prestamos, fecha)
+    resultados = bib.realizar_devoluciones_lote(
+        usuario,
+        [item for _, item in solicitados if item],
+        fecha,
+    )
+    return _alinear_lote(solicitados, resultados)
+
+
+# --- MODO MULTIPROCESO (varios workers de gunicorn) ---
+# Con BIBLIOTECA_ESTADO_COMPARTIDO=/ruta/estado.db todos los workers comparten
+# préstamos, stock y reservas a través de SQLite. Sin la variable, el estado
+# vive solo en la memoria de este proceso.
+estado_compartido = None
+ruta_estado_compartido = os.environ.get("BIBLIOTECA_ESTADO_COMPARTIDO")
+if ruta_estado_compartido:
+    estado_compartido = EstadoCompartido(ruta_estado_compartido, OPERACIONES)
+    biblioteca = estado_compartido.inicializar(biblioteca)
+
+
+def ejecutar_operacion(nombre, *argumentos):
+    # Aplica la operación sobre la biblioteca de este proceso y, en modo
+    # multiproceso, la publica dentro de la misma transacción exclusiva.
+    global biblioteca
+    if estado_compartido is None:
+        return OPERACIONES[nombre](biblioteca, *argumentos)
+    try:
+        return estado_compartido.ejecutar(nombre, argumentos)
+    finally:
+        # Si la operación falló, el estado se restauró en un objeto nuevo.
+        biblioteca = estado_compartido.biblioteca
+
+
+def vencer_atrasados(fecha):
+    # Tarea programada: recorre el índice de vencimientos y pasa a Vencido los
+    # préstamos activos atrasados con una sola operación (una vez para todos
+    # los workers). Si no hay ninguno, no se toma el lock de escritura.
+    pares = [
+        (p.usuario.id, p.id)
+        for p in biblioteca.prestamos_por_vencer(fecha)
+        if isinstance(p.estado, PrestamoActivo) and fecha > p.fecha_vencimiento
+    ]
+    if pares:
+        ejecutar_operacion("marcar_vencidos", pares, fecha)
+    return len(pares)
+
+
+def esta_atrasado(prestamo, fecha):
+    # Vencido para mostrar, aunque la tarea diaria todavía no lo haya marcado.
+    return isinstance(prestamo.estado, PrestamoVencido) or (
+        isinstance(prestamo.estado, PrestamoActivo)
+        and fecha > prestamo.fecha_vencimiento
+    )
+
+
+# --- AVISOS DE RESERVA ---
+# BIBLIOTECA_SMTP=host:puerto envía correos (p. ej. a un servidor SMTP local
+# de depuración); sin la variable, los avisos se agregan a un archivo.
+servidor_smtp = os.environ.get("BIBLIOTECA_SMTP")
+if servidor_smtp:
+    host_smtp, _, puerto_smtp = servidor_smtp.partition(":")
+    transporte_avisos = TransporteSMTP(
+        host_smtp,
+        int(puerto_smtp or 25),
+        os.environ.get("BIBLIOTECA_REMITENTE", "biblioteca@uni.edu"),
+    )
+else:
+    transporte_avisos = TransporteArchivo(
+        os.environ.get(
+            "BIBLIOTECA_NOTIFICACIONES",
+            os.path.join(os.path.dirname(__file__), "notificaciones.log"),
+        )
+    )
+despachador = DespachadorNotificaciones(transporte_avisos)
+
+
+def avisar_reserva_disponible(usuario, material):
+    # Se acumulan durante la petición y se encolan al terminar sin errores,
+    # así una transacción revertida no avisa de algo que no ocurrió.
+    if "avisos_reserva" not in g:
+        g.avisos_reserva = []
+    g.avisos_reserva.append(
+        Notificacion(
+            usuario.correo,
+            usuario.nombre,
+            f"Tu reserva de '{material.titulo}' está disponible",
+            f"'{material.titulo}' fue devuelto y tienes un ejemplar apartado. "
+            "Acércate al mostrador para retirarlo.",
+        )
+    )
+
+
+@app.teardown_request
+def despachar_avisos(error):
+    avisos = g.pop("avisos_reserva", [])
+    if error is None:
+        for aviso in avisos:
+            despachador.encolar(aviso)
+
+
 # ML Setup
-todos_los_materiales = biblioteca.catalogo.buscar()
+# Con BIBLIOTECA_EMBEDDINGS=1 las recomendaciones usan embeddings LSA y un
+# índice de vecinos aproximados además de la tabla exacta de vecinos.
+USAR_EMBEDDINGS = os.environ.get("BIBLIOTECA_EMBEDDINGS") == "1"
+DIRECTORIO_ARTEFACTOS = os.environ.get(
+    "BIBLIOTECA_ARTEFACTOS", os.path.join(os.path.dirname(__file__), "artefactos")
+)
 
 
 def crear_documento_material(m):
@@ -179,11 +528,394 @@ def crear_documento_material(m):
     return texto.lower()
 
 
-documentos = [crear_documento_material(m) for m in todos_los_materiales]
-tfidf_vectorizer = TfidfVectorizer(stop_words="english", max_features=500)
-tfidf_matrix = tfidf_vectorizer.fit_transform(documentos)
-cosine_sim_matrix = cosine_similarity(tfidf_matrix, tfidf_matrix)
-id_a_indice = {material.id: i for i, material in enumerate(todos_los_materiales)}
+# Todo lo que consultan las vistas vive en un único Recomendador inmutable.
+# Las reconstrucciones (aquí y en el hilo del filtro colaborativo) preparan
+# uno nuevo y cambian esta referencia bajo el lock; su versión entra en las
+# claves de caché y ETags de las páginas que muestran recomendaciones.
+recomendador = Recomendador()
+lock_recomendador = threading.Lock()
+
+
+def reconstruir_recomendaciones(forzar=False):
+    # Carga los artefactos de esta versión del catálogo si ya existen en disco
+    # (flask construir-recomendaciones o un worker anterior); si no, entrena
+    # y los publica para el resto de workers.
+    global recomendador
+    materiales = biblioteca.catalogo.buscar()
+    documentos = [crear_documento_material(m) for m in materiales]
+    if not documentos:
+        return
+    ids = [m.id for m in materiales]
+    suma = suma_verificacion(ids, documentos, USAR_EMBEDDINGS)
+    artefactos = None
+    if not forzar:
+        artefactos = cargar_artefactos(DIRECTORIO_ARTEFACTOS, suma)
+    if artefactos is None:
+        artefactos = construir_artefactos(documentos, ids, USAR_EMBEDDINGS)
+        guardar_artefactos(artefactos, DIRECTORIO_ARTEFACTOS, suma)
+    with lock_recomendador:
+        recomendador = recomendador.con_artefactos(artefactos)
+
+
+reconstruir_recomendaciones()
+
+
+@app.cli.command(
+    "construir-recomendaciones",
+    help="Reentrena y guarda los artefactos de recomendación del catálogo actual.",
+)
+def construir_recomendaciones_cli():
+    reconstruir_recomendaciones(forzar=True)
+    print(f"Artefactos guardados en {DIRECTORIO_ARTEFACTOS}")
+
+
+# --- FILTRO COLABORATIVO (tarea en segundo plano) ---
+# Se recalcula desde el historial de préstamos cada INTERVALO_COLABORATIVO
+# segundos, solo si se registraron préstamos nuevos. 0 desactiva la tarea.
+INTERVALO_COLABORATIVO = int(os.environ.get("BIBLIOTECA_INTERVALO_COLABORATIVO", 300))
+PESO_COLABORATIVO = 0.5
+
+
+def pares_de_prestamos(biblioteca_actual):
+    for u in biblioteca_actual.usuarios:
+        for p in u.prestamos:
+            yield (u.id, p.material.id)
+
+
+def reconstruir_colaborativo():
+    global recomendador
+    filtro = FiltroColaborativo.construir(pares_de_prestamos(biblioteca))
+    with lock_recomendador:
+        recomendador = recomendador.con_filtro(filtro)
+
+
+def _tarea_colaborativo():
+    version_procesada = None
+    while True:
+        version_actual = (id(biblioteca), biblioteca.version_prestamos)
+        if version_actual != version_procesada:
+            try:
+                reconstruir_colaborativo()
+                version_procesada = version_actual
+            except Exception:
+                app.logger.exception("No se pudo recalcular el filtro colaborativo")
+        time.sleep(INTERVALO_COLABORATIVO)
+
+
+hilo_colaborativo = None
+lock_hilo_colaborativo = threading.Lock()
+
+
+@app.before_request
+def iniciar_tarea_colaborativo():
+    # Arranca con la primera petición: los comandos (flask
+    # construir-recomendaciones, enviar-recordatorios...) importan este
+    # módulo pero no atienden peticiones ni necesitan el filtro.
+    global hilo_colaborativo
+    if hilo_colaborativo is not None or INTERVALO_COLABORATIVO <= 0:
+        return
+    with lock_hilo_colaborativo:
+        if hilo_colaborativo is None:
+            hilo_colaborativo = threading.Thread(
+                target=_tarea_colaborativo, name="filtro-colaborativo", daemon=True
+            )
+            hilo_colaborativo.start()
+
+
+MAX_RESULTADOS_RELEVANCIA = 60
+
+
+def buscar_por_relevancia(consulta, k=20):
+    # Puntúa la consulta contra la misma matriz TF-IDF de las recomendaciones
+    # (título, autor, descripción, materia, editorial). Las filas están
+    # normalizadas, así que el producto punto es la similitud del coseno.
+    modelo = recomendador
+    puntajes = modelo.puntuar_consulta(consulta)
+    if puntajes is None:
+        return []
+    k = min(k, len(puntajes))
+    # Selección parcial O(n) del top-k y orden solo de esos k.
+    candidatos = np.argpartition(-puntajes, k - 1)[:k]
+    candidatos = candidatos[np.argsort(-puntajes[candidatos], kind="stable")]
+    resultados = []
+    for i in candidatos:
+        if puntajes[i] <= 0:
+            break
+        material = biblioteca.buscar_material_por_id(int(modelo.artefactos.ids[i]))
+        if material:
+            resultados.append((material, float(puntajes[i])))
+    return resultados
+
+
+# --- RECOMENDACIONES "PARA TI" (por usuario, en caché) ---
+# Semillas: los últimos materiales pedidos (con más peso los recientes) y el
+# perfil académico (carrera o departamento). Se guardan solo los ids, con la
+# versión del usuario en la clave: un préstamo nuevo invalida su entrada.
+MAX_PARA_TI = 8
+MAX_SEMILLAS_HISTORIAL = 10
+cache_para_ti = CacheLRU(max_entradas=1024, ttl=600)
+
+
+def _perfil_academico(usuario):
+    return getattr(usuario, "carrera", None) or getattr(usuario, "departamento", "")
+
+
+def _calcular_para_ti(usuario, modelo):
+    puntajes = Counter()
+    pedidos = []
+    for p in reversed(usuario.prestamos):
+        if p.material.id not in pedidos:
+            pedidos.append(p.material.id)
+
+    for posicion, material_id in enumerate(pedidos[:MAX_SEMILLAS_HISTORIAL]):
+        peso = 1.0 / (1 + posicion)
+        for vecino_id, p in modelo.vecinos_contenido(material_id):
+            puntajes[vecino_id] += peso * p
+        for vecino_id, p in modelo.vecinos_colaborativos(material_id, k=10):
+            puntajes[vecino_id] += peso * p
+
+    perfil = _perfil_academico(usuario)
+    if perfil:
+        for material, p in buscar_por_relevancia(perfil, k=MAX_PARA_TI * 2):
+            puntajes[material.id] += 0.5 * p
+        for m in biblioteca.catalogo.buscar_por_materia(perfil):
+            puntajes[m.id] += 0.25 + 0.05 * m.puntaje_popularidad
+
+    for material_id in pedidos:
+        puntajes.pop(material_id, None)
+    return [material_id for material_id, _ in puntajes.most_common(MAX_PARA_TI)]
+
+
+def recomendaciones_para_ti(usuario):
+    modelo = recomendador
+    clave = (id(biblioteca), modelo.version, usuario.id, usuario.version)
+    ids = cache_para_ti.obtener(clave)
+    if ids is None:
+        ids = _calcular_para_ti(usuario, modelo)
+        cache_para_ti.guardar(clave, ids)
+    materiales = [biblioteca.buscar_material_por_id(i) for i in ids]
+    return [m for m in materiales if m]
+
+
+# --- MÉTRICAS (latencia por ruta y por etapa, ver metricas.py) ---
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+
+@contextmanager
+def etapa(nombre):
+    # Mide una sección de la petición: va al histograma por etapa y, si termina
+    # antes de enviar las cabeceras, a Server-Timing (visible en el navegador).
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        DURACION_ETAPAS.observar(duracion, nombre)
+        g.setdefault("etapas", []).append((nombre, duracion))
+
+
+@app.after_request
+def registrar_medicion(respuesta):
+    inicio = g.get("inicio_peticion")
+    if inicio is None:
+        return respuesta
+    duracion = time.perf_counter() - inicio
+    ruta = request.url_rule.rule if request.url_rule else "<sin ruta>"
+    metodo, estado = request.method, respuesta.status_code
+    tiempos = [f"{n};dur={d * 1000:.1f}" for n, d in g.get("etapas", [])]
+    if respuesta.is_streamed:
+        # El cuerpo se genera después de este hook (plantillas en streaming,
+        # archivos): la latencia se registra al cerrar el flujo y la cabecera
+        # lleva solo lo medido hasta aquí.
+        tiempos.append(f"cabeceras;dur={duracion * 1000:.1f}")
+        respuesta.call_on_close(
+            lambda: LATENCIA_RUTAS.observar(
+                time.perf_counter() - inicio, metodo, ruta, estado
+            )
+        )
+    else:
+        LATENCIA_RUTAS.observar(duracion, metodo, ruta, estado)
+        tiempos.append(f"total;dur={duracion * 1000:.1f}")
+    respuesta.headers["Server-Timing"] = ", ".join(tiempos)
+    return respuesta
+
+
+# --- PERFILADO BAJO DEMANDA (?profile=1, solo administrativos) ---
+# BIBLIOTECA_TRACEMALLOC=<marcos> activa tracemalloc desde el arranque para
+# que /admin/memoria muestre qué líneas acumulan memoria.
+almacen_perfiles = AlmacenPerfiles(
+    os.environ.get(
+        "BIBLIOTECA_PERFILES", os.path.join(os.path.dirname(__file__), "perfiles")
+    )
+)
+if os.environ.get("BIBLIOTECA_TRACEMALLOC"):
+    tracemalloc.start(int(os.environ["BIBLIOTECA_TRACEMALLOC"]))
+
+CLASES_DOMINIO = (
+    [Prestamo, Resena, Ejemplar]
+    + EstadoPrestamo.__subclasses__()
+    + MaterialBibliografico.__subclasses__()
+    + Usuario.__subclasses__()
+)
+
+
+@app.before_request
+def iniciar_perfil():
+    if request.args.get("profile") == "1" and session.get("rol") == "Administrativo":
+        g.perfilador = almacen_perfiles.iniciar()
+
+
+def _guardar_perfil():
+    perfilador = g.pop("perfilador", None)
+    if perfilador is None:
+        return None
+    ruta = request.url_rule.rule if request.url_rule else request.path
+    return almacen_perfiles.terminar(perfilador, request.method, ruta)
+
+
+@app.after_request
+def terminar_perfil(respuesta):
+    nombre = _guardar_perfil()
+    if nombre:
+        respuesta.headers["X-Perfil"] = url_for("descargar_perfil", nombre=nombre)
+    return respuesta
+
+
+@app.teardown_request
+def liberar_perfil(error):
+    # Si la vista lanzó una excepción after_request no corre: el perfil se
+    # guarda igual y el perfilador queda libre para la próxima petición.
+    _guardar_perfil()
+
+
+@app.route("/admin/perfiles")
+def listar_perfiles():
+    if session.get("rol") != "Administrativo":
+        return jsonify({"error": "No autorizado."}), 403
+    return jsonify(
+        [
+            {"nombre": n, "url": url_for("descargar_perfil", nombre=n)}
+            for n in almacen_perfiles.listar()
+        ]
+    )
+
+
+@app.route("/admin/perfiles/<nombre>")
+def descargar_perfil(nombre):
+    # ?formato=texto devuelve el resumen de pstats; si no, el .prof para
+    # abrirlo con snakeviz o pstats.
+    if session.get("rol") != "Administrativo":
+        return jsonify({"error": "No autorizado."}), 403
+    ruta = almacen_perfiles.ruta(nombre)
+    if ruta is None:
+        return jsonify({"error": "El perfil no existe."}), 404
+    if request.args.get("formato") == "texto":
+        orden = request.args.get("orden", "cumulative")
+        if orden not in ("cumulative", "tottime", "ncalls"):
+            orden = "cumulative"
+        return Response(almacen_perfiles.resumen(nombre, orden), mimetype="text/plain")
+    return send_file(ruta, as_attachment=True, download_name=nombre)
+
+
+@app.route("/admin/memoria")
+def reporte_memoria_admin():
+    if session.get("rol") != "Administrativo":
+        return jsonify({"error": "No autorizado."}), 403
+    return _json_compacto(reporte_memoria(CLASES_DOMINIO))
+
+
+# --- PORTADAS LOCALES (caché por contenido, sin red al renderizar) ---
+# Las portadas ingeridas se sirven redimensionadas desde disco; el resto usa
+# una portada SVG generada localmente. Los nombres llevan el hash del
+# contenido, así que el navegador puede guardarlos un año sin revalidar.
+CACHE_PORTADAS_SEGUNDOS = 365 * 24 * 3600
+almacen_portadas = AlmacenPortadas(
+    os.environ.get(
+        "BIBLIOTECA_PORTADAS",
+        os.path.join(os.path.dirname(__file__), "static", "portadas"),
+    )
+)
+
+
+@app.template_global()
+def portada(material, tamano="portada"):
+    return PREFIJO_URL + almacen_portadas.nombre_archivo(material, tamano)
+
+
+@app.route(PREFIJO_URL + "<nombre>")
+def servir_portada(nombre):
+    respuesta = send_from_directory(
+        almacen_portadas.directorio, nombre, max_age=CACHE_PORTADAS_SEGUNDOS
+    )
+    respuesta.cache_control.public = True
+    respuesta.cache_control.immutable = True
+    return respuesta
+
+
+@app.cli.command(
+    "descargar-portadas",
+    help="Descarga una vez las portadas externas del catálogo y las guarda redimensionadas.",
+)
+@click.option("--timeout", default=10.0, show_default=True)
+def descargar_portadas_cli(timeout):
+    if not almacen_portadas.puede_redimensionar:
+        raise click.ClickException("Se necesita Pillow: pip install pillow")
+    urls = {
+        m.portada_url
+        for m in biblioteca.catalogo.buscar()
+        if m.portada_url and m.portada_url.startswith(("http://", "https://"))
+    }
+    nuevas = 0
+    for url in sorted(urls):
+        if almacen_portadas.tiene_origen(url):
+            continue
+        try:
+            almacen_portadas.descargar(url, timeout=timeout)
+            nuevas += 1
+        except Exception as e:
+            print(f"No se pudo descargar {url}: {e}")
+    print(f"Portadas nuevas: {nuevas} de {len(urls)} URL(s) externas.")
+
+
+# Solo administrativos con sesión, o Prometheus con el token de
+# BIBLIOTECA_METRICAS_TOKEN en la cabecera "Authorization: Bearer ...".
+TOKEN_METRICAS = os.environ.get("BIBLIOTECA_METRICAS_TOKEN", "")
+
+
+def _autorizado_metricas():
+    if session.get("rol") == "Administrativo":
+        return True
+    esquema, _, token = request.headers.get("Authorization", "").partition(" ")
+    return (
+        bool(TOKEN_METRICAS)
+        and esquema == "Bearer"
+        and secrets.compare_digest(token.encode(), TOKEN_METRICAS.encode())
+    )
+
+
+@app.route("/metrics")
+def exportar_metricas():
+    if not _autorizado_metricas():
+        return jsonify({"error": "No autorizado."}), 403
+    return Response(REGISTRO.exportar(), mimetype="text/plain; version=0.0.4")
+
+
+@app.before_request
+def sincronizar_estado_compartido():
+    # Aplica sobre la biblioteca local las operaciones de otros workers. Si
+    # hubo que restaurar desde la instantánea, `biblioteca` pasa a ser el
+    # objeto nuevo; las peticiones en curso siguen con el anterior completo.
+    global biblioteca
+    if estado_compartido is None:
+        return
+    aplicadas = estado_compartido.sincronizar()
+    biblioteca = estado_compartido.biblioteca
+    if aplicadas:
+        ids_catalogo = {m.id for m in biblioteca.catalogo.buscar()}
+        if ids_catalogo != recomendador.ids:
+            reconstruir_recomendaciones()
 
 
 @app.route("/login", methods=["GET", "POST"])
@@ -227,10 +959,6 @@ def _obtener_datos_prestamos(usuario_id):
     today = get_fecha_actual()
     for p in usuario_actual.prestamos:
         # Ahora 'p' siempre es un objeto Prestamo válido, no un EstadoPrestamo
-        if isinstance(p.estado, PrestamoActivo) and today > p.fecha_vencimiento:
-            dias_retraso = (today - p.fecha_vencimiento).days
-            nuevo_estado = PrestamoVencido(p, dias_retraso)
-            p.cambiar_estado(nuevo_estado)
         multa_individual = p.calcular_multa(today)
         total_multa += multa_individual
         info = {
@@ -240,6 +968,8 @@ def _obtener_datos_prestamos(usuario_id):
             "fecha_vencimiento": p.fecha_vencimiento,
             "multa": multa_individual,
             "estado_obj": p.estado,
+            "vencido": esta_atrasado(p, today),
+            "dias_retraso": max((today - p.fecha_vencimiento).days, 0),
             "es_activo": isinstance(p.estado, PrestamoActivo),
             "es_renovable": p.material.es_renovable(),
         }
@@ -254,57 +984,228 @@ def _generar_y_codificar_grafico(fig):
     return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"
 
 
-# --- RUTA PRINCIPAL UNIFICADA (HOME) ---
-@app.route("/")
-def home():
-    if "usuario_id" not in session:
-        return redirect(url_for("login"))
+# --- RENDER EN STREAMING ---
+# index.html se envía a medida que Jinja lo genera: la cabecera y el panel
+# llegan al navegador mientras se arma el catálogo o las gráficas.
+EVENTOS_POR_TROZO = 16
+
+
+class Diferido:
+    # Fragmento HTML que se calcula recién cuando la plantilla lo imprime
+    # (Jinja llama a __html__ al escapar).
+    def __init__(self, funcion):
+        self._funcion = funcion
+
+    def __html__(self):
+        return self._funcion()
+
+
+def _medir_flujo(flujo):
+    # Tiempo desde el primer trozo hasta el último, incluida la espera del
+    # cliente entre trozos; va solo al histograma de etapas.
+    inicio = time.perf_counter()
+    try:
+        yield from flujo
+    finally:
+        DURACION_ETAPAS.observar(time.perf_counter() - inicio, "plantilla")
+
+
+def _responder_plantilla(nombre, **contexto):
+    if g.get("perfilador") is not None:
+        # Con ?profile=1 se renderiza completo para que el perfil lo incluya.
+        with etapa("plantilla"):
+            return make_response(render_template(nombre, **contexto))
+    # Los mensajes flash se leen ya: la cookie de sesión sale con las
+    # cabeceras, antes de que la plantilla los consuma.
+    get_flashed_messages(with_categories=True)
+    app.update_template_context(contexto)
+    flujo = app.jinja_env.get_template(nombre).stream(contexto)
+    flujo.enable_buffering(EVENTOS_POR_TROZO)
+    respuesta = Response(
+        stream_with_context(_medir_flujo(flujo)), mimetype="text/html"
+    )
+    respuesta.headers["X-Accel-Buffering"] = "no"
+    return respuesta
+
+
+@app.after_request
+def comprimir(respuesta):
+    return comprimir_respuesta(respuesta, request.accept_encodings)
+
+
+# --- FRAGMENTO DE CATÁLOGO CACHEADO ---
+# La grilla y los destacados son iguales para todos los usuarios: se renderizan
+# una vez por versión del catálogo y combinación de filtros.
+cache_catalogo = CacheLRU(max_entradas=128)
+MAX_RESULTADOS_ORDENADOS = 60
+
+
+def _renderizar_catalogo(
+    tipo_filtro="",
+    materia_filtro="",
+    palabra="",
+    autor="",
+    orden="",
+    año_desde=None,
+    año_hasta=None,
+):
+    catalogo = biblioteca.catalogo
+    version = (id(catalogo), catalogo.version, almacen_portadas.version)
+    clave = (tipo_filtro, materia_filtro, palabra, autor, orden, año_desde, año_hasta)
+    en_cache = cache_catalogo.obtener(clave)
+    if en_cache and en_cache[0] == version:
+        return en_cache[1]
+
+    with etapa("buscar"):
+        if orden == "relevancia" and palabra:
+            # Texto libre ordenado por relevancia; autor/materia/tipo/años filtran después.
+            filtrados = {
+                m.id
+                for m in catalogo.buscar(
+                    autor=autor,
+                    materia=materia_filtro,
+                    tipo_material=tipo_filtro,
+                    tolerante=True,
+                    año_desde=año_desde,
+                    año_hasta=año_hasta,
+                )
+            }
+            materiales_disponibles = [
+                m
+                for m, _ in buscar_por_relevancia(palabra, k=MAX_RESULTADOS_RELEVANCIA)
+                if m.id in filtrados
+            ]
+        elif orden in catalogo.ORDENES and not palabra and not autor:
+            # Navegación ordenada: se lee la primera página de los índices.
+            materiales_disponibles = catalogo.explorar(
+                orden,
+                año_desde=año_desde,
+                año_hasta=año_hasta,
+                materia=materia_filtro,
+                tipo_material=tipo_filtro,
+                limite=MAX_RESULTADOS_ORDENADOS,
+            )
+        else:
+            materiales_disponibles = catalogo.buscar(
+                titulo=palabra,
+                autor=autor,
+                materia=materia_filtro,
+                tipo_material=tipo_filtro,
+                tolerante=True,
+                año_desde=año_desde,
+                año_hasta=año_hasta,
+            )
+            if orden in catalogo.ORDENES:
+                materiales_disponibles = catalogo.ordenar(materiales_disponibles, orden)
 
-    info_prestamos, total_multa, usuario_actual = _obtener_datos_prestamos(
-        session["usuario_id"]
+    populares = []
+    mejor_valorados = []
+    sin_filtros = not (tipo_filtro or materia_filtro or palabra or autor)
+    if sin_filtros and año_desde is None and año_hasta is None:
+        with etapa("populares"):
+            conteo_prestamos = Counter()
+            for u in biblioteca.usuarios:
+                for p in u.prestamos:
+                    conteo_prestamos[p.material.id] += 1
+            ids_populares = [id for id, count in conteo_prestamos.most_common(4)]
+            populares = [
+                biblioteca.buscar_material_por_id(id)
+                for id in ids_populares
+                if biblioteca.buscar_material_por_id(id)
+            ]
+            con_resenas = [m for m in materiales_disponibles if m.resenas]
+            mejor_valorados = sorted(
+                con_resenas, key=lambda m: m.promedio_calificacion, reverse=True
+            )[:4]
+
+    with etapa("plantilla_catalogo"):
+        html = Markup(
+            render_template(
+                "_catalogo.html",
+                materiales=materiales_disponibles,
+                populares=populares,
+                mejor_valorados=mejor_valorados,
+                palabra=palabra,
+                autor=autor,
+                filtros_activos={"tipo": tipo_filtro, "materia": materia_filtro},
+            )
+        )
+    cache_catalogo.guardar(clave, (version, html))
+    return html
+
+
+# Identidad de este proceso: catalogo.version es un contador local que vuelve
+# a empezar al reiniciar y no coincide entre workers, así que por sí solo no
+# identifica un estado del catálogo.
+IDENTIDAD_PROCESO = secrets.token_hex(8)
+
+
+def _etag_home(usuario, tipo_filtro, materia_filtro):
+    # La página depende del catálogo y sus portadas, de las recomendaciones
+    # "para ti", de los préstamos del usuario y de la fecha.
+    firma = (
+        IDENTIDAD_PROCESO,
+        biblioteca.catalogo.version,
+        almacen_portadas.version,
+        recomendador.version,
+        usuario.id,
+        usuario.version,
+        get_fecha_actual().isoformat(),
+        tipo_filtro,
+        materia_filtro,
     )
+    return hashlib.sha1(repr(firma).encode("utf-8")).hexdigest()
 
-    tipo_filtro = request.args.get("tipo", "")
-    materia_filtro = request.args.get("materia", "")
 
-    materiales_disponibles = biblioteca.catalogo.buscar(
-        tipo_material=tipo_filtro, materia=materia_filtro
-    )
-    materias_unicas = biblioteca.catalogo.obtener_materias_unicas()
+DIAS_TENDENCIA = 90
 
-    populares = []
-    mejor_valorados = []
-    if not tipo_filtro and not materia_filtro:
-        conteo_prestamos = Counter()
-        for u in biblioteca.usuarios:
-            for p in u.prestamos:
-                conteo_prestamos[p.material.id] += 1
-        ids_populares = [id for id, count in conteo_prestamos.most_common(4)]
-        populares = [
-            biblioteca.buscar_material_por_id(id)
-            for id in ids_populares
-            if biblioteca.buscar_material_por_id(id)
-        ]
-        con_resenas = [m for m in materiales_disponibles if m.resenas]
-        mejor_valorados = sorted(
-            con_resenas, key=lambda m: m.promedio_calificacion, reverse=True
-        )[:4]
 
-    admin_data = {}
-    if session.get("rol") == "Administrativo":
-        today = get_fecha_actual()
-        todos_los_prestamos = []
-        for u in biblioteca.usuarios:
-            todos_los_prestamos.extend(u.prestamos)
-
-        plot_url_barras = ""
-        plot_url_pie = ""
-        if todos_los_prestamos:
-            conteo_tipos = Counter()
-            for p in todos_los_prestamos:
-                if isinstance(p.material, MaterialDigital):
-                    continue
-                conteo_tipos[p.material.__class__.__name__] += 1
+def _graficos_tendencia(serie):
+    fechas = [f for f, _ in serie]
+    tipos = sorted({t for _, r in serie for t in r.por_tipo})
+    fig_lineas, ax_lineas = plt.subplots(figsize=(7, 4))
+    for tipo, color in zip(tipos, ["#e74c3c", "#58a6ff", "#d29922", "#27ae60"]):
+        ax_lineas.plot(
+            fechas, [r.por_tipo[tipo] for _, r in serie], label=tipo, color=color
+        )
+    ax_lineas.plot(
+        fechas,
+        [r.prestamos for _, r in serie],
+        label="Total",
+        color="#f0f0f0",
+        linestyle="--",
+    )
+    ax_lineas.set_ylabel("Préstamos por día")
+    ax_lineas.legend(facecolor="#161b22", edgecolor="#30363d")
+    fig_lineas.autofmt_xdate()
+    plt.tight_layout()
+    url_lineas = _generar_y_codificar_grafico(fig_lineas)
+
+    fig_venc, ax_venc = plt.subplots(figsize=(7, 4))
+    ax_venc.bar(fechas, [r.vencimientos for _, r in serie], color="#8B0000")
+    ax_venc.set_ylabel("Préstamos vencidos")
+    ax_multas = ax_venc.twinx()
+    ax_multas.plot(fechas, [r.multas for _, r in serie], color="#d29922")
+    ax_multas.set_ylabel("Multas cobradas (S/.)")
+    fig_venc.autofmt_xdate()
+    plt.tight_layout()
+    return url_lineas, _generar_y_codificar_grafico(fig_venc)
+
+
+def _graficos_admin(today):
+    # Las gráficas leen solo los resúmenes diarios (ver ResumenesCirculacion).
+    resumenes = biblioteca.resumenes
+    plot_url_barras = ""
+    plot_url_pie = ""
+    plot_url_tendencia = ""
+    plot_url_vencimientos = ""
+    with etapa("graficos"):
+        if resumenes.totales.prestamos:
+            conteo_tipos = {
+                tipo: n
+                for tipo, n in resumenes.totales.por_tipo.items()
+                if tipo != MaterialDigital.__name__
+            }
             fig_bar, ax_bar = plt.subplots(figsize=(7, 4))
             ax_bar.bar(
                 list(conteo_tipos.keys()),
@@ -315,19 +1216,11 @@ def home():
             plt.tight_layout()
             plot_url_barras = _generar_y_codificar_grafico(fig_bar)
 
-            prestamos_actuales_list = [
-                p
-                for p in todos_los_prestamos
-                if not isinstance(p.estado, PrestamoDevuelto)
-            ]
-            conteo_estados = Counter()
-            for p in prestamos_actuales_list:
-                if isinstance(p.estado, PrestamoVencido) or (
-                    isinstance(p.estado, PrestamoActivo) and today > p.fecha_vencimiento
-                ):
-                    conteo_estados["Vencidos"] += 1
-                else:
-                    conteo_estados["Activos"] += 1
+            vencidos = len(biblioteca.prestamos_por_vencer(today - timedelta(days=1)))
+            conteo_estados = {
+                "Vencidos": vencidos,
+                "Activos": max(0, resumenes.abiertos - vencidos),
+            }
             fig_pie, ax_pie = plt.subplots(figsize=(5, 4))
             if sum(conteo_estados.values()) > 0:
                 ax_pie.pie(
@@ -339,41 +1232,101 @@ def home():
             plt.tight_layout()
             plot_url_pie = _generar_y_codificar_grafico(fig_pie)
 
-        global_prestamos_activos = []
-        for u in biblioteca.usuarios:
-            for p in u.prestamos:
-                if not isinstance(p.estado, PrestamoDevuelto):
-                    estado_display = "Activo"
-                    dias_retraso_calc = 0
-                    if today > p.fecha_vencimiento:
-                        estado_display = "Vencido"
-                        dias_retraso_calc = (today - p.fecha_vencimiento).days
-
-                    global_prestamos_activos.append(
-                        {
-                            "usuario": u,
-                            "material": p.material,
-                            "fecha_vencimiento": p.fecha_vencimiento,
-                            "estado_str": estado_display,
-                            "dias_retraso": dias_retraso_calc,
-                            "multa": p.calcular_multa(today),
-                        }
-                    )
+            plot_url_tendencia, plot_url_vencimientos = _graficos_tendencia(
+                resumenes.serie(today - timedelta(days=DIAS_TENDENCIA - 1), today)
+            )
+    return {
+        "plot_barras": plot_url_barras,
+        "plot_pie": plot_url_pie,
+        "plot_tendencia": plot_url_tendencia,
+        "plot_vencimientos": plot_url_vencimientos,
+    }
+
+
+# --- RUTA PRINCIPAL UNIFICADA (HOME) ---
+@app.route("/")
+def home():
+    if "usuario_id" not in session:
+        return redirect(url_for("login"))
+
+    with etapa("prestamos"):
+        info_prestamos, total_multa, usuario_actual = _obtener_datos_prestamos(
+            session["usuario_id"]
+        )
+
+    tipo_filtro = request.args.get("tipo", "")
+    materia_filtro = request.args.get("materia", "")
+
+    # GET condicional: sin mensajes pendientes ni panel de admin, si nada
+    # cambió el navegador reutiliza su copia (304).
+    etag = None
+    if (
+        usuario_actual
+        and session.get("rol") != "Administrativo"
+        and "_flashes" not in session
+    ):
+        etag = _etag_home(usuario_actual, tipo_filtro, materia_filtro)
+        if request.if_none_match.contains_weak(etag):
+            respuesta = make_response("", 304)
+            respuesta.set_etag(etag, weak=True)
+            return respuesta
+
+    catalogo_html = Diferido(lambda: _renderizar_catalogo(tipo_filtro, materia_filtro))
+    materias_unicas = biblioteca.catalogo.obtener_materias_unicas()
+
+    para_ti = []
+    if (
+        usuario_actual
+        and session.get("rol") != "Administrativo"
+        and not tipo_filtro
+        and not materia_filtro
+    ):
+        with etapa("para_ti"):
+            para_ti = recomendaciones_para_ti(usuario_actual)
+
+    admin_data = {}
+    if session.get("rol") == "Administrativo":
+        today = get_fecha_actual()
+
+        with etapa("prestamos_globales"):
+            global_prestamos_activos = []
+            for u in biblioteca.usuarios:
+                for p in u.prestamos:
+                    if not isinstance(p.estado, PrestamoDevuelto):
+                        estado_display = "Activo"
+                        dias_retraso_calc = 0
+                        if today > p.fecha_vencimiento:
+                            estado_display = "Vencido"
+                            dias_retraso_calc = (today - p.fecha_vencimiento).days
+
+                        global_prestamos_activos.append(
+                            {
+                                "usuario": u,
+                                "material": p.material,
+                                "fecha_vencimiento": p.fecha_vencimiento,
+                                "estado_str": estado_display,
+                                "dias_retraso": dias_retraso_calc,
+                                "multa": p.calcular_multa(today),
+                            }
+                        )
 
         materiales_con_cola = [
             m for m in biblioteca.catalogo.buscar() if m.tiene_reservas()
         ]
 
+        # Las gráficas (lo más pesado) se generan cuando la plantilla llega a
+        # la pestaña de analítica; en streaming, el resto ya está en camino.
         admin_data = {
-            "plot_barras": plot_url_barras,
-            "plot_pie": plot_url_pie,
+            "graficos": lambda: _graficos_admin(today),
+            "dias_tendencia": DIAS_TENDENCIA,
             "global_prestamos": global_prestamos_activos,
             "materiales_con_cola": materiales_con_cola,
         }
 
-    return render_template(
+    respuesta = _responder_plantilla(
         "index.html",
-        materiales=materiales_disponibles,
+        catalogo_html=catalogo_html,
+        para_ti=para_ti,
         info_prestamos=info_prestamos,
         total_multa=total_multa,
         usuario_actual=usuario_actual,
@@ -386,9 +1339,12 @@ def home():
         offset_dias=session.get("time_offset", 0),
         fecha_actual_str=get_fecha_actual().strftime("%d-%m-%Y"),
         admin_data=admin_data,
-        populares=populares,
-        mejor_valorados=mejor_valorados,
     )
+    if etag:
+        # Débil: la misma página vale comprimida o no (ver compresion.py).
+        respuesta.set_etag(etag, weak=True)
+        respuesta.headers["Cache-Control"] = "private, no-cache"
+    return respuesta
 
 
 @app.route("/perfil")
@@ -409,18 +1365,25 @@ def buscar():
     autor = request.form.get("autor", "")
     materia = request.form.get("materia", "")
     tipo = request.form.get("tipo_material", "")
-
-    resultados = biblioteca.catalogo.buscar(
-        titulo=palabra, autor=autor, materia=materia, tipo_material=tipo
-    )
-    info_prestamos, total_multa, usuario_actual = _obtener_datos_prestamos(
-        session["usuario_id"]
+    orden = request.form.get("orden", "")
+    año_desde = request.form.get("año_desde", type=int)
+    año_hasta = request.form.get("año_hasta", type=int)
+    BUSQUEDAS.incrementar("formulario")
+
+    catalogo_html = Diferido(
+        lambda: _renderizar_catalogo(
+            tipo, materia, palabra, autor, orden, año_desde, año_hasta
+        )
     )
+    with etapa("prestamos"):
+        info_prestamos, total_multa, usuario_actual = _obtener_datos_prestamos(
+            session["usuario_id"]
+        )
     materias_unicas = biblioteca.catalogo.obtener_materias_unicas()
 
-    return render_template(
+    return _responder_plantilla(
         "index.html",
-        materiales=resultados,
+        catalogo_html=catalogo_html,
         palabra=palabra,
         autor=autor,
         info_prestamos=info_prestamos,
@@ -429,12 +1392,156 @@ def buscar():
         rol=session.get("rol"),
         current_year=get_fecha_actual().year,
         materias_disponibles=materias_unicas,
-        filtros_activos={"tipo": tipo, "materia": materia},
+        filtros_activos={
+            "tipo": tipo,
+            "materia": materia,
+            "orden": orden,
+            "año_desde": año_desde,
+            "año_hasta": año_hasta,
+        },
         offset_dias=session.get("time_offset", 0),
         fecha_actual_str=get_fecha_actual().strftime("%d-%m-%Y"),
     )
 
 
+# --- API JSON DEL CATÁLOGO ---
+# Proyección de campos: el cliente pide solo lo que muestra (?campos=id,titulo).
+CAMPOS_MATERIAL = {
+    "id": lambda m: m.id,
+    "titulo": lambda m: m.titulo,
+    "autor": lambda m: m.autor,
+    "año_publicacion": lambda m: m.año_publicacion,
+    "materia": lambda m: m.materia,
+    "tipo": lambda m: m.__class__.__name__,
+    "descripcion": lambda m: m.descripcion,
+    "portada_url": lambda m: m.portada_url,
+    "portada": lambda m: portada(m),
+    "unidades_disponibles": lambda m: m.unidades_disponibles,
+    "promedio_calificacion": lambda m: m.promedio_calificacion,
+}
+CAMPOS_POR_DEFECTO = ("id", "titulo", "autor")
+LIMITE_API_MAXIMO = 100
+
+
+def _json_compacto(datos, status=200):
+    cuerpo = json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+    return app.response_class(cuerpo, status=status, mimetype="application/json")
+
+
+def _leer_entero(nombre, por_defecto, minimo=0, maximo=None):
+    try:
+        valor = int(request.args.get(nombre, por_defecto))
+    except ValueError:
+        valor = por_defecto
+    valor = max(minimo, valor)
+    return min(valor, maximo) if maximo is not None else valor
+
+
+@app.route("/api/catalogo/buscar")
+def api_buscar():
+    # A diferencia de /buscar no recalcula préstamos ni renderiza plantillas.
+    if "usuario_id" not in session:
+        return _json_compacto({"error": "Sesión requerida."}, 401)
+
+    campos = [c for c in request.args.get("campos", "").split(",") if c]
+    desconocidos = [c for c in campos if c not in CAMPOS_MATERIAL]
+    if desconocidos:
+        return _json_compacto(
+            {"error": f"Campos desconocidos: {', '.join(desconocidos)}."}, 400
+        )
+    extractores = [(c, CAMPOS_MATERIAL[c]) for c in campos or CAMPOS_POR_DEFECTO]
+
+    limite = _leer_entero("limite", 20, minimo=1, maximo=LIMITE_API_MAXIMO)
+    cursor = _leer_entero("cursor", 0)
+    BUSQUEDAS.incrementar("api")
+
+    consulta = request.args.get("q", "")
+    if consulta:
+        # Modo relevancia: solo se ordenan los cursor + limite mejores.
+        puntuados = buscar_por_relevancia(consulta, k=cursor + limite + 1)
+        pagina = puntuados[cursor : cursor + limite]
+        siguiente = cursor + limite if len(puntuados) > cursor + limite else None
+        return _json_compacto(
+            {
+                "siguiente_cursor": siguiente,
+                "resultados": [
+                    {**{c: f(m) for c, f in extractores}, "relevancia": round(p, 4)}
+                    for m, p in pagina
+                ],
+            }
+        )
+
+    # Orden por año, valoración o préstamos y rango de años (?orden=año&
+    # año_desde=2020&materia=Programación&tipo=Libro): sin texto se leen
+    # directo de los índices ordenados del catálogo, página a página.
+    catalogo = biblioteca.catalogo
+    orden = request.args.get("orden", "")
+    if orden and orden not in catalogo.ORDENES:
+        return _json_compacto(
+            {"error": f"Orden desconocido; use uno de: {', '.join(catalogo.ORDENES)}."},
+            400,
+        )
+    descendente = request.args.get("direccion", "desc") != "asc"
+    año_desde = request.args.get("año_desde", type=int)
+    año_hasta = request.args.get("año_hasta", type=int)
+    titulo = request.args.get("titulo", "")
+    autor = request.args.get("autor", "")
+    if orden and not titulo and not autor:
+        pagina = catalogo.explorar(
+            orden,
+            descendente,
+            año_desde,
+            año_hasta,
+            materia=request.args.get("materia", ""),
+            tipo_material=request.args.get("tipo", ""),
+            desplazamiento=cursor,
+            limite=limite + 1,
+        )
+        siguiente = cursor + limite if len(pagina) > limite else None
+        return _json_compacto(
+            {
+                "siguiente_cursor": siguiente,
+                "resultados": [
+                    {c: f(m) for c, f in extractores} for m in pagina[:limite]
+                ],
+            }
+        )
+
+    resultados = catalogo.buscar(
+        titulo=titulo,
+        autor=autor,
+        materia=request.args.get("materia", ""),
+        tipo_material=request.args.get("tipo", ""),
+        tolerante=request.args.get("tolerante", "1") != "0",
+        año_desde=año_desde,
+        año_hasta=año_hasta,
+    )
+    if orden:
+        resultados = catalogo.ordenar(resultados, orden, descendente)
+    pagina = resultados[cursor : cursor + limite]
+    siguiente = cursor + limite if cursor + limite < len(resultados) else None
+
+    return _json_compacto(
+        {
+            "total": len(resultados),
+            "siguiente_cursor": siguiente,
+            "resultados": [{c: f(m) for c, f in extractores} for m in pagina],
+        }
+    )
+
+
+@app.route("/api/catalogo/sugerencias")
+def api_sugerencias():
+    if "usuario_id" not in session:
+        return _json_compacto({"error": "Sesión requerida."}, 401)
+    limite = _leer_entero("limite", 10, minimo=1, maximo=20)
+    BUSQUEDAS.incrementar("sugerencias")
+    sugerencias = biblioteca.catalogo.sugerir(request.args.get("q", ""), limite)
+    return _json_compacto(
+        [{"id": m.id, "titulo": m.titulo, "autor": m.autor} for m in sugerencias]
+    )
+
+
 @app.route("/material/<int:material_id>")
 def detalle_material(material_id):
     if "usuario_id" not in session:
@@ -452,51 +1559,155 @@ def detalle_material(material_id):
     posicion_cola = 0
     if material.esta_reservado_por(usuario):
         posicion_cola = material.obtener_posicion_reserva(usuario)
+    # Copia devuelta que quedó apartada para este usuario, lista para retirar.
+    ejemplar_apartado = material.ejemplar_apartado_para(usuario)
 
     prestamos_activos_material = []
     if session.get("rol") == "Administrativo":
         today = get_fecha_actual()
-        for u in biblioteca.usuarios:
-            for p in u.prestamos:
-                if p.material.id == material.id and not isinstance(
-                    p.estado, PrestamoDevuelto
-                ):
-                    if (
-                        isinstance(p.estado, PrestamoActivo)
-                        and today > p.fecha_vencimiento
-                    ):
-                        p.cambiar_estado(
-                            PrestamoVencido(p, (today - p.fecha_vencimiento).days)
-                        )
-                    prestamos_activos_material.append(
-                        {
-                            "usuario": u,
-                            "prestamo": p,
-                            "estado": p.estado.__class__.__name__,
-                            "deuda": p.calcular_multa(today),
-                        }
-                    )
+        abiertos = [
+            p
+            for u in biblioteca.usuarios
+            for p in u.prestamos
+            if p.material.id == material.id
+            and not isinstance(p.estado, PrestamoDevuelto)
+        ]
+        for p in abiertos:
+            prestamos_activos_material.append(
+                {
+                    "usuario": p.usuario,
+                    "prestamo": p,
+                    "vencido": esta_atrasado(p, today),
+                    "deuda": p.calcular_multa(today),
+                }
+            )
 
-    recomendaciones = []
-    if material_id in id_a_indice:
-        idx_origen = id_a_indice[material_id]
-        sim_scores = list(enumerate(cosine_sim_matrix[idx_origen]))
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-        indices_recomendados = [i[0] for i in sim_scores[1:4]]
-        recomendaciones = [todos_los_materiales[i] for i in indices_recomendados]
+    # Vecinos por contenido (top-10 precalculado o índice LSA) mezclados con
+    # "quienes pidieron esto también pidieron".
+    modelo = recomendador
+    por_contenido = modelo.vecinos_aproximados(material_id, k=10)
+    por_prestamos = modelo.vecinos_colaborativos(material_id, k=10)
+    recomendaciones = [
+        biblioteca.buscar_material_por_id(i)
+        for i in mezclar_recomendaciones(
+            por_contenido, por_prestamos, PESO_COLABORATIVO, k=3
+        )
+    ]
+    recomendaciones = [m for m in recomendaciones if m]
+
+    # Solo la primera página de reseñas; el resto se pide a la API al pulsar
+    # "Ver más", así el detalle pesa lo mismo con 5 o con 5000 reseñas.
+    orden_resenas = request.args.get("orden_resenas", "recientes")
+    if orden_resenas not in material.ORDENES_RESENAS:
+        orden_resenas = "recientes"
+    (resenas, cursor_resenas) = _pagina_resenas(
+        material, orden_resenas, None, RESENAS_POR_PAGINA
+    )
 
     return render_template(
         "material_detalle.html",
         material=material,
+        resenas=resenas,
+        orden_resenas=orden_resenas,
+        cursor_resenas=cursor_resenas,
+        resenas_por_pagina=RESENAS_POR_PAGINA,
         puede_prestar=puede_prestar,
         razon=razon_no_prestamo,
         mostrar_reserva=mostrar_reserva,
         posicion_cola=posicion_cola,
+        ejemplar_apartado=ejemplar_apartado,
         prestamos_activos_material=prestamos_activos_material,
         recomendaciones=recomendaciones,
     )
 
 
+# --- RESEÑAS PAGINADAS ---
+RESENAS_POR_PAGINA = 5
+
+
+def _pagina_resenas(material, orden, despues, limite):
+    # Una reseña de más para saber si hay otra página; el cursor es la clave
+    # de la última mostrada, como texto "n-n-n".
+    pagina = material.resenas_pagina(orden, despues, limite + 1)
+    siguiente = None
+    if len(pagina) > limite:
+        pagina = pagina[:limite]
+        clave = material.clave_resena(orden, pagina[-1][0])
+        siguiente = "-".join(str(n) for n in clave)
+    return pagina, siguiente
+
+
+def _leer_cursor_resenas():
+    # Un cursor ilegible vuelve a la primera página, como _leer_entero.
+    try:
+        return tuple(int(n) for n in request.args["cursor"].split("-"))
+    except (KeyError, ValueError):
+        return None
+
+
+def _resena_a_dict(indice, resena):
+    return {
+        "id": indice,
+        "usuario": resena.usuario.nombre,
+        "calificacion": resena.calificacion,
+        "comentario": resena.comentario,
+        "fecha": resena.fecha.isoformat(),
+        "votos_utiles": resena.votos_utiles,
+    }
+
+
+@app.route("/api/materiales/<int:material_id>/resenas")
+def api_resenas(material_id):
+    if "usuario_id" not in session:
+        return _json_compacto({"error": "Sesión requerida."}, 401)
+    material = biblioteca.buscar_material_por_id(material_id)
+    if not material:
+        return _json_compacto({"error": "El material no existe."}, 404)
+    orden = request.args.get("orden", "recientes")
+    if orden not in material.ORDENES_RESENAS:
+        return _json_compacto(
+            {
+                "error": f"Orden desconocido; use uno de: {', '.join(material.ORDENES_RESENAS)}."
+            },
+            400,
+        )
+    limite = _leer_entero("limite", RESENAS_POR_PAGINA, minimo=1, maximo=50)
+    (pagina, siguiente) = _pagina_resenas(
+        material, orden, _leer_cursor_resenas(), limite
+    )
+    return _json_compacto(
+        {
+            "total": material.total_resenas,
+            "promedio": material.promedio_calificacion,
+            "histograma": material.histograma_calificaciones,
+            "siguiente_cursor": siguiente,
+            "resultados": [_resena_a_dict(i, r) for i, r in pagina],
+        }
+    )
+
+
+@app.route("/resenas/<int:material_id>/<int:indice>/util", methods=["POST"])
+def marcar_resena_util(material_id, indice):
+    if "usuario_id" not in session:
+        return redirect(url_for("login"))
+    material = biblioteca.buscar_material_por_id(material_id)
+    if not material or not material.buscar_resena(indice):
+        return redirect(url_for("home"))
+    if ejecutar_operacion(
+        "marcar_resena_util", session["usuario_id"], material_id, indice
+    ):
+        flash("Gracias, tu voto ayuda a otros lectores.", "success")
+    else:
+        flash("Ya votaste esta reseña (o es tuya).", "error")
+    return redirect(
+        url_for(
+            "detalle_material",
+            material_id=material_id,
+            orden_resenas=request.form.get("orden_resenas", "recientes"),
+        )
+    )
+
+
 @app.route("/comentar/<int:material_id>", methods=["POST"])
 def comentar_material(material_id):
     if "usuario_id" not in session:
@@ -512,10 +1723,14 @@ def comentar_material(material_id):
     comentario = request.form.get("comentario")
 
     if calificacion and comentario:
-        nueva_resena = Resena(
-            usuario, int(calificacion), comentario, get_fecha_actual()
+        ejecutar_operacion(
+            "agregar_resena",
+            usuario.id,
+            material.id,
+            int(calificacion),
+            comentario,
+            get_fecha_actual(),
         )
-        material.agregar_resena(nueva_resena)
         flash("¡Gracias por tu opinión! Reseña agregada.", "success")
     else:
         flash("Debes asignar estrellas y un comentario.", "error")
@@ -531,9 +1746,10 @@ def prestar_material(material_id):
     material = biblioteca.buscar_material_por_id(material_id)
     if not usuario or not material:
         return redirect(url_for("home"))
-    (exito, mensaje) = biblioteca.realizar_prestamo(
-        usuario, material, get_fecha_actual()
+    (exito, mensaje) = ejecutar_operacion(
+        "prestar", usuario.id, material.id, get_fecha_actual()
     )
+    PRESTAMOS.incrementar("exito" if exito else "rechazado")
     flash(mensaje, "success" if exito else "error")
     return redirect(
         url_for("home")
@@ -546,9 +1762,26 @@ def prestar_material(material_id):
 def reservar_material(material_id):
     if "usuario_id" not in session:
         return redirect(url_for("login"))
-    usuario = biblioteca.buscar_usuario_por_id(session["usuario_id"])
-    material = biblioteca.buscar_material_por_id(material_id)
-    (exito, mensaje) = biblioteca.realizar_reserva(usuario, material)
+    if not biblioteca.buscar_material_por_id(material_id):
+        return redirect(url_for("home"))
+    (exito, mensaje) = ejecutar_operacion(
+        "reservar", session["usuario_id"], material_id
+    )
+    RESERVAS.incrementar("exito" if exito else "rechazado")
+    flash(mensaje, "success" if exito else "error")
+    return redirect(url_for("detalle_material", material_id=material_id))
+
+
+@app.route("/reservas/<int:material_id>/retirar", methods=["POST"])
+def retirar_reserva(material_id):
+    if "usuario_id" not in session:
+        return redirect(url_for("login"))
+    if not biblioteca.buscar_material_por_id(material_id):
+        return redirect(url_for("home"))
+    (exito, mensaje) = ejecutar_operacion(
+        "entregar_reserva", session["usuario_id"], material_id, get_fecha_actual()
+    )
+    PRESTAMOS.incrementar("exito" if exito else "rechazado")
     flash(mensaje, "success" if exito else "error")
     return redirect(url_for("detalle_material", material_id=material_id))
 
@@ -557,12 +1790,11 @@ def reservar_material(material_id):
 def renovar_prestamo(prestamo_id):
     if "usuario_id" not in session:
         return redirect(url_for("login"))
-    usuario = biblioteca.buscar_usuario_por_id(session["usuario_id"])
-    prestamo_a_renovar = next(
-        (p for p in usuario.prestamos if p.id == prestamo_id), None
+    resultado = ejecutar_operacion(
+        "renovar", session["usuario_id"], prestamo_id, get_fecha_actual()
     )
-    if prestamo_a_renovar:
-        (exito, mensaje) = prestamo_a_renovar.realizar_renovacion()
+    if resultado:
+        (exito, mensaje) = resultado
         flash(mensaje, "success" if exito else "error")
     return redirect(url_for("home", view="prestamos"))
 
@@ -571,17 +1803,18 @@ def renovar_prestamo(prestamo_id):
 def pagar_multa():
     if "usuario_id" not in session:
         return redirect(url_for("login"))
-    usuario = biblioteca.buscar_usuario_por_id(session["usuario_id"])
     metodo_pago = request.form.get("metodo_pago", "BCP")
-    notificaciones_reserva = []
-    for p in list(usuario.prestamos):
-        if isinstance(p.estado, PrestamoVencido):
-            nuevo_estado = PrestamoDevuelto(p)
-            p.cambiar_estado(nuevo_estado)
-            if nuevo_estado.notificacion:
-                notificaciones_reserva.append(nuevo_estado.notificacion)
+    avisos = ejecutar_operacion(
+        "pagar_multas", session["usuario_id"], get_fecha_actual()
+    )
+    for _, usuario_id, material_id in avisos:
+        if usuario_id is not None:
+            avisar_reserva_disponible(
+                biblioteca.buscar_usuario_por_id(usuario_id),
+                biblioteca.buscar_material_por_id(material_id),
+            )
     flash(f"¡Pago simulado con {metodo_pago} exitoso! Multas saldadas.", "success")
-    for notif in notificaciones_reserva:
+    for notif, _, _ in avisos:
         flash(notif, "info")
     return redirect(url_for("home", view="prestamos"))
 
@@ -597,75 +1830,67 @@ def admin_agregar_material():
     total_unidades = int(request.form.get("unidades") or 1)
     descripcion = request.form.get("descripcion") or f"Nuevo material ({tipo_material})"
     materia = request.form.get("materia") or "General"
-    portada_input = request.form.get("portada_url")
-    portada = (
-        portada_input.strip()
-        if portada_input and portada_input.strip()
-        else f"https://placehold.co/300x400/5a0000/ffffff?text={titulo.replace(' ', '+')}"
-    )
+    # Un archivo subido se ingiere al momento; una URL externa se guarda como
+    # origen para `flask descargar-portadas`. Sin ninguna de las dos se
+    # muestra la portada generada localmente.
+    portada = (request.form.get("portada_url") or "").strip()
+    archivo = request.files.get("portada_archivo")
+    if archivo and archivo.filename:
+        if not almacen_portadas.puede_redimensionar:
+            flash("No se pueden procesar imágenes en este servidor.", "error")
+            return redirect(url_for("home", view="admin"))
+        try:
+            portada = almacen_portadas.url_local(
+                almacen_portadas.ingerir(archivo.read())
+            )
+        except (OSError, ValueError):
+            flash("La portada no es una imagen válida.", "error")
+            return redirect(url_for("home", view="admin"))
 
-    nuevo_id = random.randint(200, 9999)
-    nuevo_material = None
+    campos = dict(
+        id=random.randint(200, 9999),
+        titulo=titulo,
+        autor=autor,
+        descripcion=descripcion,
+        portada_url=portada,
+        materia=materia,
+    )
     if tipo_material == "libro":
-        nuevo_material = Libro(
-            id=nuevo_id,
-            titulo=titulo,
-            autor=autor,
+        campos.update(
             año_publicacion=año,
-            descripcion=descripcion,
-            portada_url=portada,
             editorial=request.form.get("editorial", "Genérica"),
-            materia=materia,
             total_unidades=total_unidades,
             isbn=request.form.get("isbn", "S/N"),
         )
     elif tipo_material == "revista":
-        nuevo_material = Revista(
-            id=nuevo_id,
-            titulo=titulo,
-            autor=autor,
+        campos.update(
             año_publicacion=año,
-            descripcion=descripcion,
-            portada_url=portada,
             numero_edicion=int(request.form.get("numero_edicion", 1)),
-            materia=materia,
             total_unidades=total_unidades,
             issn=request.form.get("issn", "S/N"),
         )
     elif tipo_material == "tesis":
-        nuevo_material = Tesis(
-            id=nuevo_id,
-            titulo=titulo,
-            autor=autor,
+        campos.update(
             año_defensa=año,
-            descripcion=descripcion,
-            portada_url=portada,
             universidad=request.form.get("universidad", "Uni"),
-            materia=materia,
             total_unidades=total_unidades,
         )
     elif tipo_material == "digital":
-        nuevo_material = MaterialDigital(
-            id=nuevo_id,
-            titulo=titulo,
-            autor=autor,
-            año_publicacion=año,
-            descripcion=descripcion,
-            portada_url=portada,
-            formato=request.form.get("formato", "PDF"),
-            materia=materia,
+        campos.update(año_publicacion=año, formato=request.form.get("formato", "PDF"))
+
+    if tipo_material in CLASES_POR_TIPO:
+        # Códigos de barras de las copias físicas (separados por comas o
+        # saltos de línea); sin ellos se generan <id>-001, <id>-002...
+        codigos = request.form.get("codigos", "").replace(",", " ").split()
+        ubicacion = request.form.get("ubicacion", "").strip() or UBICACION_POR_DEFECTO
+        repetidos = [c for c in codigos if biblioteca.buscar_ejemplar_por_codigo(c)]
+        ejecutar_operacion(
+            "agregar_material", tipo_material, campos, codigos, ubicacion
         )
-
-    if nuevo_material:
-        biblioteca.agregar_material(nuevo_material)
         flash(f"'{titulo}' añadido con éxito.", "success")
-        global todos_los_materiales, tfidf_matrix, cosine_sim_matrix, id_a_indice
-        todos_los_materiales = biblioteca.catalogo.buscar()
-        documentos = [crear_documento_material(m) for m in todos_los_materiales]
-        if documentos:
-            tfidf_matrix = tfidf_vectorizer.fit_transform(documentos)
-            cosine_sim_matrix = cosine_similarity(tfidf_matrix, tfidf_matrix)
-            id_a_indice = {m.id: i for i, m in enumerate(todos_los_materiales)}
+        if repetidos:
+            flash(f"Códigos ya registrados, omitidos: {', '.join(repetidos)}", "error")
+        reconstruir_recomendaciones()
     return redirect(url_for("home", view="admin"))
 
 
@@ -673,13 +1898,256 @@ def admin_agregar_material():
 def admin_retirar_material(material_id):
     if session.get("rol") != "Administrativo":
         return redirect(url_for("home"))
-    (exito, mensaje) = biblioteca.retirar_material(material_id)
+    (exito, mensaje) = ejecutar_operacion("retirar_material", material_id)
     flash(mensaje, "success" if exito else "error")
     if "material" in request.referrer:
         return redirect(url_for("home"))
     return redirect(url_for("home", view="admin"))
 
 
+# --- API DE MOSTRADOR: PRÉSTAMOS Y DEVOLUCIONES EN LOTE ---
+def _procesar_lote_circulacion(operacion, despues):
+    # `despues` recibe los resultados del modelo ya confirmados, para
+    # métricas y avisos (que no se reproducen en los otros workers).
+    if session.get("rol") != "Administrativo":
+        return (
+            jsonify(
+                {"error": "Solo el personal administrativo puede operar el mostrador."}
+            ),
+            403,
+        )
+    datos = request.get_json(silent=True) or {}
+    try:
+        usuario_id = int(datos.get("usuario_id"))
+        ids_materiales = [int(i) for i in datos.get("materiales", [])]
+        codigos = [str(c) for c in datos.get("codigos", [])]
+    except (TypeError, ValueError):
+        return (
+            jsonify(
+                {
+                    "error": "Se requiere 'usuario_id' y una lista 'materiales' de ids o 'codigos' de barras."
+                }
+            ),
+            400,
+        )
+    if not ids_materiales and not codigos:
+        return jsonify({"error": "No se indicaron materiales ni códigos."}), 400
+
+    usuario = biblioteca.buscar_usuario_por_id(usuario_id)
+    if not usuario:
+        return jsonify({"error": "El usuario no existe."}), 404
+
+    # Los códigos del escáner se resuelven por el índice de ejemplares,
+    # sin tocar la búsqueda del catálogo.
+    alineados = ejecutar_operacion(
+        operacion, usuario_id, ids_materiales, codigos, get_fecha_actual()
+    )
+    despues([r for _, r in alineados if r is not None])
+    resultados = []
+    for clave, resultado in alineados:
+        if resultado is None:
+            resultados.append(
+                {
+                    "codigo_barras" if isinstance(clave, str) else "material_id": clave,
+                    "exito": False,
+                    "mensaje": "El material no existe.",
+                }
+            )
+            continue
+        if "fecha_vencimiento" in resultado:
+            resultado["fecha_vencimiento"] = resultado["fecha_vencimiento"].isoformat()
+        resultados.append(resultado)
+
+    return jsonify(
+        {
+            "usuario_id": usuario.id,
+            "procesados": sum(1 for r in resultados if r["exito"]),
+            "resultados": resultados,
+        }
+    )
+
+
+@app.route("/api/circulacion/prestamos", methods=["POST"])
+def api_prestamos_lote():
+    def contar(resultados):
+        for resultado in resultados:
+            PRESTAMOS.incrementar("exito" if resultado["exito"] else "rechazado")
+
+    return _procesar_lote_circulacion("prestar_lote", contar)
+
+
+@app.route("/api/circulacion/devoluciones", methods=["POST"])
+def api_devoluciones_lote():
+    def avisar(resultados):
+        for resultado in resultados:
+            if resultado.get("reservado_para"):
+                avisar_reserva_disponible(
+                    biblioteca.buscar_usuario_por_id(resultado["reservado_para"]),
+                    biblioteca.buscar_material_por_id(resultado["material_id"]),
+                )
+
+    return _procesar_lote_circulacion("devolver_lote", avisar)
+
+
+def _ejemplar_a_dict(ejemplar):
+    return {
+        "codigo_barras": ejemplar.codigo_barras,
+        "ubicacion": ejemplar.ubicacion,
+        "estado": ejemplar.estado,
+        "material_id": ejemplar.material.id,
+        "titulo": ejemplar.material.titulo,
+    }
+
+
+@app.route("/api/ejemplares/<codigo>")
+def api_ejemplar(codigo):
+    if session.get("rol") != "Administrativo":
+        return jsonify({"error": "No autorizado."}), 403
+    ejemplar = biblioteca.buscar_ejemplar_por_codigo(codigo)
+    if not ejemplar:
+        return jsonify({"error": "Código de barras desconocido."}), 404
+    return jsonify(_ejemplar_a_dict(ejemplar))
+
+
+def _registrar_ejemplar(material_id, codigo_barras, ubicacion):
+    # Devuelve (ejemplar, error); el código debe ser único en todo el catálogo.
+    material = biblioteca.buscar_material_por_id(material_id)
+    if not material:
+        return (None, "El material no existe.")
+    if isinstance(material, MaterialDigital):
+        return (None, "Los materiales digitales no tienen ejemplares físicos.")
+    if not codigo_barras:
+        return (None, "Indica el código de barras del ejemplar.")
+    ejemplar = ejecutar_operacion(
+        "registrar_ejemplar",
+        material_id,
+        codigo_barras,
+        ubicacion or UBICACION_POR_DEFECTO,
+    )
+    if ejemplar is None:
+        return (None, f"El código {codigo_barras} ya está registrado.")
+    return (ejemplar, "")
+
+
+@app.route("/api/ejemplares", methods=["POST"])
+def api_registrar_ejemplar():
+    if session.get("rol") != "Administrativo":
+        return jsonify({"error": "No autorizado."}), 403
+    datos = request.get_json(silent=True) or {}
+    try:
+        material_id = int(datos.get("material_id"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Se requiere 'material_id'."}), 400
+    codigo_barras = str(datos.get("codigo_barras") or "").strip()
+    if not codigo_barras:
+        return jsonify({"error": "Se requiere 'codigo_barras'."}), 400
+    if not biblioteca.buscar_material_por_id(material_id):
+        return jsonify({"error": "El material no existe."}), 404
+    (ejemplar, error) = _registrar_ejemplar(
+        material_id, codigo_barras, str(datos.get("ubicacion") or "").strip()
+    )
+    if ejemplar is None:
+        return jsonify({"error": error}), 409
+    return jsonify(_ejemplar_a_dict(ejemplar)), 201
+
+
+@app.route("/admin/ejemplares/<int:material_id>", methods=["POST"])
+def admin_registrar_ejemplar(material_id):
+    if session.get("rol") != "Administrativo":
+        return redirect(url_for("home"))
+    (ejemplar, error) = _registrar_ejemplar(
+        material_id,
+        request.form.get("codigo_barras", "").strip(),
+        request.form.get("ubicacion", "").strip(),
+    )
+    if ejemplar is None:
+        flash(error, "error")
+    else:
+        flash(f"Ejemplar {ejemplar.codigo_barras} registrado.", "success")
+    return redirect(url_for("detalle_material", material_id=material_id))
+
+
+@app.route("/api/circulacion/resumen")
+def api_resumen_circulacion():
+    # Serie diaria de los resúmenes pre-agregados (por tipo, materia y rol).
+    if session.get("rol") != "Administrativo":
+        return jsonify({"error": "No autorizado."}), 403
+    dias = _leer_entero("dias", DIAS_TENDENCIA, 1, 3660)
+    hoy = get_fecha_actual()
+    serie = biblioteca.resumenes.serie(hoy - timedelta(days=dias - 1), hoy)
+    return _json_compacto(
+        {
+            "desde": serie[0][0].isoformat(),
+            "hasta": hoy.isoformat(),
+            "dias": [
+                {
+                    "fecha": fecha.isoformat(),
+                    "prestamos": r.prestamos,
+                    "renovaciones": r.renovaciones,
+                    "devoluciones": r.devoluciones,
+                    "vencimientos": r.vencimientos,
+                    "multas": r.multas,
+                    "por_tipo": dict(r.por_tipo),
+                    "por_materia": dict(r.por_materia),
+                    "por_rol": dict(r.por_rol),
+                }
+                for fecha, r in serie
+            ],
+        }
+    )
+
+
+# --- RECORDATORIOS DE VENCIMIENTO ---
+@app.route("/admin/recordatorios", methods=["POST"])
+def admin_enviar_recordatorios():
+    # Usa la fecha simulada de la sesión, así se puede probar con el simulador.
+    if session.get("rol") != "Administrativo":
+        return redirect(url_for("home"))
+    dias = request.form.get("dias", DIAS_AVISO, type=int)
+    hoy = get_fecha_actual()
+    vencer_atrasados(hoy)
+    avisados = enviar_recordatorios(biblioteca, despachador, hoy, dias)
+    flash(f"Recordatorios encolados para {avisados} usuario(s).", "success")
+    return redirect(url_for("home", view="admin"))
+
+
+# Con BIBLIOTECA_RECORDATORIOS_DIARIOS=1 este proceso los envía una vez al
+# día (activarlo en un solo worker, o usar el comando con cron).
+def _tarea_recordatorios():
+    ultimo_dia = None
+    while True:
+        hoy = get_fecha_actual()
+        if hoy != ultimo_dia:
+            try:
+                vencer_atrasados(hoy)
+                enviar_recordatorios(biblioteca, despachador, hoy)
+                ultimo_dia = hoy
+            except Exception:
+                app.logger.exception("No se pudieron enviar los recordatorios")
+        time.sleep(3600)
+
+
+if os.environ.get("BIBLIOTECA_RECORDATORIOS_DIARIOS") == "1":
+    threading.Thread(
+        target=_tarea_recordatorios, name="recordatorios", daemon=True
+    ).start()
+
+
+@app.cli.command(
+    "enviar-recordatorios",
+    help="Encola recordatorios de préstamos vencidos o por vencer (para cron).",
+)
+@click.option("--dias", default=DIAS_AVISO, show_default=True)
+@click.option("--fecha", default=None, help="Fecha AAAA-MM-DD (por defecto, hoy).")
+def enviar_recordatorios_cli(dias, fecha):
+    fecha_actual = date.fromisoformat(fecha) if fecha else get_fecha_actual()
+    vencidos = vencer_atrasados(fecha_actual)
+    avisados = enviar_recordatorios(biblioteca, despachador, fecha_actual, dias)
+    despachador.detener()
+    print(f"Préstamos marcados como vencidos: {vencidos}.")
+    print(f"Recordatorios enviados a {avisados} usuario(s).")
+
+
 @app.route("/debug/avanzar-tiempo", methods=["POST"])
 def avanzar_tiempo():
     session["time_offset"] = session.get("time_offset", 0) + int(
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.fabrica import crear_material, crear_usuario
+from models import Administrativo, PrestamoDevuelto
+
+# === PRUEBA DE CARGA DE RUTAS (usuarios virtuales) ===
+#   python -m benchmarks.carga --materiales 20000 --usuarios 5000 --vus 16
+# Levanta la app en el mismo proceso, amplía el catálogo y los usuarios con
+# datos sintéticos y lanza hilos que recorren las rutas como lo haría una
+# persona: estudiantes (login -> inicio -> buscar -> detalle -> prestar ->
+# renovar) y administrativos (dashboard). Reporta p50/p95/p99 y peticiones
+# por segundo por ruta. Todo cambio de estado pasa por las rutas de la app
+# (y por lo tanto por ejecutar_operacion y el registro de operaciones).
+# Los hilos comparten el GIL con la app: las latencias incluyen esa
+# contención y no equivalen a las de un servidor con varios workers.
+
+PALABRAS_BUSQUEDA = ["avanzado", "datos", "fundamentos", "química", "redes", "teoría"]
+ID_INICIAL = 1000
+
+
+def percentil(ordenados, q: float) -> float:
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, round(q / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Registro:
+    def __init__(self):
+        self._latencias = defaultdict(list)
+        self._errores = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def medir(self, ruta: str, peticion):
+        # Las páginas llegan en streaming: se lee el cuerpo completo, como lo
+        # haría el navegador, antes de cortar el reloj.
+        inicio = time.perf_counter()
+        respuesta = peticion()
+        respuesta.get_data()
+        respuesta.close()
+        duracion = time.perf_counter() - inicio
+        with self._lock:
+            self._latencias[ruta].append(duracion)
+            if respuesta.status_code >= 500:
+                self._errores[ruta] += 1
+        return respuesta
+
+    def resumen(self, segundos: float) -> dict:
+        filas = {}
+        for ruta, latencias in sorted(self._latencias.items()):
+            ordenadas = sorted(latencias)
+            filas[ruta] = {
+                "peticiones": len(ordenadas),
+                "errores": self._errores[ruta],
+                "rps": round(len(ordenadas) / segundos, 1),
+                "p50_ms": round(percentil(ordenadas, 50) * 1000, 2),
+                "p95_ms": round(percentil(ordenadas, 95) * 1000, 2),
+                "p99_ms": round(percentil(ordenadas, 99) * 1000, 2),
+            }
+        return filas
+
+
+def poblar(modulo_app, n_materiales: int, n_usuarios: int, n_admins: int, semilla=0):
+    # Los ids sintéticos empiezan en ID_INICIAL para no chocar con los de ejemplo.
+    rng = random.Random(semilla)
+    biblioteca = modulo_app.biblioteca
+    for i in range(ID_INICIAL, ID_INICIAL + n_materiales):
+        biblioteca.agregar_material(crear_material(rng, i))
+    estudiantes = [crear_usuario(i) for i in range(ID_INICIAL, ID_INICIAL + n_usuarios)]
+    admins = [
+        Administrativo(i, f"Admin {i}", f"a{i}@uni.edu", "Sistemas")
+        for i in range(ID_INICIAL + n_usuarios, ID_INICIAL + n_usuarios + n_admins)
+    ]
+    for u in estudiantes + admins:
+        biblioteca.agregar_usuario(u)
+    modulo_app.reconstruir_recomendaciones()
+    ids = [m.id for m in biblioteca.catalogo.buscar()]
+    return estudiantes, admins, ids
+
+
+def recorrido_estudiante(app, registro, usuario, admin, ids, fin, rng):
+    cliente = app.test_client()
+    registro.medir(
+        "POST /login",
+        lambda: cliente.post(
+            "/login", data={"correo": usuario.correo, "password": "123"}
+        ),
+    )
+    # Las devoluciones se registran en el mostrador, con sesión de admin.
+    mostrador = app.test_client()
+    mostrador.post("/login", data={"correo": admin.correo, "password": "123"})
+    while time.monotonic() < fin:
+        registro.medir("GET /", lambda: cliente.get("/"))
+        palabra = rng.choice(PALABRAS_BUSQUEDA)
+        registro.medir(
+            "POST /buscar", lambda: cliente.post("/buscar", data={"palabra": palabra})
+        )
+        material_id = rng.choice(ids)
+        registro.medir(
+            "GET /material/<id>", lambda: cliente.get(f"/material/{material_id}")
+        )
+        registro.medir(
+            "POST /prestar/<id>", lambda: cliente.post(f"/prestar/{material_id}")
+        )
+        abiertos = [
+            p for p in usuario.prestamos if not isinstance(p.estado, PrestamoDevuelto)
+        ]
+        if abiertos:
+            prestamo = abiertos[-1]
+            registro.medir(
+                "POST /renovar/<id>", lambda: cliente.post(f"/renovar/{prestamo.id}")
+            )
+        # Se devuelven los préstamos más antiguos para que el usuario no
+        # quede trabado en su límite.
+        if len(abiertos) > 2:
+            devolver = [p.material.id for p in abiertos[:-2]]
+            registro.medir(
+                "POST /api/circulacion/devoluciones",
+                lambda: mostrador.post(
+                    "/api/circulacion/devoluciones",
+                    json={"usuario_id": usuario.id, "materiales": devolver},
+                ),
+            )
+
+
+def recorrido_admin(app, registro, usuario, fin):
+    cliente = app.test_client()
+    registro.medir(
+        "POST /login",
+        lambda: cliente.post(
+            "/login", data={"correo": usuario.correo, "password": "123"}
+        ),
+    )
+    while time.monotonic() < fin:
+        registro.medir("GET /?view=admin", lambda: cliente.get("/?view=admin"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de las rutas Flask")
+    parser.add_argument("--materiales", type=int, default=2000)
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--vus", type=int, default=8, help="estudiantes virtuales")
+    parser.add_argument("--admins", type=int, default=1, help="admins virtuales")
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    # Artefactos de recomendación en un directorio temporal y sin tareas de
+    # fondo que compitan con la medición.
+    os.environ.setdefault("BIBLIOTECA_ARTEFACTOS", tempfile.mkdtemp())
+    os.environ.setdefault("BIBLIOTECA_INTERVALO_COLABORATIVO", "0")
+    os.environ.setdefault("BIBLIOTECA_NOTIFICACIONES", os.devnull)
+    import app as modulo_app
+
+    inicio = time.perf_counter()
+    estudiantes, admins, ids = poblar(
+        modulo_app, args.materiales, args.usuarios, max(args.admins, 1), args.semilla
+    )
+    print(
+        f"Catálogo: {len(ids)} materiales, {len(modulo_app.biblioteca.usuarios)} "
+        f"usuarios ({time.perf_counter() - inicio:.1f} s de preparación)",
+        file=sys.stderr,
+    )
+
+    registro = Registro()
+    fin = time.monotonic() + args.segundos
+    rng = random.Random(args.semilla)
+    hilos = [
+        threading.Thread(
+            target=recorrido_estudiante,
+            args=(
+                modulo_app.app,
+                registro,
+                estudiantes[i % len(estudiantes)],
+                admins[i % len(admins)],
+                ids,
+                fin,
+                random.Random(rng.random()),
+            ),
+        )
+        for i in range(args.vus)
+    ] + [
+        threading.Thread(
+            target=recorrido_admin,
+            args=(modulo_app.app, registro, admins[i % len(admins)], fin),
+        )
+        for i in range(args.admins)
+    ]
+    reloj = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    segundos = time.perf_counter() - reloj
+
+    filas = registro.resumen(segundos)
+    print(
+        f"{'ruta':34s} {'n':>7s} {'err':>5s} {'rps':>8s} "
+        f"{'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}"
+    )
+    for ruta, f in filas.items():
+        print(
+            f"{ruta:34s} {f['peticiones']:7d} {f['errores']:5d} {f['rps']:8.1f} "
+            f"{f['p50_ms']:9.2f} {f['p95_ms']:9.2f} {f['p99_ms']:9.2f}"
+        )
+    total = sum(f["peticiones"] for f in filas.values())
+    print(f"Total: {total} peticiones en {segundos:.1f} s ({total / segundos:.1f} rps)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(
+                {
+                    "parametros": vars(args),
+                    "segundos": round(segundos, 2),
+                    "rutas": filas,
+                },
+                archivo,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
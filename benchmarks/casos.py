@@ -0,0 +1,142 @@
+import itertools
+import random
+from datetime import date
+
+from models import Biblioteca, Estudiante, Libro, Resena
+
+# === CASOS DE BENCHMARK ===
+# Cada caso recibe la Biblioteca sintética y devuelve la operación a medir
+# (una función sin argumentos). La preparación no entra en la medición.
+
+CASOS = {}
+
+
+def caso(nombre: str):
+    def registrar(preparar):
+        CASOS[nombre] = preparar
+        return preparar
+
+    return registrar
+
+
+def _libros(biblioteca: Biblioteca):
+    return [m for m in biblioteca.catalogo.buscar() if isinstance(m, Libro)]
+
+
+@caso("catalogo.buscar_titulo")
+def _buscar_titulo(biblioteca, rng):
+    return lambda: biblioteca.catalogo.buscar(titulo="avanzado")
+
+
+@caso("catalogo.buscar_filtros")
+def _buscar_filtros(biblioteca, rng):
+    return lambda: biblioteca.catalogo.buscar(materia="Ciencias", tipo_material="Libro")
+
+
+@caso("catalogo.buscar_tolerante")
+def _buscar_tolerante(biblioteca, rng):
+    return lambda: biblioteca.catalogo.buscar(titulo="calclo avanzdo", tolerante=True)
+
+
+@caso("catalogo.sugerir")
+def _sugerir(biblioteca, rng):
+    return lambda: biblioteca.catalogo.sugerir("fundam")
+
+
+@caso("catalogo.explorar_recientes")
+def _explorar_recientes(biblioteca, rng):
+    return lambda: biblioteca.catalogo.explorar(
+        "año", materia="Ciencias", tipo_material="Libro", año_desde=2020
+    )
+
+
+@caso("catalogo.explorar_mejor_valorados")
+def _explorar_valorados(biblioteca, rng):
+    return lambda: biblioteca.catalogo.explorar("calificacion", desplazamiento=100)
+
+
+@caso("catalogo.buscar_por_id")
+def _buscar_por_id(biblioteca, rng):
+    ids = [m.id for m in biblioteca.catalogo.buscar()]
+    siguiente = itertools.cycle(rng.sample(ids, min(len(ids), 10_000))).__next__
+    return lambda: biblioteca.catalogo.buscar_por_id(siguiente())
+
+
+@caso("biblioteca.verificar_aptitud_prestamo")
+def _verificar_aptitud(biblioteca, rng):
+    pares = [
+        (rng.choice(biblioteca.usuarios), rng.choice(_libros(biblioteca)))
+        for _ in range(1000)
+    ]
+    siguiente = itertools.cycle(pares).__next__
+
+    def operacion():
+        usuario, material = siguiente()
+        biblioteca.verificar_aptitud_prestamo(usuario, material)
+
+    return operacion
+
+
+@caso("biblioteca.realizar_prestamo")
+def _realizar_prestamo(biblioteca, rng):
+    # Préstamo y devolución inmediata para no agotar stock ni límites. Cada
+    # llamada usa un estudiante nuevo: repetir los mismos usuarios alarga su
+    # historial y la aptitud se encarecería con cada iteración.
+    ids = itertools.count(10**9)
+    material = Libro(
+        10**9, "Libro de carga", "Autor", 2024, "", "", "Editorial", "Ciencias", 50
+    )
+    biblioteca.agregar_material(material)
+    hoy = date.today()
+
+    def operacion():
+        i = next(ids)
+        usuario = Estudiante(i, f"Carga {i}", f"carga{i}@uni.edu", "Ingeniería", 1)
+        biblioteca.agregar_usuario(usuario)
+        biblioteca.realizar_prestamo(usuario, material, hoy)
+        usuario.prestamos[-1].devolver(hoy)
+
+    return operacion
+
+
+@caso("material.promedio_calificacion")
+def _promedio(biblioteca, rng):
+    material = _libros(biblioteca)[0]
+    for _ in range(1000):
+        material.agregar_resena(
+            Resena(rng.choice(biblioteca.usuarios), rng.randint(1, 5), "", date.today())
+        )
+    return lambda: material.promedio_calificacion
+
+
+@caso("reservas.encolar_y_atender")
+def _encolar(biblioteca, rng):
+    # Cola de 1000 usuarios: se encola uno al final y se atiende el primero.
+    material = _libros(biblioteca)[1]
+    usuarios = rng.sample(biblioteca.usuarios, min(1000, len(biblioteca.usuarios)))
+    for u in usuarios:
+        material.agregar_reserva(u)
+
+    def operacion():
+        material.agregar_reserva(material.obtener_siguiente_reserva())
+
+    return operacion
+
+
+@caso("reservas.posicion")
+def _posicion(biblioteca, rng):
+    material = _libros(biblioteca)[2]
+    usuarios = rng.sample(biblioteca.usuarios, min(1000, len(biblioteca.usuarios)))
+    for u in usuarios:
+        material.agregar_reserva(u)
+    ultimo = usuarios[-1]
+    return lambda: material.obtener_posicion_reserva(ultimo)
+
+
+def preparar_casos(biblioteca: Biblioteca, nombres=None, semilla: int = 0):
+    rng = random.Random(semilla)
+    return {
+        nombre: preparar(biblioteca, rng)
+        for nombre, preparar in CASOS.items()
+        if not nombres or nombre in nombres
+    }
@@ -0,0 +1,184 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from benchmarks.casos import CASOS, preparar_casos
+from benchmarks.fabrica import ESCALAS, crear_biblioteca
+
+# === EJECUTOR DE BENCHMARKS ===
+#   python -m benchmarks.ejecutar --escala 100k              # medir y comparar
+#   python -m benchmarks.ejecutar --escala 100k --guardar    # fijar referencia
+# Las referencias viven en benchmarks/referencias/<escala>.json. Cada muestra
+# corre en un proceso nuevo (la disposición en memoria de un proceso puede
+# hacer un caso un 30 % más lento o más rápido) y mide también una carga fija
+# de calibración, así los casos se comparan en unidades de esa calibración y
+# la referencia vale en otra máquina o con otra carga de fondo. Un caso cuya
+# mediana supera la referencia por más de la tolerancia más el ruido entre
+# procesos cuenta como regresión y el proceso termina con código 1.
+
+DIRECTORIO_REFERENCIAS = os.path.join(os.path.dirname(__file__), "referencias")
+_DATOS_CALIBRACION = [(i * 7919) % 10007 for i in range(10_000)]
+
+
+def calibracion():
+    # Diccionario, bucle y ordenamiento: el mismo tipo de trabajo que domina
+    # en models.py, sin depender de los datos sintéticos.
+    conteos = {}
+    for x in _DATOS_CALIBRACION:
+        conteos[x] = conteos.get(x, 0) + 1
+    return sorted(conteos)
+
+
+def medir(operacion, repeticiones: int = 5, tiempo_minimo: float = 0.2) -> float:
+    # Segundos por llamada: mínimo de varias rondas, cada una de al menos
+    # tiempo_minimo segundos (el mínimo es el menos afectado por ruido).
+    temporizador = timeit.Timer(operacion)
+    numero, _ = temporizador.autorange()
+    numero = max(1, int(numero * tiempo_minimo / 0.2))
+    return min(temporizador.repeat(repeticiones, numero)) / numero
+
+
+def medir_proceso(escala: str, nombres, repeticiones: int) -> tuple:
+    # Una muestra completa: datos, calibración y casos. La calibración se
+    # mide antes y después y se toma la más rápida, así una racha de carga
+    # en la máquina no la infla.
+    inicio = time.perf_counter()
+    biblioteca = crear_biblioteca(ESCALAS[escala])
+    print(
+        f"Datos {escala}: {len(biblioteca.catalogo.buscar())} materiales, "
+        f"{len(biblioteca.usuarios)} usuarios "
+        f"({time.perf_counter() - inicio:.1f} s de preparación)",
+        flush=True,
+    )
+    casos = preparar_casos(biblioteca, nombres)
+    antes = medir(calibracion, repeticiones)
+    segundos = {nombre: medir(op, repeticiones) for nombre, op in casos.items()}
+    despues = medir(calibracion, repeticiones)
+    return min(antes, despues), segundos
+
+
+def formatear(segundos: float) -> str:
+    for unidad, factor in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if segundos >= factor:
+            return f"{segundos / factor:8.2f} {unidad}"
+    return f"{segundos / 1e-9:8.1f} ns"
+
+
+def ruta_referencia(escala: str) -> str:
+    return os.path.join(DIRECTORIO_REFERENCIAS, f"{escala}.json")
+
+
+def cargar_referencia(escala: str) -> tuple:
+    # (casos, segundos de calibración); sin calibración guardada se compara
+    # en segundos absolutos.
+    try:
+        with open(ruta_referencia(escala), encoding="utf-8") as f:
+            datos = json.load(f)
+        return datos["casos"], datos.get("calibracion")
+    except (OSError, ValueError, KeyError):
+        return {}, None
+
+
+def guardar_referencia(escala: str, resultados: dict, segundos_calibracion: float):
+    os.makedirs(DIRECTORIO_REFERENCIAS, exist_ok=True)
+    with open(ruta_referencia(escala), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "maquina": platform.machine(),
+                "calibracion": segundos_calibracion,
+                "casos": resultados,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de models.py")
+    parser.add_argument("--escala", choices=list(ESCALAS), default="1k")
+    parser.add_argument("--casos", nargs="*", help=f"subconjunto de {list(CASOS)}")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=3,
+        help="muestras, cada una en un proceso nuevo (1 para la escala 1m)",
+    )
+    parser.add_argument("--guardar", action="store_true", help="fijar referencia")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=0.25,
+        help="lentitud relativa admitida frente a la referencia, además del ruido",
+    )
+    args = parser.parse_args()
+
+    # Procesos de a uno, para que las muestras no compitan por la CPU.
+    contexto = multiprocessing.get_context("spawn")
+    muestras = []
+    for _ in range(max(1, args.procesos)):
+        with ProcessPoolExecutor(1, mp_context=contexto) as ejecutor:
+            muestras.append(
+                ejecutor.submit(
+                    medir_proceso, args.escala, args.casos, args.repeticiones
+                ).result()
+            )
+
+    referencia, calibracion_referencia = cargar_referencia(args.escala)
+    segundos_calibracion = statistics.median(c for c, _ in muestras)
+    escala_maquina = 1.0
+    if calibracion_referencia:
+        escala_maquina = segundos_calibracion / calibracion_referencia
+    print(
+        f"{'calibración':40s} {formatear(segundos_calibracion)}"
+        f"   x{escala_maquina:5.2f} vs referencia"
+    )
+
+    resultados = {}
+    regresiones = []
+    for nombre in muestras[0][1]:
+        # Cada muestra en unidades de su propia calibración.
+        relativos = [casos[nombre] / c for c, casos in muestras]
+        mediana = statistics.median(relativos)
+        # Cuánto se aleja la mediana de la mejor muestra: un proceso atípico
+        # no mueve ni la mediana ni el mínimo.
+        ruido = mediana / min(relativos) - 1
+        segundos = mediana * segundos_calibracion
+        resultados[nombre] = segundos
+        linea = f"{nombre:40s} {formatear(segundos)}   ±{ruido:4.0%}"
+        if nombre in referencia:
+            relacion = segundos / (referencia[nombre] * escala_maquina)
+            linea += f"   x{relacion:5.2f} vs referencia"
+            if relacion > 1 + args.tolerancia + ruido:
+                linea += "   REGRESIÓN"
+                regresiones.append(nombre)
+        print(linea, flush=True)
+
+    if args.guardar:
+        # Los casos no medidos en esta corrida se pasan a la nueva calibración.
+        anteriores = {
+            nombre: segundos * escala_maquina for nombre, segundos in referencia.items()
+        }
+        guardar_referencia(
+            args.escala, {**anteriores, **resultados}, segundos_calibracion
+        )
+        print(f"Referencia guardada en {ruta_referencia(args.escala)}")
+    elif regresiones:
+        print(f"{len(regresiones)} regresión(es): {', '.join(regresiones)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
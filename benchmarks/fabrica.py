@@ -0,0 +1,129 @@
+import random
+from datetime import date, timedelta
+
+from models import (
+    Biblioteca,
+    Estudiante,
+    Libro,
+    MaterialDigital,
+    Prestamo,
+    Profesor,
+    Resena,
+    Revista,
+    Tesis,
+)
+
+# === FÁBRICA DE DATOS SINTÉTICOS ===
+# Genera una Biblioteca reproducible (misma semilla, mismos datos) para los
+# benchmarks. El vocabulario de títulos es acotado, como en un catálogo real,
+# para que los índices de búsqueda crezcan de forma realista.
+
+ESCALAS = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+MATERIAS = ["Programación", "Matemáticas", "Ciencias", "Medicina", "Derecho"]
+PALABRAS = [
+    "introducción",
+    "cálculo",
+    "avanzado",
+    "fundamentos",
+    "teoría",
+    "práctica",
+    "sistemas",
+    "redes",
+    "datos",
+    "química",
+    "física",
+    "biología",
+    "historia",
+    "análisis",
+    "diseño",
+    "métodos",
+    "aplicada",
+    "general",
+    "moderna",
+    "clínica",
+]
+
+
+def _titulo(rng: random.Random, i: int) -> str:
+    return " ".join(rng.sample(PALABRAS, 3)).capitalize() + f" {i}"
+
+
+def crear_material(rng: random.Random, i: int):
+    materia = MATERIAS[i % len(MATERIAS)]
+    comunes = dict(
+        id=i,
+        titulo=_titulo(rng, i),
+        autor=f"Autor {rng.randrange(max(1, i // 20 + 1))}",
+        descripcion=f"Texto sintético de {materia}",
+        portada_url="",
+        materia=materia,
+    )
+    tipo = i % 10
+    if tipo < 6:
+        return Libro(
+            año_publicacion=2000 + i % 25,
+            editorial="Editorial",
+            total_unidades=1 + i % 5,
+            **comunes,
+        )
+    if tipo < 8:
+        return Revista(
+            año_publicacion=2010 + i % 15,
+            numero_edicion=1 + i % 12,
+            total_unidades=1 + i % 3,
+            **comunes,
+        )
+    if tipo < 9:
+        return Tesis(
+            año_defensa=2005 + i % 20,
+            universidad="Universidad",
+            total_unidades=1,
+            **comunes,
+        )
+    return MaterialDigital(año_publicacion=2020, formato="PDF", **comunes)
+
+
+def crear_usuario(i: int):
+    if i % 20 == 0:
+        return Profesor(i, f"Profesor {i}", f"p{i}@uni.edu", "Ciencias", "Tiempo")
+    return Estudiante(i, f"Estudiante {i}", f"e{i}@uni.edu", "Ingeniería", 1 + i % 10)
+
+
+def crear_biblioteca(
+    n_materiales: int,
+    n_usuarios: int | None = None,
+    prestamos_por_usuario: int = 3,
+    resenas_por_material: int = 2,
+    semilla: int = 0,
+) -> Biblioteca:
+    # Por defecto un usuario cada dos materiales; cada usuario con algunos
+    # préstamos (la mitad ya devueltos) y cada material con algunas reseñas.
+    rng = random.Random(semilla)
+    n_usuarios = n_usuarios if n_usuarios is not None else max(1, n_materiales // 2)
+    biblioteca = Biblioteca()
+    materiales = [crear_material(rng, i) for i in range(1, n_materiales + 1)]
+    for m in materiales:
+        biblioteca.agregar_material(m)
+    usuarios = [crear_usuario(i) for i in range(1, n_usuarios + 1)]
+    for u in usuarios:
+        biblioteca.agregar_usuario(u)
+
+    hoy = date.today()
+    for u in usuarios:
+        for _ in range(prestamos_por_usuario):
+            material = rng.choice(materiales)
+            if not material.esta_disponible:
+                continue
+            prestamo = Prestamo(u, material, hoy - timedelta(days=rng.randrange(60)))
+            u.agregar_prestamo(prestamo)
+            if rng.random() < 0.5:
+                prestamo.devolver(hoy)
+    for m in materiales:
+        for _ in range(resenas_por_material):
+            m.agregar_resena(Resena(rng.choice(usuarios), rng.randint(1, 5), "", hoy))
+    return biblioteca
@@ -0,0 +1,386 @@
+import heapq
+import math
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Callable, Iterable, Iterator, List
+
+# === ÍNDICES DE BÚSQUEDA DEL CATÁLOGO ===
+
+
+def normalizar(texto: str) -> str:
+    # Minúsculas y sin tildes: "Cálculo Avanzado" -> "calculo avanzado".
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.split())
+
+
+# Palabras que no inician una sugerencia por sí solas ("de", "la", ...).
+PALABRAS_VACIAS = {
+    "a",
+    "al",
+    "con",
+    "de",
+    "del",
+    "el",
+    "en",
+    "la",
+    "las",
+    "lo",
+    "los",
+    "para",
+    "por",
+    "un",
+    "una",
+    "y",
+}
+
+
+# --- AUTOCOMPLETADO: ARREGLO ORDENADO DE PREFIJOS ---
+class IndicePrefijos:
+    # Cada texto se indexa completo y a partir de cada palabra significativa,
+    # así "avan" sugiere "Cálculo Avanzado". Las claves viven en una lista
+    # ordenada de (clave, id): un prefijo es un rango contiguo que se ubica
+    # con bisect en O(log n). Las altas se acumulan y se ordenan de una vez
+    # en la siguiente consulta, así la carga masiva no paga un insort por clave.
+    # Consultas y altas llegan desde varios hilos: la lista, los pendientes y
+    # la caché se protegen con un lock.
+
+    MAX_INSERCIONES_SUELTAS = 64
+
+    def __init__(self, limite_escaneo: int = 2000, ttl_cache: float = 300.0):
+        self._claves: List[tuple] = []
+        self._pendientes: List[tuple] = []
+        self._limite_escaneo = limite_escaneo
+        self._ttl_cache = ttl_cache
+        # Prefijos muy comunes ("c", "p") abarcan demasiadas claves para
+        # rankearlas en cada tecla: su top se guarda unos segundos.
+        self._cache_prefijos: dict = {}
+        # Sube con cada alta o baja: un top calculado antes de un cambio no
+        # se guarda en la caché.
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado.pop("_lock", None)
+        estado["_cache_prefijos"] = {}
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _generar_claves(textos: Iterable[str]) -> set:
+        claves = set()
+        for texto in textos:
+            palabras = normalizar(texto).split()
+            for i, palabra in enumerate(palabras):
+                if i == 0 or palabra not in PALABRAS_VACIAS:
+                    claves.add(" ".join(palabras[i:]))
+        return claves
+
+    def _consolidar(self):
+        if not self._pendientes:
+            return
+        if len(self._pendientes) <= self.MAX_INSERCIONES_SUELTAS:
+            for entrada in self._pendientes:
+                insort(self._claves, entrada)
+        else:
+            self._claves = sorted(self._claves + self._pendientes)
+        self._pendientes = []
+
+    def agregar(self, item_id: int, textos: Iterable[str]):
+        claves = self._generar_claves(textos)
+        with self._lock:
+            for clave in claves:
+                self._pendientes.append((clave, item_id))
+            self._generacion += 1
+            self._cache_prefijos.clear()
+
+    def quitar(self, item_id: int, textos: Iterable[str]):
+        claves = self._generar_claves(textos)
+        with self._lock:
+            self._consolidar()
+            for clave in claves:
+                i = bisect_left(self._claves, (clave, item_id))
+                if i < len(self._claves) and self._claves[i] == (clave, item_id):
+                    del self._claves[i]
+            self._generacion += 1
+            self._cache_prefijos.clear()
+
+    def sugerir(
+        self, prefijo: str, puntuar: Callable[[int], float], limite: int = 10
+    ) -> List[int]:
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+        with self._lock:
+            self._consolidar()
+            inicio = bisect_left(self._claves, (prefijo,))
+            fin = bisect_left(self._claves, (prefijo + "\uffff",))
+            comun = fin - inicio > self._limite_escaneo
+            if comun:
+                en_cache = self._cache_prefijos.get(prefijo)
+                if (
+                    en_cache
+                    and en_cache[0] > time.monotonic()
+                    and en_cache[1] >= limite
+                ):
+                    return en_cache[2][:limite]
+            ids = {item_id for _, item_id in self._claves[inicio:fin]}
+            generacion = self._generacion
+
+        # El ranking corre fuera del lock: puntuar consulta otros objetos.
+        mejores = heapq.nlargest(limite, ids, key=puntuar)
+
+        if comun:
+            with self._lock:
+                if self._generacion == generacion:
+                    expira = time.monotonic() + self._ttl_cache
+                    self._cache_prefijos[prefijo] = (expira, limite, mejores)
+        return mejores
+
+    def __len__(self):
+        with self._lock:
+            return len(self._claves) + len(self._pendientes)
+
+
+# --- TOLERANCIA A ERRORES: DICCIONARIO DE BORRADOS (estilo SymSpell) ---
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    # Damerau-Levenshtein (transposiciones adyacentes); corta en cuanto
+    # la distancia supera el máximo y devuelve maximo + 1.
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior_previa = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        minimo_fila = actual[0]
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if (
+                anterior_previa is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                actual[j] = min(actual[j], anterior_previa[j - 2] + 1)
+            minimo_fila = min(minimo_fila, actual[j])
+        if minimo_fila > maximo:
+            return maximo + 1
+        anterior_previa, anterior = anterior, actual
+    return anterior[len(b)]
+
+
+def _borrados(palabra: str, distancia: int) -> set:
+    variantes = {palabra}
+    frontera = {palabra}
+    for _ in range(distancia):
+        siguiente = set()
+        for variante in frontera:
+            for i in range(len(variante)):
+                siguiente.add(variante[:i] + variante[i + 1 :])
+        variantes |= siguiente
+        frontera = siguiente
+    return variantes
+
+
+class IndiceDifuso:
+    # Cada palabra del vocabulario se registra bajo todas sus variantes con
+    # hasta MAX_DISTANCIA letras borradas. Una consulta genera sus propios
+    # borrados y solo compara contra las palabras que comparten alguno, en
+    # lugar de recorrer todos los títulos. Altas, bajas y búsquedas llegan
+    # desde varios hilos: los dos mapas se protegen con un lock.
+
+    MAX_DISTANCIA = 2
+
+    def __init__(self):
+        self._apariciones: dict[str, set] = {}
+        self._por_borrado: dict[str, set] = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado.pop("_lock", None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def tolerancia(palabra: str) -> int:
+        if len(palabra) <= 3:
+            return 0
+        if len(palabra) <= 6:
+            return 1
+        return IndiceDifuso.MAX_DISTANCIA
+
+    def agregar(self, item_id: int, texto: str):
+        with self._lock:
+            for palabra in set(normalizar(texto).split()):
+                if palabra not in self._apariciones:
+                    self._apariciones[palabra] = set()
+                    for variante in _borrados(palabra, self.MAX_DISTANCIA):
+                        self._por_borrado.setdefault(variante, set()).add(palabra)
+                self._apariciones[palabra].add(item_id)
+
+    def quitar(self, item_id: int, texto: str):
+        with self._lock:
+            for palabra in set(normalizar(texto).split()):
+                ids = self._apariciones.get(palabra)
+                if ids is None:
+                    continue
+                ids.discard(item_id)
+                if not ids:
+                    del self._apariciones[palabra]
+                    for variante in _borrados(palabra, self.MAX_DISTANCIA):
+                        palabras = self._por_borrado.get(variante)
+                        if palabras is not None:
+                            palabras.discard(palabra)
+                            if not palabras:
+                                del self._por_borrado[variante]
+
+    def palabras_similares(self, palabra: str) -> set:
+        maximo = self.tolerancia(palabra)
+        candidatas = set()
+        with self._lock:
+            for variante in _borrados(palabra, maximo):
+                candidatas |= self._por_borrado.get(variante, set())
+        return {
+            c for c in candidatas if distancia_edicion(palabra, c, maximo) <= maximo
+        }
+
+    def buscar(self, consulta: str) -> set:
+        # Todas las palabras significativas de la consulta deben coincidir.
+        palabras = [p for p in normalizar(consulta).split() if p not in PALABRAS_VACIAS]
+        resultado = None
+        with self._lock:
+            for palabra in palabras:
+                ids = set()
+                for similar in self.palabras_similares(palabra):
+                    ids |= self._apariciones[similar]
+                resultado = ids if resultado is None else resultado & ids
+                if not resultado:
+                    return set()
+        return resultado or set()
+
+
+# --- ÍNDICES ORDENADOS: RANGOS Y ORDEN SIN ESCANEAR EL CATÁLOGO ---
+class IndiceOrdenado:
+    # Lista ordenada de (clave, id) más el mapa id -> clave vigente. Un rango
+    # de claves se ubica con bisect en O(log n) y se recorre en cualquier
+    # sentido; un cambio de clave es un del + insort. Igual que en
+    # IndicePrefijos, las altas masivas se ordenan de una vez. Los préstamos
+    # actualizan claves desde varios hilos: la lista se protege con un lock.
+
+    MAX_INSERCIONES_SUELTAS = 64
+    TAMANO_BLOQUE = 256
+
+    def __init__(self):
+        self._entradas: List[tuple] = []
+        self._pendientes: List[tuple] = []
+        self._claves: dict = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado.pop("_lock", None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def _consolidar(self):
+        if not self._pendientes:
+            return
+        if len(self._pendientes) <= self.MAX_INSERCIONES_SUELTAS:
+            for entrada in self._pendientes:
+                insort(self._entradas, entrada)
+        else:
+            self._entradas = sorted(self._entradas + self._pendientes)
+        self._pendientes = []
+
+    def _quitar_entrada(self, item_id: int, clave):
+        i = bisect_left(self._entradas, (clave, item_id))
+        if i < len(self._entradas) and self._entradas[i] == (clave, item_id):
+            del self._entradas[i]
+
+    def agregar(self, item_id: int, clave):
+        with self._lock:
+            if item_id in self._claves:
+                self._consolidar()
+                self._quitar_entrada(item_id, self._claves[item_id])
+            self._claves[item_id] = clave
+            self._pendientes.append((clave, item_id))
+
+    def quitar(self, item_id: int):
+        with self._lock:
+            if item_id not in self._claves:
+                return
+            self._consolidar()
+            self._quitar_entrada(item_id, self._claves.pop(item_id))
+
+    def actualizar(self, item_id: int, clave):
+        # No hace nada si la clave no cambió (el caso común al prestar) o si
+        # otro hilo ya quitó el material.
+        with self._lock:
+            anterior = self._claves.get(item_id, clave)
+            if anterior == clave:
+                return
+            self._consolidar()
+            self._quitar_entrada(item_id, anterior)
+            self._claves[item_id] = clave
+            insort(self._entradas, (clave, item_id))
+
+    def clave(self, item_id: int):
+        return self._claves.get(item_id)
+
+    def _limites(self, desde, hasta) -> tuple:
+        inicio = 0 if desde is None else bisect_left(self._entradas, (desde,))
+        fin = (
+            len(self._entradas)
+            if hasta is None
+            else bisect_left(self._entradas, (hasta, math.inf))
+        )
+        return inicio, fin
+
+    def contar(self, desde=None, hasta=None) -> int:
+        with self._lock:
+            self._consolidar()
+            inicio, fin = self._limites(desde, hasta)
+            return max(0, fin - inicio)
+
+    def recorrer(self, desde=None, hasta=None, descendente=False) -> Iterator[int]:
+        # Ids con desde <= clave <= hasta, en orden. Se copian bloques cortos
+        # bajo el lock, así un recorrido largo no frena a los préstamos; si
+        # una clave cambia a mitad del recorrido el resultado es aproximado.
+        with self._lock:
+            self._consolidar()
+            inicio, fin = self._limites(desde, hasta)
+        while inicio < fin:
+            with self._lock:
+                if descendente:
+                    bloque = self._entradas[max(inicio, fin - self.TAMANO_BLOQUE) : fin]
+                    bloque.reverse()
+                else:
+                    bloque = self._entradas[
+                        inicio : min(fin, inicio + self.TAMANO_BLOQUE)
+                    ]
+            if not bloque:
+                return
+            for _, item_id in bloque:
+                yield item_id
+            if descendente:
+                fin -= len(bloque)
+            else:
+                inicio += len(bloque)
+
+    def __len__(self):
+        return len(self._claves)
@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import OrderedDict
+
+# === CACHÉ LRU EN MEMORIA (con caducidad opcional) ===
+
+
+class CacheLRU:
+    def __init__(self, max_entradas: int = 256, ttl: float | None = None):
+        self._max_entradas = max_entradas
+        self._ttl = ttl
+        self._datos: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, por_defecto=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return por_defecto
+            valor, expira = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return por_defecto
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        expira = time.monotonic() + self._ttl if self._ttl is not None else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self._max_entradas:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
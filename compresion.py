@@ -0,0 +1,100 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete brotli se responde con gzip
+    brotli = None
+
+# === COMPRESIÓN DE RESPUESTAS (gzip / brotli) ===
+# Funciona también con respuestas en streaming: cada trozo se comprime y se
+# vacía (sync flush) al momento, así el navegador recibe los primeros bytes
+# sin esperar al final de la página.
+
+TIPOS_COMPRIMIBLES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+TAMANO_MINIMO = 500
+NIVEL_GZIP = 6
+# En streaming cada trozo se comprime al vuelo: calidad media de brotli.
+CALIDAD_BROTLI = 5
+
+
+def elegir_codificacion(aceptadas):
+    # `aceptadas` es request.accept_encodings (calidad 0 = rechazada).
+    if brotli is not None and aceptadas["br"]:
+        return "br"
+    if aceptadas["gzip"]:
+        return "gzip"
+    return None
+
+
+class Compresor:
+    def __init__(self, codificacion: str):
+        self._codificacion = codificacion
+        if codificacion == "br":
+            self._brotli = brotli.Compressor(quality=CALIDAD_BROTLI)
+        else:
+            # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib crudo.
+            self._zlib = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        # Comprime y vacía: el trozo puede enviarse ya mismo al cliente.
+        if self._codificacion == "br":
+            return self._brotli.process(datos) + self._brotli.flush()
+        return self._zlib.compress(datos) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self) -> bytes:
+        if self._codificacion == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def es_comprimible(respuesta) -> bool:
+    return (
+        200 <= respuesta.status_code < 300
+        and respuesta.status_code != 204
+        and not respuesta.direct_passthrough
+        and "Content-Encoding" not in respuesta.headers
+        and respuesta.mimetype.startswith(TIPOS_COMPRIMIBLES)
+    )
+
+
+def comprimir_respuesta(respuesta, aceptadas):
+    if not es_comprimible(respuesta):
+        return respuesta
+    respuesta.vary.add("Accept-Encoding")
+    codificacion = elegir_codificacion(aceptadas)
+    if codificacion is None:
+        return respuesta
+    compresor = Compresor(codificacion)
+
+    if respuesta.is_streamed:
+        original = respuesta.response
+        charset = respuesta.mimetype_params.get("charset", "utf-8")
+
+        def transmitir():
+            try:
+                for trozo in original:
+                    if isinstance(trozo, str):
+                        trozo = trozo.encode(charset)
+                    datos = compresor.comprimir(trozo)
+                    if datos:
+                        yield datos
+                yield compresor.terminar()
+            finally:
+                if hasattr(original, "close"):
+                    original.close()
+
+        respuesta.response = transmitir()
+        respuesta.headers.pop("Content-Length", None)
+    else:
+        datos = respuesta.get_data()
+        if len(datos) < TAMANO_MINIMO:
+            return respuesta
+        respuesta.set_data(compresor.comprimir(datos) + compresor.terminar())
+
+    respuesta.headers["Content-Encoding"] = codificacion
+    return respuesta
@@ -0,0 +1,222 @@
+import logging
+import pickle
+import sqlite3
+import sys
+import threading
+
+from models import Biblioteca
+
+# === ESTADO COMPARTIDO ENTRE PROCESOS (SQLite) ===
+# Cada worker mantiene su propia Biblioteca en memoria: las escrituras se publican como operaciones (nombre + argumentos) en la
+# tabla `eventos` y cada worker aplica las que le faltan sobre su copia.
+# Una escritura cuesta una fila pequeña, no serializar todo el estado, y el
+# bloqueo exclusivo de SQLite dura solo lo que tarda la operación misma.
+# Cada EVENTOS_POR_INSTANTANEA operaciones se guarda una instantánea para que
+# los workers nuevos no tengan que reproducir todo el historial.
+
+EVENTOS_POR_INSTANTANEA = 500
+# Usuario -> préstamo -> material -> reservas -> usuario...: pickle recorre el
+# grafo en profundidad y puede pasar el límite de recursión por defecto. La
+# instantánea se serializa en un hilo con pila grande y un límite más alto.
+LIMITE_RECURSION_INSTANTANEA = 200_000
+PILA_INSTANTANEA = 512 * 1024 * 1024
+
+log = logging.getLogger(__name__)
+
+
+def serializar(objeto) -> bytes:
+    resultado = {}
+
+    def correr():
+        try:
+            resultado["datos"] = pickle.dumps(objeto, pickle.HIGHEST_PROTOCOL)
+        except BaseException as e:
+            resultado["error"] = e
+
+    limite = sys.getrecursionlimit()
+    pila = threading.stack_size(PILA_INSTANTANEA)
+    try:
+        sys.setrecursionlimit(max(limite, LIMITE_RECURSION_INSTANTANEA))
+        hilo = threading.Thread(target=correr, name="instantanea")
+        hilo.start()
+        hilo.join()
+    finally:
+        threading.stack_size(pila)
+        sys.setrecursionlimit(limite)
+    if "error" in resultado:
+        raise resultado["error"]
+    return resultado["datos"]
+
+
+class EstadoCompartido:
+    def __init__(self, ruta: str, operaciones: dict, timeout: float = 30.0):
+        # `operaciones`: nombre -> función(biblioteca, *argumentos). Deben ser
+        # deterministas: todos los workers las reproducen en el mismo orden.
+        self._ruta = ruta
+        self._operaciones = operaciones
+        self._timeout = timeout
+        self._lock_local = threading.RLock()
+        self._ultimo_evento = 0
+        self._biblioteca: Biblioteca | None = None
+        # Último error al compactar (None si la última instantánea se guardó).
+        self._error_instantanea: str | None = None
+        with self._conectar() as conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS instantanea ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " ultimo_evento INTEGER NOT NULL,"
+                " datos BLOB NOT NULL)"
+            )
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS eventos ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " operacion TEXT NOT NULL,"
+                " argumentos BLOB NOT NULL)"
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(
+            self._ruta, timeout=self._timeout, isolation_level=None
+        )
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        return conexion
+
+    def inicializar(self, biblioteca: Biblioteca) -> Biblioteca:
+        # El primer worker en llegar publica sus datos semilla; el resto parte
+        # de la última instantánea y reproduce los eventos posteriores.
+        conexion = self._conectar()
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+            fila = conexion.execute("SELECT ultimo_evento FROM instantanea").fetchone()
+            if fila is None:
+                conexion.execute(
+                    "INSERT INTO instantanea (id, ultimo_evento, datos) VALUES (1, 0, ?)",
+                    (serializar(biblioteca),),
+                )
+                self._biblioteca = biblioteca
+                self._ultimo_evento = 0
+            else:
+                self._biblioteca, self._ultimo_evento = self._leer_instantanea(conexion)
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        finally:
+            conexion.close()
+        return self._biblioteca
+
+    def _leer_instantanea(self, conexion: sqlite3.Connection):
+        ultimo, datos = conexion.execute(
+            "SELECT ultimo_evento, datos FROM instantanea"
+        ).fetchone()
+        biblioteca = pickle.loads(datos)
+        for id_evento, operacion, argumentos in conexion.execute(
+            "SELECT id, operacion, argumentos FROM eventos WHERE id > ? ORDER BY id",
+            (ultimo,),
+        ):
+            self._operaciones[operacion](biblioteca, *pickle.loads(argumentos))
+            ultimo = id_evento
+        return biblioteca, ultimo
+
+    def _restaurar(self, conexion: sqlite3.Connection):
+        # Camino excepcional (worker muy atrasado u operación fallida a medias):
+        # se reconstruye el estado en un objeto nuevo y se cambia la referencia
+        # de una vez. Las peticiones en curso terminan leyendo el grafo
+        # anterior completo; las operaciones siempre usan el vigente (ver
+        # `biblioteca`).
+        self._biblioteca, self._ultimo_evento = self._leer_instantanea(conexion)
+
+    def _ponerse_al_dia(self, conexion: sqlite3.Connection) -> int:
+        eventos = conexion.execute(
+            "SELECT id, operacion, argumentos FROM eventos WHERE id > ? ORDER BY id",
+            (self._ultimo_evento,),
+        ).fetchall()
+        if not eventos:
+            return 0
+        if eventos[0][0] != self._ultimo_evento + 1:
+            # Los eventos que faltan ya se compactaron en la instantánea.
+            self._restaurar(conexion)
+            return len(eventos)
+        for id_evento, operacion, argumentos in eventos:
+            self._operaciones[operacion](self._biblioteca, *pickle.loads(argumentos))
+            self._ultimo_evento = id_evento
+        return len(eventos)
+
+    def sincronizar(self) -> int:
+        # Lectura barata: una consulta por el índice de eventos. Devuelve
+        # cuántas operaciones de otros workers se aplicaron.
+        with self._lock_local:
+            conexion = self._conectar()
+            try:
+                return self._ponerse_al_dia(conexion)
+            finally:
+                conexion.close()
+
+    def ejecutar(self, operacion: str, argumentos: tuple):
+        # Bloqueo exclusivo entre procesos (SQLite) y entre hilos (RLock)
+        # solo durante la operación; el render y el resto de la petición
+        # corren en paralelo en todos los workers.
+        with self._lock_local:
+            conexion = self._conectar()
+            try:
+                conexion.execute("BEGIN IMMEDIATE")
+                self._ponerse_al_dia(conexion)
+                try:
+                    resultado = self._operaciones[operacion](
+                        self._biblioteca, *argumentos
+                    )
+                except Exception:
+                    # La copia local pudo quedar a medio modificar.
+                    self._restaurar(conexion)
+                    conexion.execute("ROLLBACK")
+                    raise
+                cursor = conexion.execute(
+                    "INSERT INTO eventos (operacion, argumentos) VALUES (?, ?)",
+                    (operacion, pickle.dumps(argumentos, pickle.HIGHEST_PROTOCOL)),
+                )
+                self._ultimo_evento = cursor.lastrowid
+                if self._ultimo_evento % EVENTOS_POR_INSTANTANEA == 0:
+                    self._guardar_instantanea(conexion)
+                conexion.execute("COMMIT")
+                return resultado
+            finally:
+                conexion.close()
+
+    def _guardar_instantanea(self, conexion: sqlite3.Connection):
+        # Se conservan los eventos desde la instantánea anterior como margen
+        # para los workers que van un poco atrasados.
+        try:
+            datos = serializar(self._biblioteca)
+        except (RecursionError, MemoryError, pickle.PicklingError) as e:
+            # Sin instantánea la tabla de eventos no se compacta: se registra
+            # y queda visible en error_instantanea hasta el próximo intento.
+            self._error_instantanea = f"{type(e).__name__}: {e}"
+            log.error(
+                "No se pudo guardar la instantánea en el evento %d: %s",
+                self._ultimo_evento,
+                self._error_instantanea,
+            )
+            return
+        self._error_instantanea = None
+        (anterior,) = conexion.execute(
+            "SELECT ultimo_evento FROM instantanea"
+        ).fetchone()
+        conexion.execute("DELETE FROM eventos WHERE id <= ?", (anterior,))
+        conexion.execute(
+            "UPDATE instantanea SET ultimo_evento = ?, datos = ? WHERE id = 1",
+            (self._ultimo_evento, datos),
+        )
+
+    @property
+    def version(self) -> int:
+        return self._ultimo_evento
+
+    @property
+    def biblioteca(self) -> Biblioteca | None:
+        # Cambia de objeto solo al restaurar desde la instantánea.
+        return self._biblioteca
+
+    @property
+    def error_instantanea(self) -> str | None:
+        return self._error_instantanea
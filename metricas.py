@@ -0,0 +1,156 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# === MÉTRICAS EN PROCESO (formato de texto de Prometheus) ===
+# Contadores e histogramas con etiquetas, protegidos por un lock. Cada
+# observación es un bisect sobre cubetas fijas y un par de sumas, así que
+# pueden quedar activas en producción.
+
+CUBETAS_SEGUNDOS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def _formatear_etiquetas(nombres, valores, extra="") -> str:
+    pares = [f'{n}="{_escapar(str(v))}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self._nombre = nombre
+        self._ayuda = ayuda
+        self._etiquetas = tuple(etiquetas)
+        self._valores: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valor(self, *valores) -> float:
+        return self._valores.get(valores, 0)
+
+    def exportar(self) -> list:
+        lineas = [
+            f"# HELP {self._nombre} {self._ayuda}",
+            f"# TYPE {self._nombre} counter",
+        ]
+        with self._lock:
+            for valores, total in sorted(self._valores.items()):
+                etiquetas = _formatear_etiquetas(self._etiquetas, valores)
+                lineas.append(f"{self._nombre}{etiquetas} {total}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        self._nombre = nombre
+        self._ayuda = ayuda
+        self._etiquetas = tuple(etiquetas)
+        self._cubetas = tuple(cubetas)
+        # valores de etiquetas -> [conteos por cubeta (+Inf al final), suma]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores):
+        indice = bisect_left(self._cubetas, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self._cubetas) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def medir(self, *valores):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *valores)
+
+    def exportar(self) -> list:
+        lineas = [
+            f"# HELP {self._nombre} {self._ayuda}",
+            f"# TYPE {self._nombre} histogram",
+        ]
+        with self._lock:
+            series = [(v, list(s[0]), s[1]) for v, s in self._series.items()]
+        for valores, conteos, suma in sorted(series):
+            acumulado = 0
+            for limite, conteo in zip(self._cubetas + ("+Inf",), conteos):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(
+                    self._etiquetas, valores, f'le="{limite}"'
+                )
+                lineas.append(f"{self._nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _formatear_etiquetas(self._etiquetas, valores)
+            lineas.append(f"{self._nombre}_sum{etiquetas} {suma}")
+            lineas.append(f"{self._nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas=()) -> Contador:
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(
+        self, nombre: str, ayuda: str, etiquetas=(), cubetas=CUBETAS_SEGUNDOS
+    ) -> Histograma:
+        metrica = Histograma(nombre, ayuda, etiquetas, cubetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exportar())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+
+LATENCIA_RUTAS = REGISTRO.histograma(
+    "biblioteca_peticion_segundos",
+    "Duración de cada petición HTTP por ruta.",
+    ("metodo", "ruta", "estado"),
+)
+DURACION_ETAPAS = REGISTRO.histograma(
+    "biblioteca_etapa_segundos",
+    "Duración de las etapas internas de las rutas (préstamos, catálogo, gráficos, plantillas).",
+    ("etapa",),
+)
+PRESTAMOS = REGISTRO.contador(
+    "biblioteca_prestamos_total", "Solicitudes de préstamo.", ("resultado",)
+)
+RESERVAS = REGISTRO.contador(
+    "biblioteca_reservas_total", "Solicitudes de reserva.", ("resultado",)
+)
+BUSQUEDAS = REGISTRO.contador(
+    "biblioteca_busquedas_total", "Búsquedas en el catálogo.", ("origen",)
+)
@@ -1,11 +1,32 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_right, insort
+from collections import Counter
+from contextlib import ExitStack
+from itertools import islice
 from datetime import date, timedelta
 from typing import List, Union
+import heapq
 import random
+import threading
+
+from busqueda import IndiceDifuso, IndiceOrdenado, IndicePrefijos, normalizar
 
 # === CLASES ABSTRACTAS PARA POLIMORFISMO ===
 
 
+class ConBloqueo:
+    # Lock reentrante por instancia para las operaciones de circulación.
+    # Los locks no se pueden serializar (modo multiproceso): se recrean al cargar.
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado.pop("_lock", None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.RLock()
+
+
 class Persona(ABC):
     def __init__(self, id: int, nombre: str, correo: str):
         self._id = id
@@ -34,6 +55,18 @@ class Resena:
         self._calificacion = max(0, min(5, int(calificacion)))  # Asegurar rango 0-5
         self._comentario = comentario
         self._fecha = fecha
+        # Ids de quienes la marcaron como útil (un voto por usuario).
+        self._votantes: set = set()
+
+    def marcar_util(self, usuario: "Usuario") -> bool:
+        if usuario is self._usuario or usuario.id in self._votantes:
+            return False
+        self._votantes.add(usuario.id)
+        return True
+
+    @property
+    def votos_utiles(self) -> int:
+        return len(self._votantes)
 
     @property
     def usuario(self):
@@ -52,7 +85,48 @@ class Resena:
         return self._fecha
 
 
-class MaterialBibliografico(ABC):
+# --- EJEMPLARES (COPIAS FÍSICAS CON CÓDIGO DE BARRAS) ---
+class Ejemplar:
+    DISPONIBLE = "Disponible"
+    PRESTADO = "Prestado"
+    RESERVADO = "Reservado"
+
+    def __init__(
+        self, codigo_barras: str, material: "MaterialBibliografico", ubicacion: str
+    ):
+        self._codigo_barras = codigo_barras
+        self._material = material
+        self._ubicacion = ubicacion
+        self._estado = Ejemplar.DISPONIBLE
+        # Usuario para el que quedó apartado al devolverse (estado Reservado).
+        self._apartado_para = None
+
+    @property
+    def codigo_barras(self):
+        return self._codigo_barras
+
+    @property
+    def material(self):
+        return self._material
+
+    @property
+    def ubicacion(self):
+        return self._ubicacion
+
+    @property
+    def estado(self):
+        return self._estado
+
+    @property
+    def apartado_para(self):
+        return getattr(self, "_apartado_para", None)
+
+    @property
+    def esta_disponible(self) -> bool:
+        return self._estado == Ejemplar.DISPONIBLE
+
+
+class MaterialBibliografico(ConBloqueo, ABC):
     def __init__(
         self,
         id: int,
@@ -74,9 +148,17 @@ class MaterialBibliografico(ABC):
 
         self._total_unidades = max(1, total_unidades)
         self._unidades_prestadas = 0
+        self._veces_prestado = 0
 
         self._lista_reservas: List[Usuario] = []
         self._resenas: List[Resena] = []  # NUEVO: Lista de reseñas
+        # Cantidad de reseñas por estrellas (0-5) y su suma: el promedio y el
+        # histograma del detalle salen de aquí sin recorrer las reseñas.
+        self._histograma_calificaciones = [0] * 6
+        self._suma_calificaciones = 0
+        self._ejemplares: List[Ejemplar] = []
+        self._catalogo: Catalogo | None = None
+        self._lock = threading.RLock()
 
     @abstractmethod
     def calcular_dias_prestamo(self, usuario: "Usuario") -> int:
@@ -88,13 +170,15 @@ class MaterialBibliografico(ABC):
 
     # --- Métodos de Reserva ---
     def agregar_reserva(self, usuario: "Usuario"):
-        if usuario not in self._lista_reservas:
-            self._lista_reservas.append(usuario)
+        with self._lock:
+            if usuario not in self._lista_reservas:
+                self._lista_reservas.append(usuario)
 
     def obtener_siguiente_reserva(self) -> Union["Usuario", None]:
-        if self._lista_reservas:
-            return self._lista_reservas.pop(0)
-        return None
+        with self._lock:
+            if self._lista_reservas:
+                return self._lista_reservas.pop(0)
+            return None
 
     def tiene_reservas(self) -> bool:
         return len(self._lista_reservas) > 0
@@ -108,20 +192,113 @@ class MaterialBibliografico(ABC):
         except ValueError:
             return 0
 
+    def _notificar_cambio(self):
+        # Stock, reseñas o copias cambiaron: invalida lo cacheado del catálogo
+        # y reubica el material en los índices por valoración y préstamos.
+        if self._catalogo is not None:
+            self._catalogo.marcar_cambio()
+            self._catalogo.actualizar_orden(self)
+
+    # --- Métodos de Ejemplares ---
+    def agregar_ejemplar(self, codigo_barras: str, ubicacion: str) -> Ejemplar:
+        with self._lock:
+            ejemplar = Ejemplar(codigo_barras, self, ubicacion)
+            self._ejemplares.append(ejemplar)
+            # El stock pasa a ser el número de copias registradas.
+            if len(self._ejemplares) > self._total_unidades:
+                self._total_unidades = len(self._ejemplares)
+            self._notificar_cambio()
+            return ejemplar
+
+    def tomar_ejemplar(self, ejemplar: Ejemplar | None = None) -> Ejemplar | None:
+        with self._lock:
+            if ejemplar is None:
+                ejemplar = next(
+                    (e for e in self._ejemplares if e.esta_disponible), None
+                )
+            if ejemplar is not None:
+                ejemplar._estado = Ejemplar.PRESTADO
+                ejemplar._apartado_para = None
+            return ejemplar
+
+    def liberar_ejemplar(self, ejemplar: Ejemplar | None, apartado_para=None):
+        if ejemplar is not None:
+            ejemplar._apartado_para = apartado_para
+            ejemplar._estado = (
+                Ejemplar.RESERVADO if apartado_para is not None else Ejemplar.DISPONIBLE
+            )
+
+    def ejemplar_apartado_para(self, usuario) -> Ejemplar | None:
+        return next((e for e in self._ejemplares if e.apartado_para is usuario), None)
+
+    @property
+    def ejemplares(self) -> List[Ejemplar]:
+        return self._ejemplares
+
     # --- NUEVOS MÉTODOS: RESEÑAS ---
+    ORDENES_RESENAS = ("recientes", "utiles")
+
     def agregar_resena(self, resena: Resena):
-        self._resenas.append(resena)
+        with self._lock:
+            self._resenas.append(resena)
+            self._histograma_calificaciones[resena.calificacion] += 1
+            self._suma_calificaciones += resena.calificacion
+        self._notificar_cambio()
+
+    def resenas_pagina(
+        self, orden: str = "recientes", despues: tuple | None = None, limite: int = 5
+    ) -> List[tuple]:
+        # Pares (índice, reseña); el índice identifica la reseña (la lista
+        # solo crece). `despues` es la clave_resena de la última reseña ya
+        # mostrada: la página sigue desde ahí aunque lleguen reseñas o votos
+        # nuevos entre una página y otra. "recientes" es un corte por índice;
+        # "utiles" un top parcial, sin ordenar todas las reseñas.
+        total = len(self._resenas)
+        if orden == "utiles":
+            candidatos = range(total)
+            if despues is not None:
+                candidatos = (
+                    i for i in candidatos if self._clave_utiles(i) < tuple(despues)
+                )
+            indices = heapq.nlargest(limite, candidatos, key=self._clave_utiles)
+        else:
+            fin = total if despues is None else max(0, min(total, despues[0]))
+            indices = range(fin - 1, max(0, fin - limite) - 1, -1)
+        return [(i, self._resenas[i]) for i in indices]
+
+    def clave_resena(self, orden: str, indice: int) -> tuple:
+        # Cursor de paginación: posición de la reseña en el orden pedido.
+        if orden == "utiles":
+            return self._clave_utiles(indice)
+        return (indice,)
+
+    def _clave_utiles(self, indice: int) -> tuple:
+        resena = self._resenas[indice]
+        return (resena.votos_utiles, resena.fecha.toordinal(), indice)
+
+    def buscar_resena(self, indice: int) -> Resena | None:
+        if 0 <= indice < len(self._resenas):
+            return self._resenas[indice]
+        return None
 
     @property
     def resenas(self) -> List[Resena]:
         return self._resenas
 
+    @property
+    def total_resenas(self) -> int:
+        return len(self._resenas)
+
+    @property
+    def histograma_calificaciones(self) -> dict:
+        # {5: n, 4: n, ..., 1: n} para las barras del detalle.
+        return {e: self._histograma_calificaciones[e] for e in range(5, 0, -1)}
+
     @property
     def promedio_calificacion(self) -> float:
         if not self._resenas:
             return 0.0
-        total = sum(r.calificacion for r in self._resenas)
-        return round(total / len(self._resenas), 1)
+        return round(self._suma_calificaciones / len(self._resenas), 1)
 
     # --- Propiedades ---
     @property
@@ -156,6 +333,15 @@ class MaterialBibliografico(ABC):
     def lista_reservas(self):
         return self._lista_reservas
 
+    @property
+    def veces_prestado(self) -> int:
+        return self._veces_prestado
+
+    @property
+    def puntaje_popularidad(self) -> float:
+        # Señal usada para ordenar sugerencias: préstamos + valoración media.
+        return self._veces_prestado + self.promedio_calificacion
+
     # --- Propiedades de Stock ---
     @property
     def total_unidades(self) -> int:
@@ -193,12 +379,15 @@ class EstadoPrestamo(ABC):
 
 
 # === JERARQUÍA DE USUARIOS ===
-class Usuario(Persona):
+class Usuario(Persona, ConBloqueo):
     def __init__(self, id: int, nombre: str, correo: str, rol: str):
         super().__init__(id, nombre, correo)
         self._rol = rol
         self._prestamos: List[Prestamo] = []
         self._limite_prestamos: int = 5
+        self._version = 0
+        self._biblioteca: "Biblioteca | None" = None
+        self._lock = threading.RLock()
 
     def validar_datos(self) -> bool:
         return (
@@ -215,6 +404,17 @@ class Usuario(Persona):
 
     def agregar_prestamo(self, prestamo: "Prestamo"):
         self._prestamos.append(prestamo)
+        self.marcar_cambio()
+        if self._biblioteca is not None:
+            self._biblioteca.registrar_prestamo(prestamo)
+
+    def marcar_cambio(self):
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        # Cambia cada vez que la lista o el estado de sus préstamos cambia.
+        return self._version
 
     def tiene_multas(self, fecha_actual: date) -> bool:
         for p in self._prestamos:
@@ -473,9 +673,20 @@ class MaterialDigital(MaterialBibliografico):
 # === ESTADOS DE PRÉSTAMO ===
 class Prestamo:
     def __init__(
-        self, usuario: Usuario, material: MaterialBibliografico, fecha_inicio: date
+        self,
+        usuario: Usuario,
+        material: MaterialBibliografico,
+        fecha_inicio: date,
+        ejemplar: Ejemplar | None = None,
     ):
-        self._id = random.randint(10000, 99999)
+        # Con biblioteca, ids correlativos: así todos los workers del modo
+        # multiproceso asignan el mismo id al reproducir la operación.
+        biblioteca = usuario._biblioteca
+        self._id = (
+            biblioteca.nuevo_id_prestamo()
+            if biblioteca is not None
+            else random.randint(10000, 99999)
+        )
         self._usuario = usuario
         self._material = material
         self._fecha_prestamo = fecha_inicio
@@ -484,11 +695,17 @@ class Prestamo:
         self._estado: EstadoPrestamo = PrestamoActivo(self)
         self._veces_renovado = 0
         self._limite_renovaciones = 1 if material.es_renovable() else 0
-        if not isinstance(material, MaterialDigital):
-            self._material._unidades_prestadas += 1
+        self._ejemplar: Ejemplar | None = None
+        with material._lock:
+            if not isinstance(material, MaterialDigital):
+                self._material._unidades_prestadas += 1
+                self._ejemplar = material.tomar_ejemplar(ejemplar)
+            material._veces_prestado += 1
+            material._notificar_cambio()
 
     def cambiar_estado(self, nuevo_estado: EstadoPrestamo):
         self._estado = nuevo_estado
+        self._usuario.marcar_cambio()
 
     def procesar_prestamo(self):
         self._estado.procesar_prestamo()
@@ -496,26 +713,72 @@ class Prestamo:
     def calcular_multa(self, fecha_actual: date) -> float:
         return self._estado.calcular_multa(fecha_actual)
 
-    def realizar_renovacion(self) -> (bool, str):
-        if not isinstance(self._estado, PrestamoActivo):
-            return (False, "No se puede renovar un préstamo vencido o devuelto.")
-        if self._material.tiene_reservas():
+    def realizar_renovacion(self, fecha_actual: date | None = None) -> (bool, str):
+        # Bajo el lock del material: una reserva no puede colarse entre la
+        # comprobación de la cola y la extensión del plazo.
+        with self._material._lock:
+            if not isinstance(self._estado, PrestamoActivo):
+                return (False, "No se puede renovar un préstamo vencido o devuelto.")
+            if self._material.tiene_reservas():
+                return (
+                    False,
+                    "No se puede renovar; hay otros usuarios esperando en reserva.",
+                )
+            if self._veces_renovado >= self._limite_renovaciones:
+                return (
+                    False,
+                    f"Has alcanzado el límite de {self._limite_renovaciones} renovaciones.",
+                )
+            dias_extra = self._material.calcular_dias_prestamo(self._usuario)
+            self._fecha_vencimiento += timedelta(days=dias_extra)
+            self._veces_renovado += 1
+            self._usuario.marcar_cambio()
+            biblioteca = self._usuario._biblioteca
+            if biblioteca is not None:
+                biblioteca.registrar_renovacion(self, fecha_actual or date.today())
             return (
-                False,
-                "No se puede renovar; hay otros usuarios esperando en reserva.",
+                True,
+                f"Renovación exitosa. Vence: {self._fecha_vencimiento.strftime('%d-%m-%Y')}.",
             )
-        if self._veces_renovado >= self._limite_renovaciones:
-            return (
-                False,
-                f"Has alcanzado el límite de {self._limite_renovaciones} renovaciones.",
+
+    def devolver(
+        self, fecha_actual: date | None = None
+    ) -> Union["PrestamoDevuelto", None]:
+        # Transición atómica a Devuelto; una segunda devolución no libera stock dos veces.
+        fecha_actual = fecha_actual or date.today()
+        with self._material._lock:
+            if isinstance(self._estado, PrestamoDevuelto):
+                return None
+            multa = self.calcular_multa(fecha_actual)
+            # Devuelto con atraso sin haber pasado por Vencido: el vencimiento
+            # se cuenta ahora, una sola vez, igual que en marcar_vencido.
+            vencio_sin_marcar = (
+                isinstance(self._estado, PrestamoActivo)
+                and fecha_actual > self._fecha_vencimiento
             )
-        dias_extra = self._material.calcular_dias_prestamo(self._usuario)
-        self._fecha_vencimiento += timedelta(days=dias_extra)
-        self._veces_renovado += 1
-        return (
-            True,
-            f"Renovación exitosa. Vence: {self._fecha_vencimiento.strftime('%d-%m-%Y')}.",
-        )
+            nuevo_estado = PrestamoDevuelto(self)
+            self.cambiar_estado(nuevo_estado)
+        biblioteca = self._usuario._biblioteca
+        if biblioteca is not None:
+            if vencio_sin_marcar:
+                biblioteca.registrar_vencimiento(self)
+            biblioteca.registrar_devolucion(self, fecha_actual, multa)
+        return nuevo_estado
+
+    def marcar_vencido(self, fecha_actual: date) -> bool:
+        # Activo -> Vencido si ya pasó la fecha límite. Devuelve True si cambió.
+        with self._material._lock:
+            if not (
+                isinstance(self._estado, PrestamoActivo)
+                and fecha_actual > self._fecha_vencimiento
+            ):
+                return False
+            dias_retraso = (fecha_actual - self._fecha_vencimiento).days
+            self.cambiar_estado(PrestamoVencido(self, dias_retraso))
+        biblioteca = self._usuario._biblioteca
+        if biblioteca is not None:
+            biblioteca.registrar_vencimiento(self)
+        return True
 
     @property
     def id(self):
@@ -541,6 +804,10 @@ class Prestamo:
     def fecha_vencimiento(self):
         return self._fecha_vencimiento
 
+    @property
+    def ejemplar(self):
+        return self._ejemplar
+
 
 class PrestamoActivo(EstadoPrestamo):
     def procesar_prestamo(self):
@@ -572,14 +839,29 @@ class PrestamoVencido(EstadoPrestamo):
 class PrestamoDevuelto(EstadoPrestamo):
     def __init__(self, prestamo: Prestamo):
         super().__init__(prestamo)
+        self._usuario_notificado: Usuario | None = None
         material = self._prestamo.material
         if isinstance(material, MaterialDigital):
             return
-        if material.tiene_reservas():
-            siguiente_usuario = material.obtener_siguiente_reserva()
-            self._notificacion = f"ATENCIÓN: '{material.titulo}' devuelto. Ha sido asignado a {siguiente_usuario.nombre} (siguiente en cola)."
-        else:
-            material._unidades_prestadas = max(0, material._unidades_prestadas - 1)
+        with material._lock:
+            ejemplar = self._prestamo.ejemplar
+            if ejemplar is None and material.tiene_reservas():
+                # Préstamo sin copia asignada (anterior a los ejemplares): se
+                # aparta una copia libre. Sin ninguna, la unidad vuelve al
+                # stock y la reserva sigue en la cola.
+                ejemplar = next(
+                    (e for e in material.ejemplares if e.esta_disponible), None
+                )
+            siguiente_usuario = (
+                material.obtener_siguiente_reserva() if ejemplar is not None else None
+            )
+            material.liberar_ejemplar(ejemplar, apartado_para=siguiente_usuario)
+            if siguiente_usuario:
+                self._usuario_notificado = siguiente_usuario
+                self._notificacion = f"ATENCIÓN: '{material.titulo}' devuelto. Ha sido asignado a {siguiente_usuario.nombre} (siguiente en cola)."
+            else:
+                material._unidades_prestadas = max(0, material._unidades_prestadas - 1)
+            material._notificar_cambio()
 
     def procesar_prestamo(self):
         pass
@@ -587,6 +869,11 @@ class PrestamoDevuelto(EstadoPrestamo):
     def calcular_multa(self, fecha_actual: date) -> float:
         return 0.0
 
+    @property
+    def usuario_notificado(self) -> Usuario | None:
+        # Siguiente en la cola de reservas, a quien se asignó el ejemplar.
+        return self._usuario_notificado
+
 
 # === CLASES NO IMPLEMENTADAS EN LA WEB AÚN ===
 # ... (Multa, Deudor) ...
@@ -625,26 +912,121 @@ class Deudor(Usuario):
 
 
 class Catalogo:
+    # Órdenes de explorar(), cada uno servido por un IndiceOrdenado.
+    ORDENES = ("año", "calificacion", "prestamos")
+    # Con un rango de años que deja menos candidatos que esto, conviene
+    # ordenarlos directamente en lugar de recorrer todo el índice del orden.
+    MAX_ORDENAR_RANGO = 5000
+
     def __init__(self):
         self._materiales: List[MaterialBibliografico] = []
+        self._por_id: dict[int, MaterialBibliografico] = {}
+        self._por_codigo: dict[str, Ejemplar] = {}
+        self._indice_prefijos = IndicePrefijos()
+        # Claves precalculadas sin tildes ni mayúsculas: (título, autor, materia).
+        self._claves_normalizadas: dict[int, tuple] = {}
+        # Materia normalizada -> ids, en orden de alta.
+        self._por_materia: dict[str, dict] = {}
+        self._difuso_titulos = IndiceDifuso()
+        self._difuso_autores = IndiceDifuso()
+        self._por_año = IndiceOrdenado()
+        self._por_calificacion = IndiceOrdenado()
+        self._por_prestamos = IndiceOrdenado()
+        self._version = 0
+
+    def marcar_cambio(self):
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        # Contador que sube con altas, bajas y cambios de stock o reseñas.
+        return self._version
 
     def agregar_material(self, material: MaterialBibliografico):
         self._materiales.append(material)
+        self._por_id[material.id] = material
+        material._catalogo = self
+        self._indice_prefijos.agregar(material.id, (material.titulo, material.autor))
+        self._claves_normalizadas[material.id] = (
+            normalizar(material.titulo),
+            normalizar(material.autor),
+            normalizar(material.materia),
+        )
+        self._por_materia.setdefault(normalizar(material.materia), {})[
+            material.id
+        ] = None
+        self._difuso_titulos.agregar(material.id, material.titulo)
+        self._difuso_autores.agregar(material.id, material.autor)
+        self._por_año.agregar(material.id, material.año_publicacion)
+        self._por_calificacion.agregar(material.id, material.promedio_calificacion)
+        self._por_prestamos.agregar(material.id, material.veces_prestado)
+        self.marcar_cambio()
+        if not isinstance(material, MaterialDigital):
+            # Un código por unidad en stock si el material llega sin ejemplares.
+            for n in range(len(material.ejemplares), material.total_unidades):
+                material.agregar_ejemplar(f"{material.id}-{n + 1:03d}", "Sala general")
+        for ejemplar in material.ejemplares:
+            self._por_codigo[ejemplar.codigo_barras] = ejemplar
 
     def retirar_material(self, material_id: int) -> bool:
         material = self.buscar_por_id(material_id)
         if material:
             self._materiales.remove(material)
+            del self._por_id[material_id]
+            for ejemplar in material.ejemplares:
+                self._por_codigo.pop(ejemplar.codigo_barras, None)
+            material._catalogo = None
+            self._indice_prefijos.quitar(material.id, (material.titulo, material.autor))
+            materia_n = self._claves_normalizadas.pop(material_id)[2]
+            ids = self._por_materia[materia_n]
+            del ids[material_id]
+            if not ids:
+                del self._por_materia[materia_n]
+            self._difuso_titulos.quitar(material_id, material.titulo)
+            self._difuso_autores.quitar(material_id, material.autor)
+            for indice in self._indices_orden().values():
+                indice.quitar(material_id)
+            self.marcar_cambio()
             return True
         return False
 
+    def _indices_orden(self) -> dict:
+        return {
+            "año": self._por_año,
+            "calificacion": self._por_calificacion,
+            "prestamos": self._por_prestamos,
+        }
+
+    def actualizar_orden(self, material: MaterialBibliografico):
+        self._por_calificacion.actualizar(material.id, material.promedio_calificacion)
+        self._por_prestamos.actualizar(material.id, material.veces_prestado)
+
+    def registrar_ejemplar(
+        self, material: MaterialBibliografico, codigo_barras: str, ubicacion: str
+    ) -> Ejemplar | None:
+        if isinstance(material, MaterialDigital) or codigo_barras in self._por_codigo:
+            return None
+        ejemplar = material.agregar_ejemplar(codigo_barras, ubicacion)
+        self._por_codigo[codigo_barras] = ejemplar
+        return ejemplar
+
+    def buscar_por_codigo(self, codigo_barras: str) -> Ejemplar | None:
+        # Acceso directo código -> ejemplar -> material, sin pasar por buscar().
+        return self._por_codigo.get(codigo_barras)
+
     def buscar(
         self,
         titulo: str = "",
         autor: str = "",
         materia: str = "",
         tipo_material: str = "",
+        tolerante: bool = False,
+        año_desde: int | None = None,
+        año_hasta: int | None = None,
     ) -> List[MaterialBibliografico]:
+        if tolerante:
+            resultados = self._buscar_tolerante(titulo, autor, materia, tipo_material)
+            return self._filtrar_años(resultados, año_desde, año_hasta)
         resultados = self._materiales
         if titulo:
             resultados = [m for m in resultados if titulo.lower() in m.titulo.lower()]
@@ -656,28 +1038,337 @@ class Catalogo:
             resultados = [
                 m for m in resultados if m.__class__.__name__ == tipo_material
             ]
+        return self._filtrar_años(resultados, año_desde, año_hasta)
+
+    @staticmethod
+    def _filtrar_años(
+        materiales: List[MaterialBibliografico],
+        año_desde: int | None,
+        año_hasta: int | None,
+    ) -> List[MaterialBibliografico]:
+        if año_desde is not None:
+            materiales = [m for m in materiales if m.año_publicacion >= año_desde]
+        if año_hasta is not None:
+            materiales = [m for m in materiales if m.año_publicacion <= año_hasta]
+        return materiales
+
+    def explorar(
+        self,
+        orden: str = "año",
+        descendente: bool = True,
+        año_desde: int | None = None,
+        año_hasta: int | None = None,
+        materia: str = "",
+        tipo_material: str = "",
+        desplazamiento: int = 0,
+        limite: int = 20,
+    ) -> List[MaterialBibliografico]:
+        # Listado ordenado leído de los índices, sin ordenar el catálogo:
+        # "Libros de Programación más recientes desde 2020" recorre el
+        # índice por año hacia atrás y se detiene al completar la página.
+        if orden not in self.ORDENES:
+            raise ValueError(f"Orden desconocido: {orden}")
+        indice = self._indices_orden()[orden]
+        con_rango = año_desde is not None or año_hasta is not None
+        if orden == "año":
+            ids = indice.recorrer(año_desde, año_hasta, descendente)
+        elif (
+            con_rango
+            and self._por_año.contar(año_desde, año_hasta) <= self.MAX_ORDENAR_RANGO
+        ):
+            candidatos = list(self._por_año.recorrer(año_desde, año_hasta))
+            ids = sorted(
+                candidatos, key=lambda i: (indice.clave(i), i), reverse=descendente
+            )
+        else:
+            ids = indice.recorrer(descendente=descendente)
+
+        materia_n = normalizar(materia) if materia and materia != "Todas" else ""
+        tipo = tipo_material if tipo_material != "Todos" else ""
+
+        def coincide(material_id: int) -> bool:
+            material = self._por_id.get(material_id)
+            if material is None:
+                return False
+            if materia_n and self._claves_normalizadas[material_id][2] != materia_n:
+                return False
+            if tipo and material.__class__.__name__ != tipo:
+                return False
+            if año_desde is not None and material.año_publicacion < año_desde:
+                return False
+            return año_hasta is None or material.año_publicacion <= año_hasta
+
+        seleccion = islice(
+            filter(coincide, ids), desplazamiento, desplazamiento + limite
+        )
+        return [self._por_id[i] for i in seleccion]
+
+    def ordenar(
+        self,
+        materiales: List[MaterialBibliografico],
+        orden: str,
+        descendente: bool = True,
+    ) -> List[MaterialBibliografico]:
+        # Para resultados ya filtrados por texto (pocos): ordena con las
+        # claves guardadas en los índices.
+        indice = self._indices_orden()[orden]
+        return sorted(
+            materiales,
+            key=lambda m: (indice.clave(m.id), m.id),
+            reverse=descendente,
+        )
+
+    def _buscar_tolerante(
+        self, titulo: str, autor: str, materia: str, tipo_material: str
+    ) -> List[MaterialBibliografico]:
+        # Ignora tildes y mayúsculas ("calculo" encuentra "Cálculo"); si el
+        # texto no aparece tal cual, admite errores de tipeo vía IndiceDifuso.
+        resultados = self._materiales
+        if titulo:
+            resultados = self._filtrar_tolerante(
+                resultados, titulo, 0, self._difuso_titulos
+            )
+        if autor:
+            resultados = self._filtrar_tolerante(
+                resultados, autor, 1, self._difuso_autores
+            )
+        if materia and materia != "Todas":
+            materia_n = normalizar(materia)
+            resultados = [
+                m for m in resultados if self._claves_normalizadas[m.id][2] == materia_n
+            ]
+        if tipo_material and tipo_material != "Todos":
+            resultados = [
+                m for m in resultados if m.__class__.__name__ == tipo_material
+            ]
         return resultados
 
+    def _filtrar_tolerante(
+        self,
+        materiales: List[MaterialBibliografico],
+        consulta: str,
+        campo: int,
+        indice: IndiceDifuso,
+    ) -> List[MaterialBibliografico]:
+        consulta_n = normalizar(consulta)
+        exactos = [
+            m
+            for m in materiales
+            if consulta_n in self._claves_normalizadas[m.id][campo]
+        ]
+        if exactos:
+            return exactos
+        ids = indice.buscar(consulta_n)
+        return [m for m in materiales if m.id in ids]
+
     def buscar_por_id(self, material_id: int) -> MaterialBibliografico | None:
-        for m in self._materiales:
-            if m.id == material_id:
-                return m
-        return None
+        return self._por_id.get(material_id)
+
+    def buscar_por_materia(self, materia: str) -> List[MaterialBibliografico]:
+        # Igual que buscar(materia=..., tolerante=True), sin recorrer el catálogo.
+        ids = self._por_materia.get(normalizar(materia), {})
+        return [self._por_id[i] for i in list(ids)]
+
+    def sugerir(self, prefijo: str, limite: int = 10) -> List[MaterialBibliografico]:
+        def puntuar(material_id: int) -> float:
+            material = self._por_id.get(material_id)
+            return material.puntaje_popularidad if material else -1.0
+
+        ids = self._indice_prefijos.sugerir(prefijo, puntuar, limite)
+        return [self._por_id[i] for i in ids if i in self._por_id]
 
     def obtener_materias_unicas(self) -> List[str]:
         materias = set(m.materia for m in self._materiales)
         return sorted(list(materias))
 
 
-class Biblioteca:
+class IndiceVencimientos(ConBloqueo):
+    # Préstamos abiertos agrupados por día de vencimiento, con los días en una
+    # lista ordenada: "todo lo que vence hasta X" es un bisect más el recorrido
+    # de esas cubetas, sin pasar por cada usuario. Devoluciones y renovaciones
+    # no se borran al momento; sus entradas viejas se descartan al consultar.
+
+    def __init__(self):
+        self._dias: List[int] = []
+        self._por_dia: dict[int, List["Prestamo"]] = {}
+        self._lock = threading.RLock()
+
+    def agregar(self, prestamo: "Prestamo"):
+        dia = prestamo.fecha_vencimiento.toordinal()
+        with self._lock:
+            cubeta = self._por_dia.get(dia)
+            if cubeta is None:
+                cubeta = self._por_dia[dia] = []
+                insort(self._dias, dia)
+            cubeta.append(prestamo)
+
+    @staticmethod
+    def _vigente(prestamo: "Prestamo", dia: int) -> bool:
+        return (
+            not isinstance(prestamo.estado, PrestamoDevuelto)
+            and prestamo.fecha_vencimiento.toordinal() == dia
+        )
+
+    def vencen_hasta(self, fecha: date) -> List["Prestamo"]:
+        # Préstamos abiertos con vencimiento <= fecha (incluye los ya vencidos),
+        # ordenados por fecha de vencimiento.
+        resultado = []
+        with self._lock:
+            fin = bisect_right(self._dias, fecha.toordinal())
+            vacios = False
+            for dia in self._dias[:fin]:
+                vistos = set()
+                vigentes = []
+                for p in self._por_dia[dia]:
+                    if id(p) not in vistos and self._vigente(p, dia):
+                        vistos.add(id(p))
+                        vigentes.append(p)
+                if vigentes:
+                    self._por_dia[dia] = vigentes
+                else:
+                    del self._por_dia[dia]
+                    vacios = True
+                resultado.extend(vigentes)
+            if vacios:
+                self._dias = [d for d in self._dias if d in self._por_dia]
+        return resultado
+
+    def __len__(self):
+        return sum(len(c) for c in self._por_dia.values())
+
+
+# === RESÚMENES DIARIOS DE CIRCULACIÓN ===
+class ResumenDia:
+    def __init__(self):
+        self.prestamos = 0
+        self.renovaciones = 0
+        self.devoluciones = 0
+        self.vencimientos = 0
+        self.multas = 0.0
+        self.por_tipo: Counter = Counter()
+        self.por_materia: Counter = Counter()
+        self.por_rol: Counter = Counter()
+
+
+class ResumenesCirculacion(ConBloqueo):
+    # Un ResumenDia por fecha, actualizado en cada préstamo, renovación,
+    # devolución y paso a vencido. Las gráficas leen solo estas filas: una
+    # tendencia de un año cuesta 365 lecturas, no un recorrido de préstamos.
+
+    def __init__(self):
+        self._dias: dict[int, ResumenDia] = {}
+        self._totales = ResumenDia()
+        self._abiertos = 0
+        self._lock = threading.RLock()
+
+    def _resumenes(self, fecha: date):
+        dia = self._dias.get(fecha.toordinal())
+        if dia is None:
+            dia = self._dias[fecha.toordinal()] = ResumenDia()
+        return dia, self._totales
+
+    def registrar_prestamo(self, prestamo: "Prestamo"):
+        with self._lock:
+            for r in self._resumenes(prestamo.fecha_prestamo):
+                r.prestamos += 1
+                r.por_tipo[prestamo.material.__class__.__name__] += 1
+                r.por_materia[prestamo.material.materia] += 1
+                r.por_rol[prestamo.usuario.rol] += 1
+            if not isinstance(prestamo.estado, PrestamoDevuelto):
+                self._abiertos += 1
+
+    def registrar_renovacion(self, fecha: date):
+        with self._lock:
+            for r in self._resumenes(fecha):
+                r.renovaciones += 1
+
+    def registrar_devolucion(self, fecha: date, multa: float):
+        with self._lock:
+            for r in self._resumenes(fecha):
+                r.devoluciones += 1
+                r.multas += multa
+            self._abiertos -= 1
+
+    def registrar_vencimiento(self, fecha: date):
+        with self._lock:
+            for r in self._resumenes(fecha):
+                r.vencimientos += 1
+
+    def serie(self, desde: date, hasta: date) -> List[tuple]:
+        # [(fecha, ResumenDia)] para cada día del rango, con ceros si no hubo movimiento.
+        vacio = ResumenDia()
+        return [
+            (date.fromordinal(d), self._dias.get(d, vacio))
+            for d in range(desde.toordinal(), hasta.toordinal() + 1)
+        ]
+
+    @property
+    def totales(self) -> ResumenDia:
+        return self._totales
+
+    @property
+    def abiertos(self) -> int:
+        return self._abiertos
+
+
+class Biblioteca(ConBloqueo):
+    PRIMER_ID_PRESTAMO = 100000
+
     def __init__(self):
+        self._lock = threading.RLock()
+        self._ultimo_id_prestamo = self.PRIMER_ID_PRESTAMO
+        self._prestamos_registrados = 0
         self._usuarios: List[Usuario] = []
         self._materiales: List[MaterialBibliografico] = []
         self._catalogo = Catalogo()
+        self._vencimientos = IndiceVencimientos()
+        self._resumenes = ResumenesCirculacion()
 
     def agregar_usuario(self, usuario: Usuario):
         if usuario.registrar():
             self._usuarios.append(usuario)
+            usuario._biblioteca = self
+            for prestamo in usuario.prestamos:
+                self.registrar_prestamo(prestamo)
+
+    def nuevo_id_prestamo(self) -> int:
+        with self._lock:
+            self._ultimo_id_prestamo += 1
+            return self._ultimo_id_prestamo
+
+    # --- Eventos de circulación: índice de vencimientos + resúmenes diarios ---
+    def registrar_prestamo(self, prestamo: "Prestamo"):
+        if not isinstance(prestamo.estado, PrestamoDevuelto):
+            self._vencimientos.agregar(prestamo)
+        self._resumenes.registrar_prestamo(prestamo)
+        with self._lock:
+            self._prestamos_registrados = self.version_prestamos + 1
+
+    @property
+    def version_prestamos(self) -> int:
+        # Préstamos registrados: solo sube cuando el historial gana un par
+        # (usuario, material); devoluciones y renovaciones no lo cambian.
+        return getattr(self, "_prestamos_registrados", 0)
+
+    def registrar_renovacion(self, prestamo: "Prestamo", fecha: date):
+        self._vencimientos.agregar(prestamo)
+        self._resumenes.registrar_renovacion(fecha)
+
+    def registrar_devolucion(self, prestamo: "Prestamo", fecha: date, multa: float):
+        self._resumenes.registrar_devolucion(fecha, multa)
+
+    def registrar_vencimiento(self, prestamo: "Prestamo"):
+        # Cuenta en el día en que el préstamo pasó a estar vencido.
+        self._resumenes.registrar_vencimiento(
+            prestamo.fecha_vencimiento + timedelta(days=1)
+        )
+
+    @property
+    def resumenes(self) -> ResumenesCirculacion:
+        return self._resumenes
+
+    def prestamos_por_vencer(self, hasta: date) -> List["Prestamo"]:
+        return self._vencimientos.vencen_hasta(hasta)
 
     def agregar_material(self, material: MaterialBibliografico):
         self._materiales.append(material)
@@ -707,6 +1398,9 @@ class Biblioteca:
     def buscar_material_por_id(self, material_id: int) -> MaterialBibliografico | None:
         return self._catalogo.buscar_por_id(material_id)
 
+    def buscar_ejemplar_por_codigo(self, codigo_barras: str) -> Ejemplar | None:
+        return self._catalogo.buscar_por_codigo(codigo_barras)
+
     @property
     def catalogo(self) -> Catalogo:
         return self._catalogo
@@ -745,22 +1439,243 @@ class Biblioteca:
     def realizar_prestamo(
         self, usuario: Usuario, material: MaterialBibliografico, fecha_inicio: date
     ) -> (bool, str):
-        (apto, razon) = self.verificar_aptitud_prestamo(usuario, material)
+        # Verificación y préstamo bajo los locks del usuario y del material
+        # (siempre en ese orden) para no prestar dos veces el último ejemplar.
+        with usuario._lock, material._lock:
+            (apto, razon) = self.verificar_aptitud_prestamo(usuario, material)
+
+            if isinstance(material, MaterialDigital):
+                nuevo_prestamo = Prestamo(usuario, material, fecha_inicio)
+                usuario.agregar_prestamo(nuevo_prestamo)
+                msg = f"Acceso a '{material.titulo}' concedido. Vence el {nuevo_prestamo.fecha_vencimiento.strftime('%d-%m-%Y')}."
+                return (True, msg)
+
+            apartado = material.ejemplar_apartado_para(usuario)
+            if apartado is not None:
+                # Si tiene una copia apartada se le entrega esa: prestarle
+                # otra libre dejaría la apartada Reservada para siempre.
+                (apto, razon) = self._verificar_retiro_apartado(usuario, material)
+                if not apto:
+                    return (False, razon)
+                nuevo_prestamo = self._entregar_apartado(
+                    usuario, material, apartado, fecha_inicio
+                )
+            elif not apto:
+                return (False, razon)
+            else:
+                nuevo_prestamo = Prestamo(usuario, material, fecha_inicio)
+                usuario.agregar_prestamo(nuevo_prestamo)
 
-        if isinstance(material, MaterialDigital):
-            nuevo_prestamo = Prestamo(usuario, material, fecha_inicio)
-            usuario.agregar_prestamo(nuevo_prestamo)
-            msg = f"Acceso a '{material.titulo}' concedido. Vence el {nuevo_prestamo.fecha_vencimiento.strftime('%d-%m-%Y')}."
-            return (True, msg)
+        msg = f"¡Préstamo exitoso! Debes devolver '{material.titulo}' antes del {nuevo_prestamo.fecha_vencimiento.strftime('%d-%m-%Y')}."
+        return (True, msg)
 
-        if not apto:
-            return (False, razon)
+    def _bloquear_lote(
+        self, pila: ExitStack, usuario: Usuario, materiales: List[MaterialBibliografico]
+    ):
+        # Mismo orden que realizar_prestamo: usuario primero y luego los
+        # materiales por id, así dos lotes concurrentes no se interbloquean.
+        pila.enter_context(usuario._lock)
+        unicos = {m.id: m for m in materiales}
+        for material_id in sorted(unicos):
+            pila.enter_context(unicos[material_id]._lock)
+
+    @staticmethod
+    def _resultado_lote(item, exito: bool, mensaje: str, **extra) -> dict:
+        material = item.material if isinstance(item, Ejemplar) else item
+        resultado = {"material_id": material.id, "exito": exito, "mensaje": mensaje}
+        if isinstance(item, Ejemplar):
+            resultado["codigo_barras"] = item.codigo_barras
+        resultado.update(extra)
+        return resultado
+
+    def realizar_prestamos_lote(
+        self,
+        usuario: Usuario,
+        items: List[Union[MaterialBibliografico, Ejemplar]],
+        fecha_inicio: date,
+    ) -> List[dict]:
+        # Cada item es un material (se asigna cualquier copia libre) o un
+        # ejemplar concreto leído con el escáner.
+        materiales = [i.material if isinstance(i, Ejemplar) else i for i in items]
+        resultados = []
+        with ExitStack() as pila:
+            self._bloquear_lote(pila, usuario, materiales)
+
+            # La aptitud se evalúa una sola vez para todo el lote.
+            activos = [
+                p for p in usuario.prestamos if isinstance(p.estado, PrestamoActivo)
+            ]
+            ids_prestados = {p.material.id for p in activos}
+            cupo = usuario.limite_prestamos - len(activos)
+
+            for item, material in zip(items, materiales):
+                ejemplar = item if isinstance(item, Ejemplar) else None
+                apartado = (
+                    material.ejemplar_apartado_para(usuario)
+                    if not isinstance(material, MaterialDigital)
+                    else None
+                )
+                if apartado is not None:
+                    # El usuario viene a retirar la copia que le apartaron.
+                    if ejemplar not in (None, apartado):
+                        razon = f"Tiene apartado el ejemplar {apartado.codigo_barras}; debe retirar ese."
+                    elif material.id in ids_prestados:
+                        razon = "Ya tienes una unidad de este material en tu lista de préstamos."
+                    elif cupo <= 0:
+                        razon = f"Alcanzaste tu límite de {usuario.limite_prestamos} préstamos."
+                    else:
+                        razon = ""
+                    if razon:
+                        resultados.append(self._resultado_lote(item, False, razon))
+                        continue
+                    nuevo_prestamo = self._entregar_apartado(
+                        usuario, material, apartado, fecha_inicio
+                    )
+                    ids_prestados.add(material.id)
+                    cupo -= 1
+                    resultados.append(
+                        self._resultado_lote(
+                            item,
+                            True,
+                            f"Reserva de '{material.titulo}' entregada.",
+                            prestamo_id=nuevo_prestamo.id,
+                            fecha_vencimiento=nuevo_prestamo.fecha_vencimiento,
+                        )
+                    )
+                    continue
+                if not isinstance(material, MaterialDigital):
+                    if material.id in ids_prestados:
+                        razon = "Ya tienes una unidad de este material en tu lista de préstamos."
+                    elif not material.esta_disponible:
+                        razon = "No hay unidades disponibles de este material."
+                    elif ejemplar is not None and not ejemplar.esta_disponible:
+                        razon = f"El ejemplar {ejemplar.codigo_barras} no está disponible ({ejemplar.estado})."
+                    elif cupo <= 0:
+                        razon = f"Alcanzaste tu límite de {usuario.limite_prestamos} préstamos."
+                    else:
+                        razon = ""
+                    if razon:
+                        resultados.append(self._resultado_lote(item, False, razon))
+                        continue
+
+                nuevo_prestamo = Prestamo(usuario, material, fecha_inicio, ejemplar)
+                usuario.agregar_prestamo(nuevo_prestamo)
+                ids_prestados.add(material.id)
+                cupo -= 1
+                resultados.append(
+                    self._resultado_lote(
+                        item,
+                        True,
+                        f"Préstamo de '{material.titulo}' registrado.",
+                        prestamo_id=nuevo_prestamo.id,
+                        fecha_vencimiento=nuevo_prestamo.fecha_vencimiento,
+                    )
+                )
+        return resultados
 
-        nuevo_prestamo = Prestamo(usuario, material, fecha_inicio)
-        usuario.agregar_prestamo(nuevo_prestamo)
+    def realizar_devoluciones_lote(
+        self,
+        usuario: Usuario,
+        items: List[Union[MaterialBibliografico, Ejemplar]],
+        fecha_actual: date,
+    ) -> List[dict]:
+        materiales = [i.material if isinstance(i, Ejemplar) else i for i in items]
+        resultados = []
+        with ExitStack() as pila:
+            self._bloquear_lote(pila, usuario, materiales)
+
+            abiertos = [
+                p
+                for p in usuario.prestamos
+                if not isinstance(p.estado, PrestamoDevuelto)
+            ]
+            for item, material in zip(items, materiales):
+                if isinstance(item, Ejemplar):
+                    prestamo = next((p for p in abiertos if p.ejemplar is item), None)
+                else:
+                    prestamo = next(
+                        (p for p in abiertos if p.material.id == material.id), None
+                    )
+                if prestamo is None:
+                    resultados.append(
+                        self._resultado_lote(
+                            item,
+                            False,
+                            "El usuario no tiene este material en préstamo.",
+                        )
+                    )
+                    continue
+                abiertos.remove(prestamo)
+                multa = prestamo.calcular_multa(fecha_actual)
+                nuevo_estado = prestamo.devolver(fecha_actual)
+                resultados.append(
+                    self._resultado_lote(
+                        item,
+                        True,
+                        f"'{material.titulo}' devuelto.",
+                        prestamo_id=prestamo.id,
+                        multa=multa,
+                        notificacion=nuevo_estado.notificacion
+                        if nuevo_estado
+                        else None,
+                        reservado_para=nuevo_estado.usuario_notificado.id
+                        if nuevo_estado and nuevo_estado.usuario_notificado
+                        else None,
+                    )
+                )
+        return resultados
 
-        msg = f"¡Préstamo exitoso! Debes devolver '{material.titulo}' antes del {nuevo_prestamo.fecha_vencimiento.strftime('%d-%m-%Y')}."
-        return (True, msg)
+    def entregar_reserva(
+        self, usuario: Usuario, material: MaterialBibliografico, fecha_inicio: date
+    ) -> (bool, str):
+        # El ejemplar que PrestamoDevuelto dejó apartado pasa a préstamo del
+        # usuario notificado; nadie más puede retirarlo.
+        with usuario._lock, material._lock:
+            ejemplar = material.ejemplar_apartado_para(usuario)
+            if ejemplar is None:
+                return (False, "No hay un ejemplar apartado para ti de este material.")
+            (apto, razon) = self._verificar_retiro_apartado(usuario, material)
+            if not apto:
+                return (False, razon)
+            nuevo_prestamo = self._entregar_apartado(
+                usuario, material, ejemplar, fecha_inicio
+            )
+        return (
+            True,
+            f"'{material.titulo}' entregado. Vence el {nuevo_prestamo.fecha_vencimiento.strftime('%d-%m-%Y')}.",
+        )
+
+    def _verificar_retiro_apartado(
+        self, usuario: Usuario, material: MaterialBibliografico
+    ) -> (bool, str):
+        # Como verificar_aptitud_prestamo, sin exigir stock: la copia apartada
+        # ya está separada para el usuario.
+        activos = [p for p in usuario.prestamos if isinstance(p.estado, PrestamoActivo)]
+        if any(p.material.id == material.id for p in activos):
+            return (
+                False,
+                "Ya tienes una unidad de este material en tu lista de préstamos.",
+            )
+        if len(activos) >= usuario.limite_prestamos:
+            return (
+                False,
+                f"Alcanzaste tu límite de {usuario.limite_prestamos} préstamos.",
+            )
+        return (True, "")
+
+    def _entregar_apartado(
+        self,
+        usuario: Usuario,
+        material: MaterialBibliografico,
+        ejemplar: Ejemplar,
+        fecha_inicio: date,
+    ) -> Prestamo:
+        # El ejemplar apartado ya cuenta en _unidades_prestadas, así que el
+        # nuevo Prestamo no debe volver a sumarlo.
+        material._unidades_prestadas -= 1
+        nuevo_prestamo = Prestamo(usuario, material, fecha_inicio, ejemplar)
+        usuario.agregar_prestamo(nuevo_prestamo)
+        return nuevo_prestamo
 
     def realizar_reserva(
         self, usuario: Usuario, material: MaterialBibliografico
@@ -768,20 +1683,26 @@ class Biblioteca:
         if isinstance(material, MaterialDigital):
             return (False, "El material digital no se puede reservar.")
 
-        if material.esta_disponible:
-            return (
-                False,
-                "Este material tiene unidades disponibles. No necesitas reservarlo, puedes pedirlo.",
-            )
+        with usuario._lock, material._lock:
+            if material.esta_disponible:
+                return (
+                    False,
+                    "Este material tiene unidades disponibles. No necesitas reservarlo, puedes pedirlo.",
+                )
 
-        for p in usuario.prestamos:
-            if p.material.id == material.id and isinstance(p.estado, PrestamoActivo):
-                return (False, "No puedes reservar un material que ya tienes prestado.")
+            for p in usuario.prestamos:
+                if p.material.id == material.id and isinstance(
+                    p.estado, PrestamoActivo
+                ):
+                    return (
+                        False,
+                        "No puedes reservar un material que ya tienes prestado.",
+                    )
 
-        if material.esta_reservado_por(usuario):
-            return (False, "Ya has reservado este material.")
+            if material.esta_reservado_por(usuario):
+                return (False, "Ya has reservado este material.")
 
-        material.agregar_reserva(usuario)
+            material.agregar_reserva(usuario)
         return (
             True,
             f"¡Reserva exitosa! Se te notificará cuando '{material.titulo}' esté disponible.",
@@ -0,0 +1,213 @@
+import heapq
+import itertools
+import json
+import logging
+import queue
+import smtplib
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from email.message import EmailMessage
+from typing import List
+
+# === DESPACHO ASÍNCRONO DE NOTIFICACIONES ===
+# Las devoluciones solo encolan el aviso; un hilo en segundo plano los agrupa
+# en lotes y los entrega por el transporte configurado. Un lote que falla
+# vuelve a programarse con espera exponencial; mientras tanto el hilo sigue
+# entregando los avisos nuevos.
+
+log = logging.getLogger(__name__)
+
+
+class Notificacion:
+    def __init__(self, correo: str, nombre: str, asunto: str, cuerpo: str):
+        self._correo = correo
+        self._nombre = nombre
+        self._asunto = asunto
+        self._cuerpo = cuerpo
+        self._creada = datetime.now()
+
+    @property
+    def correo(self):
+        return self._correo
+
+    @property
+    def nombre(self):
+        return self._nombre
+
+    @property
+    def asunto(self):
+        return self._asunto
+
+    @property
+    def cuerpo(self):
+        return self._cuerpo
+
+    @property
+    def creada(self):
+        return self._creada
+
+
+# --- TRANSPORTES ---
+class Transporte(ABC):
+    @abstractmethod
+    def enviar(self, lote: List[Notificacion]):
+        # Debe lanzar una excepción si el lote no se pudo entregar.
+        pass
+
+
+class TransporteArchivo(Transporte):
+    # Una línea JSON por aviso; útil en desarrollo y como bitácora.
+    def __init__(self, ruta: str):
+        self._ruta = ruta
+
+    def enviar(self, lote: List[Notificacion]):
+        with open(self._ruta, "a", encoding="utf-8") as f:
+            for n in lote:
+                registro = {
+                    "fecha": n.creada.isoformat(timespec="seconds"),
+                    "para": n.correo,
+                    "nombre": n.nombre,
+                    "asunto": n.asunto,
+                    "cuerpo": n.cuerpo,
+                }
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+class TransporteSMTP(Transporte):
+    # Todo el lote viaja por una sola conexión. Para pruebas locales:
+    # python -m aiosmtpd -n -l localhost:1025
+    def __init__(self, host: str, puerto: int, remitente: str, timeout: float = 10.0):
+        self._host = host
+        self._puerto = puerto
+        self._remitente = remitente
+        self._timeout = timeout
+
+    def enviar(self, lote: List[Notificacion]):
+        with smtplib.SMTP(self._host, self._puerto, timeout=self._timeout) as smtp:
+            for n in lote:
+                mensaje = EmailMessage()
+                mensaje["From"] = self._remitente
+                mensaje["To"] = n.correo
+                mensaje["Subject"] = n.asunto
+                mensaje.set_content(f"Hola {n.nombre}:\n\n{n.cuerpo}\n")
+                smtp.send_message(mensaje)
+
+
+# --- DESPACHADOR ---
+class DespachadorNotificaciones:
+    def __init__(
+        self,
+        transporte: Transporte,
+        tamano_lote: int = 50,
+        espera_lote: float = 2.0,
+        max_reintentos: int = 5,
+        espera_reintento: float = 1.0,
+    ):
+        self._transporte = transporte
+        self._tamano_lote = tamano_lote
+        self._espera_lote = espera_lote
+        self._max_reintentos = max_reintentos
+        self._espera_reintento = espera_reintento
+        self._cola: queue.Queue = queue.Queue()
+        self._hilo: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._detenido = threading.Event()
+        self._enviadas = 0
+        self._fallidas: List[Notificacion] = []
+        # Heap de (vence, secuencia, intento, lote); solo lo toca el hilo del
+        # despachador.
+        self._reintentos: list = []
+        self._secuencia = itertools.count()
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detenido.clear()
+                self._hilo = threading.Thread(
+                    target=self._ejecutar, name="notificaciones", daemon=True
+                )
+                self._hilo.start()
+
+    def encolar(self, notificacion: Notificacion):
+        # No bloquea: la entrega ocurre en el hilo del despachador.
+        self.iniciar()
+        self._cola.put(notificacion)
+
+    def detener(self, timeout: float | None = None):
+        # Entrega lo pendiente y termina el hilo.
+        self._detenido.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def _proximo_reintento(self) -> float | None:
+        if not self._reintentos:
+            return None
+        return max(0.0, self._reintentos[0][0] - time.monotonic())
+
+    def _tomar_lote(self) -> List[Notificacion]:
+        # No se espera más allá del próximo reintento programado.
+        espera = self._espera_lote
+        proximo = self._proximo_reintento()
+        if proximo is not None:
+            espera = min(espera, proximo)
+        try:
+            lote = [self._cola.get(timeout=espera)]
+        except queue.Empty:
+            return []
+        # Se espera un poco a que lleguen más avisos para agruparlos.
+        limite = time.monotonic() + self._espera_lote
+        while len(lote) < self._tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _ejecutar(self):
+        while not (
+            self._detenido.is_set() and self._cola.empty() and not self._reintentos
+        ):
+            if self._proximo_reintento() == 0.0:
+                _, _, intento, lote = heapq.heappop(self._reintentos)
+                self._entregar(lote, intento)
+                continue
+            lote = self._tomar_lote()
+            if lote:
+                self._entregar(lote)
+
+    def _entregar(self, lote: List[Notificacion], intento: int = 0):
+        try:
+            self._transporte.enviar(lote)
+            self._enviadas += len(lote)
+            return
+        except Exception:
+            log.exception(
+                "Fallo al enviar %d notificaciones (intento %d)",
+                len(lote),
+                intento + 1,
+            )
+        if intento < self._max_reintentos:
+            vence = time.monotonic() + self._espera_reintento * 2**intento
+            heapq.heappush(
+                self._reintentos, (vence, next(self._secuencia), intento + 1, lote)
+            )
+        else:
+            self._fallidas.extend(lote)
+
+    @property
+    def pendientes(self) -> int:
+        # En cola más los que esperan un reintento.
+        return self._cola.qsize() + sum(len(r[3]) for r in list(self._reintentos))
+
+    @property
+    def enviadas(self) -> int:
+        return self._enviadas
+
+    @property
+    def fallidas(self) -> List[Notificacion]:
+        return list(self._fallidas)
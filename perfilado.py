@@ -0,0 +1,155 @@
+import cProfile
+import gc
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+
+# === PERFILADO BAJO DEMANDA Y REPORTE DE MEMORIA ===
+# Los perfiles se guardan en formato .prof (pstats, snakeviz) con un nombre
+# que incluye fecha y ruta; solo se conservan los más recientes.
+
+PERFILES_CONSERVADOS = 20
+LINEAS_RESUMEN = 40
+CONTENEDORES_PROPIOS = (list, dict, set, str, bytes)
+
+
+class AlmacenPerfiles:
+    def __init__(self, directorio: str, conservados: int = PERFILES_CONSERVADOS):
+        self._directorio = directorio
+        self._conservados = conservados
+        # cProfile no admite dos perfiladores activos a la vez en el proceso.
+        self._lock = threading.Lock()
+
+    @property
+    def directorio(self) -> str:
+        return self._directorio
+
+    def iniciar(self):
+        # Devuelve None si ya hay otra petición perfilándose.
+        if not self._lock.acquire(blocking=False):
+            return None
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            self._lock.release()
+            return None
+        return perfilador
+
+    def terminar(self, perfilador, metodo: str, ruta: str) -> str:
+        try:
+            perfilador.disable()
+        finally:
+            self._lock.release()
+        os.makedirs(self._directorio, exist_ok=True)
+        nombre = "{}-{}-{}.prof".format(
+            datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+            metodo.lower(),
+            re.sub(r"[^A-Za-z0-9]+", "_", ruta).strip("_") or "raiz",
+        )
+        perfilador.dump_stats(os.path.join(self._directorio, nombre))
+        self._limpiar()
+        return nombre
+
+    def listar(self) -> list:
+        try:
+            nombres = [n for n in os.listdir(self._directorio) if n.endswith(".prof")]
+        except OSError:
+            return []
+        return sorted(nombres, reverse=True)
+
+    def ruta(self, nombre: str):
+        # Solo nombres generados por terminar(), nunca rutas arbitrarias.
+        if nombre not in self.listar():
+            return None
+        return os.path.join(self._directorio, nombre)
+
+    def resumen(self, nombre: str, orden: str = "cumulative") -> str:
+        salida = io.StringIO()
+        estadisticas = pstats.Stats(self.ruta(nombre), stream=salida)
+        estadisticas.strip_dirs().sort_stats(orden).print_stats(LINEAS_RESUMEN)
+        return salida.getvalue()
+
+    def _limpiar(self):
+        for nombre in self.listar()[self._conservados :]:
+            try:
+                os.remove(os.path.join(self._directorio, nombre))
+            except OSError:
+                pass
+
+
+# --- MEMORIA POR CLASE DE DOMINIO ---
+def _bytes_aproximados(objeto) -> int:
+    # Objeto + su __dict__ + los contenedores que cuelgan directamente de él.
+    # No sigue referencias a otros objetos del dominio (se cuentan aparte).
+    total = sys.getsizeof(objeto)
+    atributos = getattr(objeto, "__dict__", None)
+    if atributos is not None:
+        total += sys.getsizeof(atributos)
+        for valor in atributos.values():
+            if type(valor) in CONTENEDORES_PROPIOS:
+                total += sys.getsizeof(valor)
+    return total
+
+
+def reporte_memoria(clases, top_lineas: int = 15) -> dict:
+    # Recorre los objetos rastreados por gc (una pasada, O(objetos vivos)).
+    buscadas = {clase: [0, 0] for clase in clases}
+    objetos = gc.get_objects()
+    rastreados = len(objetos)
+    for objeto in objetos:
+        fila = buscadas.get(type(objeto))
+        if fila is not None:
+            fila[0] += 1
+            fila[1] += _bytes_aproximados(objeto)
+    # La lista de gc no debe aparecer en la instantánea de tracemalloc.
+    del objetos
+    return {
+        "clases": [
+            {"clase": clase.__name__, "instancias": n, "bytes_aproximados": b}
+            for clase, (n, b) in sorted(
+                buscadas.items(), key=lambda item: item[1][1], reverse=True
+            )
+        ],
+        "gc": {
+            "objetos_rastreados": rastreados,
+            "conteo_generaciones": gc.get_count(),
+        },
+        "tracemalloc": _reporte_tracemalloc(top_lineas),
+    }
+
+
+_ultima_instantanea = None
+
+
+def _reporte_tracemalloc(top_lineas: int) -> dict:
+    global _ultima_instantanea
+    if not tracemalloc.is_tracing():
+        return {"activo": False}
+    actual, pico = tracemalloc.get_traced_memory()
+    instantanea = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    reporte = {
+        "activo": True,
+        "bytes_actuales": actual,
+        "bytes_pico": pico,
+        "lineas": [
+            {"linea": str(e.traceback), "bytes": e.size, "bloques": e.count}
+            for e in instantanea.statistics("lineno")[:top_lineas]
+        ],
+    }
+    # Crecimiento desde el reporte anterior: útil para ver qué acumula memoria
+    # a medida que crece el historial de préstamos.
+    if _ultima_instantanea is not None:
+        reporte["crecimiento"] = [
+            {"linea": str(d.traceback), "bytes": d.size_diff, "bloques": d.count_diff}
+            for d in instantanea.compare_to(_ultima_instantanea, "lineno")[:top_lineas]
+        ]
+    _ultima_instantanea = instantanea
+    return reporte
@@ -0,0 +1,228 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.request
+from xml.sax.saxutils import escape
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # opcional: sin Pillow solo hay portadas generadas (SVG)
+    Image = None
+
+# === CACHÉ LOCAL DE PORTADAS ===
+# Cada imagen se ingiere una sola vez: se reduce a los tamaños de la interfaz
+# y se guarda con el hash de su contenido como nombre (<hash>-<tamaño>.jpg).
+# Un nombre nunca cambia de contenido, así que se sirve con caché de un año.
+# origenes.json recuerda qué URL original corresponde a cada hash; los
+# materiales sin portada ingerida muestran una portada SVG generada aquí.
+# Cada worker relee origenes.json cuando cambia su mtime (lo revisa como mucho
+# una vez por INTERVALO_REVISION), así ve lo que descarga `flask
+# descargar-portadas` sin reiniciar.
+
+TAMANOS = {
+    "portada": (300, 400),
+    "miniatura": (80, 110),
+}
+CALIDAD_JPEG = 82
+MAX_BYTES_DESCARGA = 5 * 1024 * 1024
+COLORES_POR_TIPO = {
+    "Libro": "#5a0000",
+    "Revista": "#1f4e79",
+    "Tesis": "#3d2b56",
+    "MaterialDigital": "#2d2d2d",
+}
+# Las subidas desde el panel guardan en portada_url la ruta local de la
+# portada; así cualquier worker la resuelve sin releer origenes.json.
+PREFIJO_URL = "/portadas/"
+_URL_LOCAL = re.compile(re.escape(PREFIJO_URL) + r"([0-9a-f]{24})-portada\.jpg")
+INTERVALO_REVISION = 1.0
+LETRAS_POR_LINEA = 14
+MAX_LINEAS_TITULO = 4
+
+
+class AlmacenPortadas:
+    def __init__(self, directorio: str):
+        self._directorio = directorio
+        self._ruta_origenes = os.path.join(directorio, "origenes.json")
+        self._origenes: dict[str, str] = {}
+        self._mtime_origenes = None
+        self._proxima_revision = 0.0
+        # Sube cada vez que cambian los orígenes; entra en las claves de caché
+        # de las páginas que muestran portadas.
+        self._version = 0
+        self._generadas: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._recargar_origenes()
+
+    @property
+    def directorio(self) -> str:
+        return self._directorio
+
+    @property
+    def puede_redimensionar(self) -> bool:
+        return Image is not None
+
+    # --- INGESTA ---
+    def ingerir(self, datos: bytes, origen: str | None = None) -> str:
+        # Devuelve el hash del contenido; si ya estaba, no se recodifica.
+        if Image is None:
+            raise RuntimeError("Se necesita Pillow para ingerir imágenes.")
+        digesto = hashlib.sha256(datos).hexdigest()[:24]
+        os.makedirs(self._directorio, exist_ok=True)
+        faltantes = [
+            (tamano, medidas)
+            for tamano, medidas in TAMANOS.items()
+            if not os.path.exists(self._ruta(f"{digesto}-{tamano}.jpg"))
+        ]
+        if faltantes:
+            with Image.open(io.BytesIO(datos)) as imagen:
+                imagen = ImageOps.exif_transpose(imagen).convert("RGB")
+                for tamano, medidas in faltantes:
+                    miniatura = ImageOps.fit(imagen, medidas, Image.LANCZOS)
+                    self._escribir(
+                        f"{digesto}-{tamano}.jpg",
+                        lambda f: miniatura.save(
+                            f, "JPEG", quality=CALIDAD_JPEG, optimize=True
+                        ),
+                    )
+        if origen:
+            self._registrar_origen(origen, digesto)
+        return digesto
+
+    def descargar(self, url: str, timeout: float = 10.0) -> str:
+        with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+            datos = respuesta.read(MAX_BYTES_DESCARGA + 1)
+        if len(datos) > MAX_BYTES_DESCARGA:
+            raise ValueError("La imagen supera el tamaño máximo.")
+        return self.ingerir(datos, origen=url)
+
+    def url_local(self, digesto: str) -> str:
+        return f"{PREFIJO_URL}{digesto}-portada.jpg"
+
+    def tiene_origen(self, origen: str) -> bool:
+        self._revisar_origenes()
+        return origen in self._origenes
+
+    @property
+    def version(self) -> int:
+        self._revisar_origenes()
+        return self._version
+
+    def _registrar_origen(self, origen: str, digesto: str):
+        with self._lock:
+            # Se parte de lo que haya en disco para no pisar lo que otro
+            # proceso registró desde la última lectura.
+            self._leer_origenes()
+            origenes = dict(self._origenes, **{origen: digesto})
+            contenido = json.dumps(origenes, ensure_ascii=False).encode()
+            self._escribir("origenes.json", lambda f: f.write(contenido))
+            self._origenes = origenes
+            self._mtime_origenes = os.stat(self._ruta_origenes).st_mtime_ns
+            self._version += 1
+
+    def _revisar_origenes(self):
+        ahora = time.monotonic()
+        if ahora >= self._proxima_revision:
+            self._proxima_revision = ahora + INTERVALO_REVISION
+            self._recargar_origenes()
+
+    def _recargar_origenes(self):
+        with self._lock:
+            self._leer_origenes()
+
+    def _leer_origenes(self):
+        # Solo relee si cambió el mtime; origenes.json se reemplaza de forma
+        # atómica, así que nunca se lee a medio escribir.
+        try:
+            mtime = os.stat(self._ruta_origenes).st_mtime_ns
+            if mtime == self._mtime_origenes:
+                return
+            with open(self._ruta_origenes, encoding="utf-8") as f:
+                origenes = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._origenes = origenes
+        self._mtime_origenes = mtime
+        self._version += 1
+
+    # --- NOMBRES PARA LAS PLANTILLAS ---
+    def nombre_archivo(self, material, tamano: str = "portada") -> str:
+        self._revisar_origenes()
+        digesto = self._origenes.get(material.portada_url)
+        if digesto is None:
+            local = _URL_LOCAL.fullmatch(material.portada_url or "")
+            digesto = local.group(1) if local else None
+        if digesto is not None:
+            return f"{digesto}-{tamano}.jpg"
+        return self._portada_generada(material)
+
+    def _portada_generada(self, material) -> str:
+        # SVG liviano con título y autor; vale para cualquier tamaño.
+        tipo = material.__class__.__name__
+        clave = (material.titulo, material.autor, tipo)
+        nombre = self._generadas.get(clave)
+        if nombre is None:
+            svg = _svg_portada(material.titulo, material.autor, tipo).encode()
+            nombre = f"{hashlib.sha256(svg).hexdigest()[:24]}.svg"
+            if not os.path.exists(self._ruta(nombre)):
+                os.makedirs(self._directorio, exist_ok=True)
+                self._escribir(nombre, lambda f: f.write(svg))
+            self._generadas[clave] = nombre
+        return nombre
+
+    # --- ARCHIVOS ---
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self._directorio, nombre)
+
+    def _escribir(self, nombre: str, escribir):
+        # Escritura atómica: otro worker nunca ve un archivo a medias.
+        descriptor, temporal = tempfile.mkstemp(dir=self._directorio)
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                escribir(f)
+            os.replace(temporal, self._ruta(nombre))
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+
+def _partir_titulo(titulo: str) -> list:
+    lineas = []
+    actual = ""
+    for palabra in titulo.split():
+        if actual and len(actual) + 1 + len(palabra) > LETRAS_POR_LINEA:
+            lineas.append(actual)
+            actual = palabra
+        else:
+            actual = f"{actual} {palabra}".strip()
+    if actual:
+        lineas.append(actual)
+    if len(lineas) > MAX_LINEAS_TITULO:
+        lineas = lineas[:MAX_LINEAS_TITULO]
+        lineas[-1] += "…"
+    return lineas
+
+
+def _svg_portada(titulo: str, autor: str, tipo: str) -> str:
+    ancho, alto = TAMANOS["portada"]
+    color = COLORES_POR_TIPO.get(tipo, "#5a0000")
+    lineas = _partir_titulo(titulo)
+    inicio = alto // 2 - 20 * (len(lineas) - 1)
+    textos = "".join(
+        f'<text x="{ancho // 2}" y="{inicio + 40 * i}" font-size="30" '
+        f'font-weight="bold">{escape(linea)}</text>'
+        for i, linea in enumerate(lineas)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{ancho}" height="{alto}" '
+        f'viewBox="0 0 {ancho} {alto}">'
+        f'<rect width="100%" height="100%" fill="{color}"/>'
+        f'<g fill="#ffffff" font-family="sans-serif" text-anchor="middle">{textos}'
+        f'<text x="{ancho // 2}" y="{alto - 30}" font-size="18" opacity="0.8">'
+        f"{escape(autor[:30])}</text></g></svg>"
+    )
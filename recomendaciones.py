@@ -0,0 +1,454 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# === EMBEDDINGS DENSOS (LSA) E ÍNDICE DE VECINOS APROXIMADOS ===
+
+
+def reducir_lsa(tfidf_matrix, dimensiones: int = 128, semilla: int = 0):
+    # TruncatedSVD sobre la matriz TF-IDF (LSA). Devuelve vectores float32 de
+    # norma 1, de modo que el producto punto es la similitud del coseno.
+    n_docs, n_terminos = tfidf_matrix.shape
+    dimensiones = min(dimensiones, n_docs - 1, n_terminos - 1)
+    if dimensiones < 2:
+        return None
+    svd = TruncatedSVD(n_components=dimensiones, random_state=semilla)
+    embeddings = svd.fit_transform(tfidf_matrix).astype(np.float32)
+    normas = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return embeddings / normas
+
+
+class IndiceVecinos:
+    # Índice IVF: los embeddings se agrupan con k-means en ~sqrt(n) listas.
+    # Una consulta compara contra los centroides y solo recorre las
+    # n_sondeos listas más cercanas, así el costo crece de forma sublineal.
+
+    ARCHIVOS = ("embeddings", "centroides", "orden", "inicios", "ids")
+
+    def __init__(self, embeddings, centroides, orden, inicios, ids):
+        self._embeddings = embeddings
+        self._centroides = centroides
+        self._orden = orden
+        self._inicios = inicios
+        self._ids = ids
+        self._fila_por_id = {int(i): fila for fila, i in enumerate(ids)}
+
+    @classmethod
+    def construir(cls, embeddings, ids, n_listas: int | None = None, semilla=0):
+        n = len(embeddings)
+        n_listas = n_listas or max(1, int(np.sqrt(n)))
+        if n_listas > 1:
+            kmeans = MiniBatchKMeans(
+                n_clusters=n_listas, random_state=semilla, n_init=3
+            ).fit(embeddings)
+            asignaciones = kmeans.labels_
+            centroides = kmeans.cluster_centers_.astype(np.float32)
+        else:
+            asignaciones = np.zeros(n, dtype=np.int64)
+            centroides = embeddings.mean(axis=0, keepdims=True).astype(np.float32)
+        orden = np.argsort(asignaciones, kind="stable").astype(np.int64)
+        conteos = np.bincount(asignaciones, minlength=len(centroides))
+        inicios = np.concatenate(([0], np.cumsum(conteos))).astype(np.int64)
+        return cls(embeddings, centroides, orden, inicios, np.asarray(ids))
+
+    def vecinos(self, material_id: int, k: int = 3, n_sondeos: int = 8):
+        fila = self._fila_por_id.get(material_id)
+        if fila is None:
+            return []
+        consulta = self._embeddings[fila]
+        n_sondeos = min(n_sondeos, len(self._centroides))
+        listas = np.argpartition(-(self._centroides @ consulta), n_sondeos - 1)[
+            :n_sondeos
+        ]
+        candidatos = np.concatenate(
+            [
+                self._orden[self._inicios[lista] : self._inicios[lista + 1]]
+                for lista in listas
+            ]
+        )
+        candidatos = candidatos[candidatos != fila]
+        if len(candidatos) == 0:
+            return []
+        puntajes = self._embeddings[candidatos] @ consulta
+        k = min(k, len(candidatos))
+        mejores = np.argpartition(-puntajes, k - 1)[:k]
+        mejores = mejores[np.argsort(-puntajes[mejores], kind="stable")]
+        return [(int(self._ids[candidatos[i]]), float(puntajes[i])) for i in mejores]
+
+    def guardar(self, directorio: str):
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in self.ARCHIVOS:
+            np.save(
+                os.path.join(directorio, f"{nombre}.npy"), getattr(self, f"_{nombre}")
+            )
+
+    @classmethod
+    def cargar(cls, directorio: str):
+        # Carga con mmap: los workers comparten las páginas del sistema operativo.
+        rutas = [os.path.join(directorio, f"{n}.npy") for n in cls.ARCHIVOS]
+        if not all(os.path.exists(r) for r in rutas):
+            return None
+        return cls(*(np.load(r, mmap_mode="r") for r in rutas))
+
+    @property
+    def ids(self):
+        return self._ids
+
+
+# === ARTEFACTOS PERSISTIDOS (ARRANQUE EN CALIENTE) ===
+# El vectorizador, la matriz TF-IDF y la tabla de vecinos se guardan en
+# <directorio>/<suma del catálogo>/. Si el catálogo no cambió, los workers
+# cargan esos archivos (con mmap) en lugar de reentrenar. <directorio>/ACTUAL
+# nombra la última versión publicada; la limpieza nunca la borra.
+
+PARAMETROS_TFIDF = {
+    "stop_words": "english",
+    "max_features": 500,
+    "strip_accents": "unicode",
+}
+K_VECINOS = 10
+ARTEFACTOS_CONSERVADOS = 2
+ARCHIVO_ACTUAL = "ACTUAL"
+
+
+def suma_verificacion(ids, documentos, usar_embeddings: bool = False) -> str:
+    suma = hashlib.sha256()
+    parametros = dict(PARAMETROS_TFIDF, embeddings=usar_embeddings, k=K_VECINOS)
+    suma.update(json.dumps(parametros, sort_keys=True).encode("utf-8"))
+    for material_id, documento in zip(ids, documentos):
+        suma.update(f"{material_id}\x1f{documento}\x1e".encode("utf-8"))
+    return suma.hexdigest()[:16]
+
+
+def vecinos_exactos(matriz, k: int = K_VECINOS, memoria_bloque: int = 5_000_000):
+    # Top-k por fila de la similitud del coseno, calculado por bloques de
+    # filas para no materializar nunca la matriz N x N completa.
+    n = matriz.shape[0]
+    k = min(k, n - 1)
+    vecinos = np.full((n, max(k, 0)), -1, dtype=np.int32)
+    puntajes = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return vecinos, puntajes
+    bloque = max(1, memoria_bloque // n)
+    traspuesta = matriz.T.tocsc()
+    for inicio in range(0, n, bloque):
+        fin = min(n, inicio + bloque)
+        similitudes = (matriz[inicio:fin] @ traspuesta).toarray()
+        filas = np.arange(fin - inicio)
+        similitudes[filas, filas + inicio] = -np.inf
+        mejores = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+        valores = np.take_along_axis(similitudes, mejores, axis=1)
+        orden = np.argsort(-valores, axis=1, kind="stable")
+        vecinos[inicio:fin] = np.take_along_axis(mejores, orden, axis=1)
+        puntajes[inicio:fin] = np.take_along_axis(valores, orden, axis=1)
+    return vecinos, puntajes
+
+
+class ArtefactosRecomendacion:
+    def __init__(self, vectorizador, matriz, ids, vecinos, puntajes, indice_ann=None):
+        self._vectorizador = vectorizador
+        self._matriz = matriz
+        self._ids = ids
+        self._vecinos = vecinos
+        self._puntajes = puntajes
+        self._indice_ann = indice_ann
+
+    @property
+    def vectorizador(self):
+        return self._vectorizador
+
+    @property
+    def matriz(self):
+        return self._matriz
+
+    @property
+    def ids(self):
+        return self._ids
+
+    @property
+    def vecinos(self):
+        return self._vecinos
+
+    @property
+    def puntajes(self):
+        return self._puntajes
+
+    @property
+    def indice_ann(self):
+        return self._indice_ann
+
+
+def construir_artefactos(documentos, ids, usar_embeddings: bool = False):
+    vectorizador = TfidfVectorizer(**PARAMETROS_TFIDF)
+    matriz = vectorizador.fit_transform(documentos).tocsr()
+    vecinos, puntajes = vecinos_exactos(matriz)
+    indice_ann = None
+    if usar_embeddings:
+        embeddings = reducir_lsa(matriz)
+        if embeddings is not None:
+            indice_ann = IndiceVecinos.construir(embeddings, ids)
+    return ArtefactosRecomendacion(
+        vectorizador, matriz, np.asarray(ids), vecinos, puntajes, indice_ann
+    )
+
+
+def guardar_artefactos(artefactos, directorio: str, suma: str):
+    # Se escribe en un directorio temporal y se renombra al final: un worker
+    # nunca ve un artefacto a medio escribir.
+    destino = os.path.join(directorio, suma)
+    if os.path.isdir(destino):
+        _publicar_version(directorio, suma)
+        return
+    os.makedirs(directorio, exist_ok=True)
+    temporal = tempfile.mkdtemp(prefix=".construyendo-", dir=directorio)
+    joblib.dump(artefactos.vectorizador, os.path.join(temporal, "vectorizador.joblib"))
+    matriz = artefactos.matriz
+    np.save(os.path.join(temporal, "tfidf_data.npy"), matriz.data)
+    np.save(os.path.join(temporal, "tfidf_indices.npy"), matriz.indices)
+    np.save(os.path.join(temporal, "tfidf_indptr.npy"), matriz.indptr)
+    np.save(os.path.join(temporal, "tfidf_forma.npy"), np.asarray(matriz.shape))
+    np.save(os.path.join(temporal, "ids.npy"), artefactos.ids)
+    np.save(os.path.join(temporal, "vecinos.npy"), artefactos.vecinos)
+    np.save(os.path.join(temporal, "puntajes_vecinos.npy"), artefactos.puntajes)
+    if artefactos.indice_ann is not None:
+        artefactos.indice_ann.guardar(os.path.join(temporal, "ann"))
+    with open(os.path.join(temporal, "version.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "suma": suma,
+                "documentos": len(artefactos.ids),
+                "embeddings": artefactos.indice_ann is not None,
+            },
+            f,
+        )
+    try:
+        os.rename(temporal, destino)
+    except OSError:
+        # Otro proceso publicó la misma versión primero.
+        shutil.rmtree(temporal, ignore_errors=True)
+    _publicar_version(directorio, suma)
+    _limpiar_artefactos_antiguos(directorio)
+
+
+def _publicar_version(directorio: str, suma: str):
+    # El puntero se reemplaza con un rename atómico: quien lo lee ve la
+    # versión anterior o la nueva, nunca un archivo a medias.
+    descriptor, temporal = tempfile.mkstemp(prefix=".actual-", dir=directorio)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+        f.write(suma)
+    os.replace(temporal, os.path.join(directorio, ARCHIVO_ACTUAL))
+
+
+def _version_publicada(directorio: str) -> str | None:
+    try:
+        with open(os.path.join(directorio, ARCHIVO_ACTUAL), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _limpiar_artefactos_antiguos(directorio: str):
+    # Conserva la versión publicada y las ARTEFACTOS_CONSERVADOS más recientes.
+    # Las demás se renombran antes de borrarlas, así un worker que aún las
+    # carga encuentra la carpeta completa o no la encuentra (ver
+    # cargar_artefactos), nunca una a medio borrar.
+    publicada = _version_publicada(directorio)
+    versiones = sorted(
+        (
+            nombre
+            for nombre in os.listdir(directorio)
+            if not nombre.startswith(".")
+            and os.path.isdir(os.path.join(directorio, nombre))
+        ),
+        key=lambda nombre: os.path.getmtime(os.path.join(directorio, nombre)),
+        reverse=True,
+    )
+    for nombre in versiones[ARTEFACTOS_CONSERVADOS:]:
+        if nombre == publicada:
+            continue
+        descartada = os.path.join(directorio, f".borrando-{nombre}")
+        try:
+            os.rename(os.path.join(directorio, nombre), descartada)
+        except OSError:
+            continue
+        shutil.rmtree(descartada, ignore_errors=True)
+
+
+def cargar_artefactos(directorio: str, suma: str):
+    # None si la versión no está en disco o desapareció a mitad de la carga
+    # (otro proceso la limpió): quien llama la reconstruye y la vuelve a
+    # publicar. Lo ya mapeado sigue siendo válido aunque se borren los archivos.
+    ruta = os.path.join(directorio, suma)
+    try:
+        with open(os.path.join(ruta, "version.json"), encoding="utf-8") as f:
+            metadatos = json.load(f)
+
+        def cargar(nombre):
+            return np.load(os.path.join(ruta, f"{nombre}.npy"), mmap_mode="r")
+
+        forma = tuple(int(x) for x in np.load(os.path.join(ruta, "tfidf_forma.npy")))
+        matriz = sp.csr_matrix(
+            (cargar("tfidf_data"), cargar("tfidf_indices"), cargar("tfidf_indptr")),
+            shape=forma,
+            copy=False,
+        )
+        indice_ann = None
+        if metadatos.get("embeddings"):
+            indice_ann = IndiceVecinos.cargar(os.path.join(ruta, "ann"))
+            if indice_ann is None:
+                return None
+        return ArtefactosRecomendacion(
+            joblib.load(os.path.join(ruta, "vectorizador.joblib")),
+            matriz,
+            cargar("ids"),
+            cargar("vecinos"),
+            cargar("puntajes_vecinos"),
+            indice_ann,
+        )
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+# === FILTRO COLABORATIVO ÍTEM-ÍTEM (HISTORIAL DE PRÉSTAMOS) ===
+# "Quienes pidieron esto también pidieron": similitud del coseno entre las
+# columnas de la matriz dispersa usuario x material de préstamos. Solo se
+# guardan los K_VECINOS más similares de cada material.
+
+
+class FiltroColaborativo:
+    def __init__(self, ids, vecinos, puntajes):
+        self._ids = ids
+        self._vecinos = vecinos
+        self._puntajes = puntajes
+        self._fila_por_id = {int(i): fila for fila, i in enumerate(ids)}
+
+    @classmethod
+    def construir(cls, pares, k: int = K_VECINOS):
+        # pares: iterable de (usuario_id, material_id). Se vuelcan directo a
+        # un arreglo int64, sin listas intermedias de tuplas.
+        planos = np.fromiter(itertools.chain.from_iterable(pares), dtype=np.int64)
+        pares = planos.reshape(-1, 2)
+        if len(pares) == 0:
+            vacio = np.empty((0, 0), dtype=np.int32)
+            return cls(np.empty(0, dtype=np.int64), vacio, vacio.astype(np.float32))
+        ids_usuarios, filas = np.unique(pares[:, 0], return_inverse=True)
+        ids_materiales, columnas = np.unique(pares[:, 1], return_inverse=True)
+        prestamos = sp.csr_matrix(
+            (np.ones(len(pares), dtype=np.float32), (filas, columnas)),
+            shape=(len(ids_usuarios), len(ids_materiales)),
+        )
+        # Pedir el mismo material varias veces cuenta como una sola señal.
+        prestamos.sum_duplicates()
+        prestamos.data[:] = 1.0
+        materiales = normalize(prestamos.T.tocsr())
+        vecinos, puntajes = vecinos_exactos(materiales, k)
+        return cls(ids_materiales, vecinos, puntajes)
+
+    def vecinos(self, material_id: int, k: int = 3):
+        fila = self._fila_por_id.get(material_id)
+        if fila is None:
+            return []
+        return [
+            (int(self._ids[j]), float(p))
+            for j, p in zip(self._vecinos[fila][:k], self._puntajes[fila][:k])
+            if j >= 0 and p > 0
+        ]
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def mezclar_recomendaciones(contenido, colaborativo, peso_colaborativo=0.5, k=3):
+    # Combina dos listas [(id, puntaje)] con una media ponderada; un material
+    # ausente en una de las listas aporta 0 en ella.
+    combinados = {}
+    for material_id, puntaje in contenido:
+        combinados[material_id] = (1 - peso_colaborativo) * puntaje
+    for material_id, puntaje in colaborativo:
+        combinados[material_id] = (
+            combinados.get(material_id, 0.0) + peso_colaborativo * puntaje
+        )
+    mejores = sorted(combinados.items(), key=lambda x: x[1], reverse=True)
+    return [material_id for material_id, _ in mejores[:k]]
+
+
+# --- MODELO COMPLETO QUE CONSULTAN LAS VISTAS ---
+class Recomendador:
+    # Artefactos por contenido y filtro colaborativo vigentes. No se modifica:
+    # cada reconstrucción arma uno nuevo y reemplaza una sola referencia, así
+    # una petición nunca combina la matriz de una versión con la tabla de otra.
+    def __init__(self, artefactos=None, filtro=None, version: int = 0):
+        self._artefactos = artefactos
+        self._filtro = filtro
+        self._version = version
+        ids = artefactos.ids if artefactos is not None else ()
+        self._fila_por_id = {int(i): fila for fila, i in enumerate(ids)}
+
+    def con_artefactos(self, artefactos) -> "Recomendador":
+        return Recomendador(artefactos, self._filtro, self._version + 1)
+
+    def con_filtro(self, filtro) -> "Recomendador":
+        return Recomendador(self._artefactos, filtro, self._version + 1)
+
+    @property
+    def artefactos(self):
+        return self._artefactos
+
+    @property
+    def filtro(self):
+        return self._filtro
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def ids(self):
+        return self._fila_por_id.keys()
+
+    def puntuar_consulta(self, consulta: str):
+        # Similitud del coseno de la consulta con cada material (filas de la
+        # matriz en el orden de artefactos.ids); None si no aporta términos.
+        if self._artefactos is None:
+            return None
+        vector = self._artefactos.vectorizador.transform([consulta.lower()])
+        if vector.nnz == 0:
+            return None
+        return (self._artefactos.matriz @ vector.T).toarray().ravel()
+
+    def vecinos_contenido(self, material_id: int):
+        # Fila completa de la tabla exacta de vecinos.
+        fila = self._fila_por_id.get(material_id)
+        if fila is None:
+            return []
+        ids = self._artefactos.ids
+        return [
+            (int(ids[j]), float(p))
+            for j, p in zip(
+                self._artefactos.vecinos[fila], self._artefactos.puntajes[fila]
+            )
+            if j >= 0
+        ]
+
+    def vecinos_aproximados(self, material_id: int, k: int = 10):
+        # Índice ANN si se entrenó con embeddings; si no, la tabla exacta.
+        if self._artefactos is not None and self._artefactos.indice_ann is not None:
+            return self._artefactos.indice_ann.vecinos(material_id, k=k)
+        return self.vecinos_contenido(material_id)
+
+    def vecinos_colaborativos(self, material_id: int, k: int = 10):
+        if self._filtro is None:
+            return []
+        return self._filtro.vecinos(material_id, k=k)
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List
+
+from models import Biblioteca, Prestamo, Usuario
+from notificaciones import DespachadorNotificaciones, Notificacion
+
+# === RECORDATORIOS DE VENCIMIENTO (tarea por lotes) ===
+# Toma del índice de vencimientos los préstamos abiertos que vencen en los
+# próximos días o ya vencieron, los agrupa por usuario y encola un solo
+# aviso por persona.
+
+DIAS_AVISO = 3
+
+
+def agrupar_por_usuario(
+    biblioteca: Biblioteca, fecha_actual: date, dias_aviso: int = DIAS_AVISO
+) -> Dict[Usuario, List[Prestamo]]:
+    grupos: Dict[Usuario, List[Prestamo]] = defaultdict(list)
+    for p in biblioteca.prestamos_por_vencer(fecha_actual + timedelta(dias_aviso)):
+        grupos[p.usuario].append(p)
+    return grupos
+
+
+def redactar_recordatorio(
+    usuario: Usuario, prestamos: List[Prestamo], fecha_actual: date
+) -> Notificacion:
+    vencidos = [p for p in prestamos if p.fecha_vencimiento < fecha_actual]
+    por_vencer = [p for p in prestamos if p.fecha_vencimiento >= fecha_actual]
+    lineas = []
+    if vencidos:
+        lineas.append("Préstamos vencidos:")
+        for p in vencidos:
+            dias = (fecha_actual - p.fecha_vencimiento).days
+            lineas.append(
+                f"  - '{p.material.titulo}': {dias} día(s) de retraso, "
+                f"multa acumulada S/. {p.calcular_multa(fecha_actual):.2f}"
+            )
+    if por_vencer:
+        lineas.append("Préstamos por vencer:")
+        for p in por_vencer:
+            lineas.append(
+                f"  - '{p.material.titulo}': vence el "
+                f"{p.fecha_vencimiento.strftime('%d-%m-%Y')}"
+            )
+    asunto = (
+        f"Tienes {len(vencidos)} préstamo(s) vencido(s)"
+        if vencidos
+        else f"{len(por_vencer)} préstamo(s) por vencer"
+    )
+    return Notificacion(usuario.correo, usuario.nombre, asunto, "\n".join(lineas))
+
+
+def enviar_recordatorios(
+    biblioteca: Biblioteca,
+    despachador: DespachadorNotificaciones,
+    fecha_actual: date,
+    dias_aviso: int = DIAS_AVISO,
+) -> int:
+    # Devuelve cuántos usuarios recibieron recordatorio.
+    grupos = agrupar_por_usuario(biblioteca, fecha_actual, dias_aviso)
+    for usuario, prestamos in grupos.items():
+        despachador.encolar(redactar_recordatorio(usuario, prestamos, fecha_actual))
+    return len(grupos)
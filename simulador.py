@@ -0,0 +1,353 @@
+import argparse
+import heapq
+import json
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+
+from models import (
+    Biblioteca,
+    Estudiante,
+    Libro,
+    Profesor,
+    Resena,
+    Revista,
+    Tesis,
+)
+
+# === SIMULADOR DE EVENTOS DISCRETOS ===
+# Lleva una Biblioteca sintética por uno o varios semestres. Cada evento
+# (solicitud, devolución, renovación, retiro de reserva, reseña, cierre del
+# día) vive en un heap ordenado por fecha simulada y se aplica con los mismos
+# métodos del modelo que usa la web.
+#
+# Solo las solicitudes son una tasa de llegada (Poisson, por usuario y día).
+# El resto son probabilidades por evento, condicionadas al que las origina:
+#   prob_reserva     una solicitud rechazada por falta de stock deja reserva
+#   prob_renovacion  un préstamo se renueva (el día antes de vencer)
+#   prob_retraso     un préstamo se devuelve tarde (atraso geométrico, media
+#                    5 días); si no, en un día uniforme dentro del plazo
+#   prob_resena      una devolución deja reseña
+# Así, devoluciones, renovaciones, reservas y reseñas siguen al volumen de
+# préstamos en lugar de llegar a un ritmo propio.
+#
+#   python simulador.py --estudiantes 50000 --materiales 8000 --dias 120
+
+SOLICITUD = "solicitud"
+DEVOLUCION = "devolucion"
+RENOVACION = "renovacion"
+RETIRO_RESERVA = "retiro_reserva"
+RESENA = "resena"
+CIERRE_DIA = "cierre_dia"
+
+MATERIAS = ["Programación", "Matemáticas", "Ciencias", "Medicina", "Derecho"]
+
+
+class Simulador:
+    def __init__(
+        self,
+        estudiantes: int = 2000,
+        profesores: int = 100,
+        materiales: int = 1000,
+        unidades_max: int = 5,
+        dias: int = 120,
+        solicitudes_por_usuario: float = 0.05,
+        prob_reserva: float = 0.5,
+        prob_renovacion: float = 0.3,
+        prob_resena: float = 0.1,
+        prob_retraso: float = 0.15,
+        zipf: float = 1.2,
+        semilla: int = 0,
+        inicio: date | None = None,
+    ):
+        self._rng = np.random.default_rng(semilla)
+        self._dias = dias
+        self._solicitudes_por_dia = solicitudes_por_usuario * (estudiantes + profesores)
+        self._prob_reserva = prob_reserva
+        self._prob_renovacion = prob_renovacion
+        self._prob_resena = prob_resena
+        self._prob_retraso = prob_retraso
+        self._inicio = inicio or date.today()
+        self._fin = self._inicio + timedelta(days=dias)
+
+        self._biblioteca = Biblioteca()
+        self._usuarios = []
+        for i in range(estudiantes):
+            self._usuarios.append(
+                Estudiante(
+                    i + 1,
+                    f"Estudiante {i + 1}",
+                    f"e{i + 1}@uni.edu",
+                    MATERIAS[i % len(MATERIAS)],
+                    1 + i % 10,
+                )
+            )
+        for i in range(profesores):
+            self._usuarios.append(
+                Profesor(
+                    estudiantes + i + 1,
+                    f"Profesor {i + 1}",
+                    f"p{i + 1}@uni.edu",
+                    MATERIAS[i % len(MATERIAS)],
+                    "Tiempo Completo",
+                )
+            )
+        for u in self._usuarios:
+            self._biblioteca.agregar_usuario(u)
+
+        self._materiales = [
+            self._crear_material(i, int(self._rng.integers(1, unidades_max + 1)))
+            for i in range(materiales)
+        ]
+        for m in self._materiales:
+            self._biblioteca.agregar_material(m)
+        # Popularidad tipo Zipf: pocos títulos concentran la mayoría de pedidos.
+        pesos = 1.0 / np.arange(1, materiales + 1) ** zipf
+        self._popularidad = pesos / pesos.sum()
+
+        self._eventos = []
+        self._secuencia = 0
+        self._conteo = Counter()
+        self._rechazos = Counter()
+        self._colas_maximas = []
+        self._uso_diario = []
+        self._total_unidades = sum(m.total_unidades for m in self._materiales)
+
+    def _crear_material(self, i: int, unidades: int):
+        materia = MATERIAS[i % len(MATERIAS)]
+        datos = dict(
+            id=i + 1,
+            titulo=f"Material {i + 1}",
+            autor=f"Autor {i % 997}",
+            descripcion=f"Material sintético de {materia}",
+            portada_url="",
+            materia=materia,
+            total_unidades=unidades,
+        )
+        tipo = i % 10
+        if tipo < 7:
+            return Libro(año_publicacion=2020, editorial="Editorial", **datos)
+        if tipo < 9:
+            return Revista(año_publicacion=2023, numero_edicion=1 + i % 12, **datos)
+        return Tesis(año_defensa=2021, universidad="Universidad", **datos)
+
+    # --- Heap de eventos ---
+    def _programar(self, fecha: date, tipo: str, *datos):
+        # El cierre del día va después de cualquier otro evento de esa fecha.
+        prioridad = 1 if tipo == CIERRE_DIA else 0
+        self._secuencia += 1
+        heapq.heappush(self._eventos, (fecha, prioridad, self._secuencia, tipo, datos))
+
+    def _programar_dia(self, fecha: date):
+        n = int(self._rng.poisson(self._solicitudes_por_dia))
+        usuarios = self._rng.integers(0, len(self._usuarios), n)
+        materiales = self._rng.choice(len(self._materiales), n, p=self._popularidad)
+        for u, m in zip(usuarios, materiales):
+            self._programar(fecha, SOLICITUD, self._usuarios[u], self._materiales[m])
+        self._programar(fecha, CIERRE_DIA)
+
+    # --- Manejadores ---
+    def _solicitud(self, fecha, usuario, material):
+        (exito, mensaje) = self._biblioteca.realizar_prestamo(usuario, material, fecha)
+        if exito:
+            self._conteo["prestamos"] += 1
+            self._programar_fin_prestamo(usuario.prestamos[-1])
+            return
+        self._rechazos[mensaje.split(".")[0]] += 1
+        if not material.esta_disponible and self._rng.random() < self._prob_reserva:
+            (reservado, _) = self._biblioteca.realizar_reserva(usuario, material)
+            if reservado:
+                self._conteo["reservas"] += 1
+
+    def _programar_fin_prestamo(self, prestamo):
+        if self._rng.random() < self._prob_renovacion:
+            self._programar(
+                prestamo.fecha_vencimiento - timedelta(days=1), RENOVACION, prestamo
+            )
+        else:
+            self._programar_devolucion(prestamo, prestamo.fecha_prestamo)
+
+    def _programar_devolucion(self, prestamo, desde: date):
+        # Devuelve en algún día del plazo, o tarde con probabilidad prob_retraso.
+        plazo = max(1, (prestamo.fecha_vencimiento - desde).days)
+        if self._rng.random() < self._prob_retraso:
+            dias = plazo + int(self._rng.geometric(0.2))
+        else:
+            dias = int(self._rng.integers(1, plazo + 1))
+        self._programar(desde + timedelta(days=dias), DEVOLUCION, prestamo)
+
+    def _renovacion(self, fecha, prestamo):
+        (exito, _) = prestamo.realizar_renovacion(fecha)
+        self._conteo["renovaciones" if exito else "renovaciones_rechazadas"] += 1
+        self._programar_devolucion(prestamo, fecha)
+
+    def _devolucion(self, fecha, prestamo):
+        nuevo_estado = prestamo.devolver(fecha)
+        if nuevo_estado is None:
+            return
+        self._conteo["devoluciones"] += 1
+        if nuevo_estado.usuario_notificado is not None:
+            espera = int(self._rng.integers(1, 4))
+            self._programar(
+                fecha + timedelta(days=espera),
+                RETIRO_RESERVA,
+                nuevo_estado.usuario_notificado,
+                prestamo.material,
+            )
+        if self._rng.random() < self._prob_resena:
+            self._programar(fecha, RESENA, prestamo.usuario, prestamo.material)
+
+    def _retiro_reserva(self, fecha, usuario, material):
+        (exito, _) = self._biblioteca.entregar_reserva(usuario, material, fecha)
+        if exito:
+            self._conteo["reservas_entregadas"] += 1
+            self._programar_fin_prestamo(usuario.prestamos[-1])
+
+    def _resena(self, fecha, usuario, material):
+        calificacion = int(self._rng.integers(1, 6))
+        material.agregar_resena(Resena(usuario, calificacion, "", fecha))
+        self._conteo["resenas"] += 1
+
+    def _cierre_dia(self, fecha):
+        for p in self._biblioteca.prestamos_por_vencer(fecha - timedelta(days=1)):
+            if p.marcar_vencido(fecha):
+                self._conteo["vencimientos"] += 1
+        self._colas_maximas.append(
+            max((len(m.lista_reservas) for m in self._materiales), default=0)
+        )
+        self._uso_diario.append(self._biblioteca.resumenes.abiertos)
+        # Las llegadas de cada día se generan al cerrar el anterior, así el
+        # heap solo guarda un día de solicitudes a la vez.
+        siguiente = fecha + timedelta(days=1)
+        if siguiente < self._fin:
+            self._programar_dia(siguiente)
+
+    def ejecutar(self) -> dict:
+        manejadores = {
+            SOLICITUD: self._solicitud,
+            DEVOLUCION: self._devolucion,
+            RENOVACION: self._renovacion,
+            RETIRO_RESERVA: self._retiro_reserva,
+            RESENA: self._resena,
+            CIERRE_DIA: self._cierre_dia,
+        }
+        self._programar_dia(self._inicio)
+        procesados = 0
+        reloj = time.perf_counter()
+        while self._eventos:
+            fecha, _, _, tipo, datos = heapq.heappop(self._eventos)
+            if fecha >= self._fin:
+                break
+            manejadores[tipo](fecha, *datos)
+            procesados += 1
+        segundos = time.perf_counter() - reloj
+        return self._reporte(procesados, segundos)
+
+    def _reporte(self, procesados: int, segundos: float) -> dict:
+        colas = [len(m.lista_reservas) for m in self._materiales]
+        totales = self._biblioteca.resumenes.totales
+        return {
+            "dias_simulados": self._dias,
+            "usuarios": len(self._usuarios),
+            "materiales": len(self._materiales),
+            "unidades": self._total_unidades,
+            "eventos": procesados,
+            "segundos": round(segundos, 3),
+            "eventos_por_segundo": round(procesados / segundos) if segundos else None,
+            "operaciones": dict(self._conteo),
+            "rechazos": dict(self._rechazos.most_common(5)),
+            "cola_reservas": {
+                "maxima": max(self._colas_maximas, default=0),
+                "maxima_promedio_diaria": round(
+                    float(np.mean(self._colas_maximas)) if self._colas_maximas else 0, 2
+                ),
+                "al_final_total": sum(colas),
+                "materiales_con_cola": sum(1 for c in colas if c),
+            },
+            "uso_stock": {
+                "prestamos_abiertos_promedio": round(
+                    float(np.mean(self._uso_diario)) if self._uso_diario else 0, 1
+                ),
+                "ocupacion_promedio": round(
+                    float(np.mean(self._uso_diario)) / self._total_unidades, 3
+                )
+                if self._uso_diario and self._total_unidades
+                else 0,
+            },
+            "multas_cobradas": round(totales.multas, 2),
+            "vencidos_al_final": len(
+                self._biblioteca.prestamos_por_vencer(
+                    self._inicio + timedelta(days=self._dias - 1)
+                )
+            ),
+        }
+
+    @property
+    def biblioteca(self) -> Biblioteca:
+        return self._biblioteca
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simula semestres de circulación sobre el modelo de la biblioteca."
+    )
+    parser.add_argument("--estudiantes", type=int, default=2000)
+    parser.add_argument("--profesores", type=int, default=100)
+    parser.add_argument("--materiales", type=int, default=1000)
+    parser.add_argument("--unidades-max", type=int, default=5)
+    parser.add_argument("--dias", type=int, default=120, help="120 ≈ un semestre")
+    parser.add_argument(
+        "--solicitudes",
+        type=float,
+        default=0.05,
+        help="solicitudes de préstamo por usuario y día",
+    )
+    parser.add_argument(
+        "--prob-reserva",
+        type=float,
+        default=0.5,
+        help="probabilidad de reservar tras un rechazo por falta de stock",
+    )
+    parser.add_argument(
+        "--prob-renovacion",
+        type=float,
+        default=0.3,
+        help="probabilidad de que un préstamo se renueve",
+    )
+    parser.add_argument(
+        "--prob-resena",
+        type=float,
+        default=0.1,
+        help="probabilidad de reseña por devolución",
+    )
+    parser.add_argument(
+        "--prob-retraso",
+        type=float,
+        default=0.15,
+        help="probabilidad de devolver después del vencimiento",
+    )
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    simulador = Simulador(
+        estudiantes=args.estudiantes,
+        profesores=args.profesores,
+        materiales=args.materiales,
+        unidades_max=args.unidades_max,
+        dias=args.dias,
+        solicitudes_por_usuario=args.solicitudes,
+        prob_reserva=args.prob_reserva,
+        prob_renovacion=args.prob_renovacion,
+        prob_resena=args.prob_resena,
+        prob_retraso=args.prob_retraso,
+        zipf=args.zipf,
+        semilla=args.semilla,
+    )
+    print(json.dumps(simulador.ejecutar(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import pickle
+import tempfile
+
+import pytest
+from flask.testing import FlaskClient
+
+from estado_compartido import serializar
+
+# app.py lee su configuración al importarse: artefactos, portadas y perfiles
+# van a un directorio temporal, los avisos se descartan y el hilo de
+# filtrado colaborativo no arranca.
+_TEMPORAL = tempfile.mkdtemp(prefix="biblioteca-pruebas-")
+os.environ["BIBLIOTECA_ARTEFACTOS"] = os.path.join(_TEMPORAL, "artefactos")
+os.environ["BIBLIOTECA_PORTADAS"] = os.path.join(_TEMPORAL, "portadas")
+os.environ["BIBLIOTECA_PERFILES"] = os.path.join(_TEMPORAL, "perfiles")
+os.environ["BIBLIOTECA_NOTIFICACIONES"] = os.devnull
+os.environ["BIBLIOTECA_INTERVALO_COLABORATIVO"] = "0"
+
+_biblioteca_inicial = None
+
+
+class ClienteCompleto(FlaskClient):
+    # Lee cada respuesta en streaming hasta el final, así su contexto de
+    # petición se cierra antes de la siguiente.
+    def open(self, *args, **kwargs):
+        kwargs.setdefault("buffered", True)
+        return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def app_modulo(monkeypatch):
+    # Cada prueba trabaja sobre una copia de los datos de demostración, así
+    # los préstamos de una no cambian lo que ve la siguiente.
+    global _biblioteca_inicial
+    import app as app_modulo
+
+    if _biblioteca_inicial is None:
+        _biblioteca_inicial = serializar(app_modulo.biblioteca)
+    monkeypatch.setattr(app_modulo, "biblioteca", pickle.loads(_biblioteca_inicial))
+    app_modulo.cache_catalogo.limpiar()
+    app_modulo.cache_para_ti.limpiar()
+    return app_modulo
+
+
+@pytest.fixture
+def entrar(app_modulo):
+    # entrar("Estudiante") -> (cliente con sesión iniciada, usuario)
+    def iniciar_sesion(rol):
+        usuario = next(u for u in app_modulo.biblioteca.usuarios if u.rol == rol)
+        cliente = ClienteCompleto(app_modulo.app, app_modulo.app.response_class)
+        respuesta = cliente.post(
+            "/login", data={"correo": usuario.correo, "password": "123"}
+        )
+        assert respuesta.status_code == 302
+        return cliente, usuario
+
+    return iniciar_sesion
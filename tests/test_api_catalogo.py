@@ -0,0 +1,64 @@
+def recorrer(cliente, url):
+    # Todas las páginas siguiendo siguiente_cursor.
+    vistos, cursor = [], 0
+    while cursor is not None:
+        datos = cliente.get(f"{url}&cursor={cursor}").get_json()
+        vistos += datos["resultados"]
+        cursor = datos["siguiente_cursor"]
+    return vistos
+
+
+def test_requiere_sesion(app_modulo):
+    respuesta = app_modulo.app.test_client().get("/api/catalogo/buscar")
+    assert respuesta.status_code == 401
+
+
+def test_proyeccion_de_campos(entrar):
+    cliente, _ = entrar("Estudiante")
+
+    datos = cliente.get("/api/catalogo/buscar?titulo=python").get_json()
+    assert datos["total"] == 1
+    assert datos["resultados"] == [
+        {"id": 101, "titulo": "Python para Principiantes", "autor": "Autor Python"}
+    ]
+
+    datos = cliente.get(
+        "/api/catalogo/buscar?titulo=python&campos=id,tipo,unidades_disponibles"
+    ).get_json()
+    (resultado,) = datos["resultados"]
+    assert set(resultado) == {"id", "tipo", "unidades_disponibles"}
+    assert resultado["tipo"] == "Libro"
+
+    respuesta = cliente.get("/api/catalogo/buscar?campos=id,isbn,clave")
+    assert respuesta.status_code == 400
+    assert "isbn, clave" in respuesta.get_json()["error"]
+
+
+def test_cursor_recorre_todo_sin_repetir(entrar):
+    cliente, _ = entrar("Estudiante")
+    total = cliente.get("/api/catalogo/buscar").get_json()["total"]
+
+    vistos = recorrer(cliente, "/api/catalogo/buscar?limite=2")
+
+    assert len(vistos) == total
+    assert len({r["id"] for r in vistos}) == total
+
+
+def test_cursor_en_modo_relevancia(entrar):
+    cliente, _ = entrar("Estudiante")
+
+    pagina = cliente.get("/api/catalogo/buscar?q=ia&limite=1").get_json()
+    assert len(pagina["resultados"]) == 1
+    assert "relevancia" in pagina["resultados"][0]
+    vistos = recorrer(cliente, "/api/catalogo/buscar?q=ia&limite=1")
+    relevancias = [r["relevancia"] for r in vistos]
+    assert len(vistos) >= 2
+    assert relevancias == sorted(relevancias, reverse=True)
+
+
+def test_limite_y_cursor_invalidos_usan_valores_validos(entrar):
+    cliente, _ = entrar("Estudiante")
+    datos = cliente.get("/api/catalogo/buscar?limite=0&cursor=-5").get_json()
+    assert len(datos["resultados"]) == 1
+    datos = cliente.get("/api/catalogo/buscar?limite=abc").get_json()
+    assert len(datos["resultados"]) == min(20, datos["total"])
@@ -0,0 +1,313 @@
+import sys
+import threading
+from datetime import date
+
+import pytest
+
+from busqueda import (
+    IndiceDifuso,
+    IndiceOrdenado,
+    IndicePrefijos,
+    distancia_edicion,
+    normalizar,
+)
+from models import Biblioteca, Catalogo, Estudiante, Libro, Revista
+
+
+def test_normalizar():
+    assert normalizar("  Cálculo   AVANZADO ") == "calculo avanzado"
+    assert normalizar("Ñandú") == "nandu"
+
+
+# --- Autocompletado por prefijos ---
+TITULOS = {
+    1: ("Cálculo Avanzado", "Ana Torres"),
+    2: ("Introducción al Cálculo", "Luis Vega"),
+    3: ("Historia de la Ciencia", "Carla Núñez"),
+}
+
+
+def crear_indice(**opciones):
+    indice = IndicePrefijos(**opciones)
+    for item_id, textos in TITULOS.items():
+        indice.agregar(item_id, textos)
+    return indice
+
+
+def test_prefijo_de_cualquier_palabra_sin_tildes():
+    indice = crear_indice()
+    puntuar = {1: 1.0, 2: 2.0, 3: 3.0}.get
+
+    assert indice.sugerir("calc", puntuar) == [2, 1]
+    assert indice.sugerir("AVAN", puntuar) == [1]
+    assert indice.sugerir("nunez", puntuar) == [3]
+    assert indice.sugerir("ciencia", puntuar) == [3]
+    # Las palabras vacías no inician sugerencias; el texto completo sí.
+    assert indice.sugerir("de la", puntuar) == []
+    assert indice.sugerir("historia de", puntuar) == [3]
+    assert indice.sugerir("   ", puntuar) == []
+
+
+def test_limite_y_bajas():
+    indice = crear_indice()
+    puntuar = {1: 5.0, 2: 1.0, 3: 3.0}.get
+
+    assert indice.sugerir("c", puntuar, limite=2) == [1, 3]
+    indice.quitar(1, TITULOS[1])
+    assert indice.sugerir("c", puntuar, limite=2) == [3, 2]
+    assert indice.sugerir("avan", puntuar) == []
+
+
+def test_prefijo_comun_en_cache_se_invalida_con_un_alta():
+    indice = crear_indice(limite_escaneo=1)
+    puntajes = {1: 1.0, 2: 2.0, 3: 3.0}
+
+    assert indice.sugerir("c", puntajes.get) == [3, 2, 1]
+    puntajes[1] = 10.0
+    # Dentro del TTL el top de un prefijo común sale del caché...
+    assert indice.sugerir("c", puntajes.get) == [3, 2, 1]
+    # ...hasta que el índice cambia.
+    indice.agregar(4, ("Cuentos", "Autor"))
+    puntajes[4] = 0.5
+    assert indice.sugerir("c", puntajes.get) == [1, 3, 2, 4]
+
+
+def test_carga_masiva_se_ordena_en_la_primera_consulta():
+    indice = IndicePrefijos()
+    for i in range(500):
+        indice.agregar(i, (f"Título {i:03d}",))
+    assert indice.sugerir("titulo 49", float, limite=20) == list(range(499, 489, -1))
+    assert indice.sugerir("04", float, limite=3) == [49, 48, 47]
+    # Una clave por texto completo y otra desde la segunda palabra.
+    assert len(indice) == 1000
+
+
+def test_api_de_sugerencias(entrar):
+    cliente, _ = entrar("Estudiante")
+
+    respuesta = cliente.get("/api/catalogo/sugerencias?q=avan")
+    assert respuesta.get_json() == [
+        {"id": 103, "titulo": "Cálculo Avanzado", "autor": "Autor Cálculo"}
+    ]
+    ids = [s["id"] for s in cliente.get("/api/catalogo/sugerencias?q=ia").get_json()]
+    assert set(ids) == {104, 201}
+
+    anonimo = cliente.application.test_client()
+    assert anonimo.get("/api/catalogo/sugerencias?q=avan").status_code == 401
+
+
+# --- Búsqueda tolerante a tildes y errores de tipeo ---
+def test_distancia_edicion_con_transposiciones_y_corte():
+    assert distancia_edicion("calculo", "calculo", 2) == 0
+    assert distancia_edicion("calculo", "cacluo", 2) == 2
+    assert distancia_edicion("calculo", "calcluo", 2) == 1
+    assert distancia_edicion("calculo", "historia", 2) == 3
+
+
+def test_indice_difuso_ajusta_la_tolerancia_al_largo():
+    indice = IndiceDifuso()
+    indice.agregar(1, "Cálculo Avanzado")
+    indice.agregar(2, "Cálculo Integral")
+    indice.agregar(3, "Red de Sol")
+
+    assert indice.buscar("calclo") == {1, 2}
+    assert indice.buscar("calclo avanzdo") == {1}
+    # Palabras cortas exigen coincidencia exacta.
+    assert indice.buscar("sal") == set()
+    assert indice.buscar("de sol") == {3}
+    assert indice.buscar("calculo historia") == set()
+
+    indice.quitar(1, "Cálculo Avanzado")
+    assert indice.buscar("avanzado") == set()
+    assert indice.buscar("calculo") == {2}
+
+
+def test_indice_difuso_con_altas_y_busquedas_concurrentes():
+    indice = IndiceDifuso()
+    indice.agregar(0, "Cálculo Base")
+    errores = []
+
+    def en_hilo(funcion, *argumentos):
+        def correr():
+            try:
+                funcion(*argumentos)
+            except Exception as e:  # se reporta en el hilo principal
+                errores.append(e)
+
+        return threading.Thread(target=correr)
+
+    def escribir(desde):
+        for _ in range(50):
+            for i in range(desde, desde + 10):
+                indice.agregar(i, f"Cálculo Tomo{i}")
+                indice.quitar(i, f"Cálculo Tomo{i}")
+
+    def leer():
+        for _ in range(300):
+            # "tomo1" es similar a palabras que se dan de alta y de baja.
+            indice.buscar("tomo1")
+            assert 0 in indice.buscar("calclo")
+
+    hilos = [en_hilo(escribir, k * 10) for k in (1, 2, 3)]
+    hilos += [en_hilo(leer) for _ in range(3)]
+    anterior = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+    finally:
+        sys.setswitchinterval(anterior)
+    assert not errores, errores
+    assert indice.buscar("tomo1") == set()
+
+
+def test_catalogo_tolerante():
+    catalogo = Catalogo()
+    for i, (titulo, autor, materia) in enumerate(
+        [
+            ("Cálculo Avanzado", "Ana Núñez", "Matemáticas"),
+            ("Química Orgánica", "Luis Peña", "Ciencias"),
+            ("Cálculo Básico", "Rosa Díaz", "Matemáticas"),
+        ],
+        start=1,
+    ):
+        catalogo.agregar_material(
+            Libro(i, titulo, autor, 2020, "", "", "Ed", materia, 1)
+        )
+
+    def ids(**filtros):
+        return sorted(m.id for m in catalogo.buscar(tolerante=True, **filtros))
+
+    assert ids(titulo="calculo") == [1, 3]
+    assert ids(titulo="quimca organica") == [2]
+    assert ids(autor="nunez") == [1]
+    assert ids(titulo="calculo", materia="matematicas") == [1, 3]
+    assert ids(titulo="calculo", autor="diaz") == [3]
+    assert catalogo.buscar(titulo="calculo") == []
+
+
+# --- Búsqueda por relevancia (TF-IDF) ---
+def test_relevancia_ordena_por_similitud(app_modulo):
+    resultados = app_modulo.buscar_por_relevancia("programar en python")
+
+    assert resultados[0][0].id == 101
+    puntajes = [p for _, p in resultados]
+    assert puntajes == sorted(puntajes, reverse=True)
+    assert all(p > 0 for p in puntajes)
+    assert len(app_modulo.buscar_por_relevancia("ia", k=1)) == 1
+    assert app_modulo.buscar_por_relevancia("zzzz qqqq") == []
+
+
+def test_relevancia_respeta_los_filtros_del_formulario(app_modulo):
+    with app_modulo.app.test_request_context("/"):
+        todos = app_modulo._renderizar_catalogo(palabra="ia", orden="relevancia")
+        medicina = app_modulo._renderizar_catalogo(
+            materia_filtro="Medicina", palabra="ia", orden="relevancia"
+        )
+    assert "IA en Medicina" in todos and "Fundamentos de IA" in todos
+    assert "IA en Medicina" in medicina and "Fundamentos de IA" not in medicina
+
+
+# --- Navegación ordenada con rangos de años ---
+def test_indice_ordenado_rangos_y_cambios_de_clave():
+    indice = IndiceOrdenado()
+    # Más altas que MAX_INSERCIONES_SUELTAS: se ordenan de una vez.
+    for i in range(100):
+        indice.agregar(i, 2000 + i % 10)
+
+    assert indice.contar(2003, 2004) == 20
+    assert list(indice.recorrer(2009))[:3] == [9, 19, 29]
+    assert list(indice.recorrer(2000, 2000, descendente=True))[:2] == [90, 80]
+
+    indice.actualizar(9, 1990)
+    indice.actualizar(9, 1990)  # misma clave: nada que hacer
+    assert list(indice.recorrer(hasta=1999)) == [9]
+    assert indice.contar(2009, 2009) == 9
+    indice.quitar(9)
+    indice.actualizar(9, 2050)  # ya no está: no se vuelve a agregar
+    assert indice.clave(9) is None
+    assert len(indice) == 99 and indice.contar() == 99
+
+
+def crear_catalogo_por_años():
+    biblioteca = Biblioteca()
+    for i in range(30):
+        clase = Libro if i % 2 else Revista
+        comunes = (i, f"Material {i}", "Autor", 2000 + i, "", "")
+        if clase is Libro:
+            material = Libro(*comunes, "Ed", "Ciencias", 2)
+        else:
+            material = Revista(*comunes, 1, "Historia", 2)
+        biblioteca.agregar_material(material)
+    return biblioteca
+
+
+def ids(materiales):
+    return [m.id for m in materiales]
+
+
+def test_explorar_por_año_con_rango_y_filtros():
+    catalogo = crear_catalogo_por_años().catalogo
+
+    assert ids(catalogo.explorar("año", limite=3)) == [29, 28, 27]
+    assert ids(
+        catalogo.explorar("año", descendente=False, año_desde=2010, año_hasta=2013)
+    ) == [10, 11, 12, 13]
+    assert ids(
+        catalogo.explorar("año", año_hasta=2009, materia="ciencias", limite=2)
+    ) == [9, 7]
+    assert ids(
+        catalogo.explorar("año", tipo_material="Revista", desplazamiento=1, limite=2)
+    ) == [26, 24]
+    with pytest.raises(ValueError):
+        catalogo.explorar("titulo")
+
+
+@pytest.mark.parametrize("max_ordenar", [5000, 0])
+def test_explorar_por_prestamos_dentro_de_un_rango(monkeypatch, max_ordenar):
+    # Con pocos candidatos se ordena el rango; con muchos se recorre el índice.
+    biblioteca = crear_catalogo_por_años()
+    catalogo = biblioteca.catalogo
+    monkeypatch.setattr(catalogo, "MAX_ORDENAR_RANGO", max_ordenar)
+    for usuario_id, material_id in enumerate((3, 13, 13, 15), start=1):
+        usuario = Estudiante(usuario_id, "E", f"e{usuario_id}@uni.edu", "Ing", 1)
+        biblioteca.agregar_usuario(usuario)
+        material = biblioteca.buscar_material_por_id(material_id)
+        assert biblioteca.realizar_prestamo(usuario, material, date(2026, 3, 2))[0]
+
+    pagina = catalogo.explorar("prestamos", año_desde=2010, año_hasta=2019, limite=3)
+    assert ids(pagina) == [13, 15, 19]
+    assert ids(catalogo.ordenar(pagina, "prestamos", descendente=False)) == [19, 15, 13]
+
+
+def test_api_ordena_por_año_con_rango(entrar):
+    cliente, _ = entrar("Estudiante")
+    url = "/api/catalogo/buscar?orden=año&campos=id,año_publicacion"
+
+    datos = cliente.get(f"{url}&año_desde=2022").get_json()
+    años = [r["año_publicacion"] for r in datos["resultados"]]
+    assert años == [2024, 2023, 2023, 2022]
+    datos = cliente.get(f"{url}&direccion=asc&año_hasta=2022&limite=1").get_json()
+    assert datos["resultados"] == [{"id": 103, "año_publicacion": 2021}]
+    assert datos["siguiente_cursor"] == 1
+    # Con texto se filtra primero y se ordena el resultado.
+    datos = cliente.get(f"{url}&titulo=ia&año_desde=2023").get_json()
+    assert {r["id"] for r in datos["resultados"]} == {104, 201}
+
+    respuesta = cliente.get("/api/catalogo/buscar?orden=titulo")
+    assert respuesta.status_code == 400
+    assert "año, calificacion, prestamos" in respuesta.get_json()["error"]
+
+
+def test_relevancia_respeta_el_rango_de_años(app_modulo):
+    with app_modulo.app.test_request_context("/"):
+        html = app_modulo._renderizar_catalogo(
+            palabra="python", orden="relevancia", año_desde=2023
+        )
+        sin_rango = app_modulo._renderizar_catalogo(
+            palabra="python", orden="relevancia"
+        )
+    assert "Python para Principiantes" in sin_rango
+    assert "Python para Principiantes" not in html
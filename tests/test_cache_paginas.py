@@ -0,0 +1,71 @@
+def test_inicio_responde_304_mientras_nada_cambia(entrar):
+    cliente, _ = entrar("Profesor")
+
+    primera = cliente.get("/")
+    etag = primera.headers["ETag"]
+    assert primera.status_code == 200
+    assert etag.startswith('W/"')
+    assert primera.headers["Cache-Control"] == "private, no-cache"
+
+    repetida = cliente.get("/", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.data == b""
+    assert repetida.headers["ETag"] == etag
+
+
+def test_un_prestamo_cambia_el_etag(entrar):
+    cliente, _ = entrar("Profesor")
+    etag = cliente.get("/").headers["ETag"]
+
+    cliente.post("/prestar/102")
+    # Con un mensaje pendiente la página no se valida contra el caché.
+    con_mensaje = cliente.get("/", headers={"If-None-Match": etag})
+    assert con_mensaje.status_code == 200
+    assert "ETag" not in con_mensaje.headers
+
+    despues = cliente.get("/", headers={"If-None-Match": etag})
+    assert despues.status_code == 200
+    assert despues.headers["ETag"] != etag
+
+
+def test_filtros_y_fecha_forman_parte_del_etag(entrar):
+    cliente, _ = entrar("Profesor")
+    etag = cliente.get("/").headers["ETag"]
+
+    assert cliente.get("/?materia=Ciencias").headers["ETag"] != etag
+    cliente.post("/debug/avanzar-tiempo", data={"dias": 1})
+    assert cliente.get("/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_el_panel_de_admin_no_se_cachea(entrar):
+    cliente, _ = entrar("Administrativo")
+    respuesta = cliente.get("/")
+    assert respuesta.status_code == 200
+    assert "ETag" not in respuesta.headers
+
+
+def test_fragmento_de_catalogo_por_version(app_modulo):
+    with app_modulo.app.test_request_context("/"):
+        primero = app_modulo._renderizar_catalogo()
+        assert app_modulo._renderizar_catalogo() is primero
+        assert app_modulo._renderizar_catalogo(materia_filtro="Ciencias") != primero
+
+        app_modulo.ejecutar_operacion(
+            "agregar_material",
+            "libro",
+            {
+                "id": 900,
+                "titulo": "Topología General",
+                "autor": "Autor Nuevo",
+                "año_publicacion": 2024,
+                "descripcion": "",
+                "portada_url": "",
+                "editorial": "Ed",
+                "materia": "Matemáticas",
+                "total_unidades": 1,
+            },
+        )
+        nuevo = app_modulo._renderizar_catalogo()
+    assert nuevo is not primero
+    assert "Topología General" in nuevo
+    assert "Topología General" not in primero
@@ -0,0 +1,102 @@
+from datetime import date
+
+from models import Biblioteca, Estudiante, Libro, PrestamoActivo, PrestamoDevuelto
+
+HOY = date(2026, 3, 2)
+
+
+def crear_biblioteca():
+    biblioteca = Biblioteca()
+    materiales = [
+        Libro(i, f"Libro {i}", "Autor", 2024, "", "", "Ed", "Ciencias", 1)
+        for i in range(1, 8)
+    ]
+    for m in materiales:
+        biblioteca.agregar_material(m)
+    usuario = Estudiante(1, "E1", "e1@uni.edu", "Ing", 1)
+    biblioteca.agregar_usuario(usuario)
+    return biblioteca, materiales, usuario
+
+
+def test_lote_aplica_la_aptitud_una_vez_para_todos_los_items():
+    biblioteca, materiales, usuario = crear_biblioteca()
+    items = [materiales[0], materiales[0]] + materiales[1:6]
+
+    resultados = biblioteca.realizar_prestamos_lote(usuario, items, HOY)
+
+    assert [r["exito"] for r in resultados] == [True, False] + [True] * 4 + [False]
+    assert "Ya tienes" in resultados[1]["mensaje"]
+    assert "límite de 5" in resultados[-1]["mensaje"]
+    activos = [p for p in usuario.prestamos if isinstance(p.estado, PrestamoActivo)]
+    assert len(activos) == usuario.limite_prestamos
+    assert {r["prestamo_id"] for r in resultados if r["exito"]} == {
+        p.id for p in activos
+    }
+
+
+def test_lote_rechaza_material_sin_stock():
+    biblioteca, materiales, usuario = crear_biblioteca()
+    otro = Estudiante(2, "E2", "e2@uni.edu", "Ing", 1)
+    biblioteca.agregar_usuario(otro)
+    biblioteca.realizar_prestamo(otro, materiales[0], HOY)
+
+    (resultado,) = biblioteca.realizar_prestamos_lote(usuario, [materiales[0]], HOY)
+
+    assert not resultado["exito"]
+    assert resultado["mensaje"] == "No hay unidades disponibles de este material."
+
+
+def test_devoluciones_en_lote():
+    biblioteca, materiales, usuario = crear_biblioteca()
+    biblioteca.realizar_prestamos_lote(usuario, materiales[:2], HOY)
+
+    resultados = biblioteca.realizar_devoluciones_lote(
+        usuario, [materiales[0], materiales[0], materiales[1], materiales[2]], HOY
+    )
+
+    assert [r["exito"] for r in resultados] == [True, False, True, False]
+    assert all(r["multa"] == 0 for r in resultados if r["exito"])
+    assert all(isinstance(p.estado, PrestamoDevuelto) for p in usuario.prestamos)
+    assert all(m.unidades_disponibles == 1 for m in materiales)
+
+
+def test_api_de_mostrador(entrar):
+    cliente, _ = entrar("Administrativo")
+    profesor_id = 2
+
+    respuesta = cliente.post(
+        "/api/circulacion/prestamos",
+        json={"usuario_id": profesor_id, "materiales": [101, 102, 999]},
+    )
+    datos = respuesta.get_json()
+    assert respuesta.status_code == 200
+    assert datos["procesados"] == 2
+    assert [r["exito"] for r in datos["resultados"]] == [True, True, False]
+    assert datos["resultados"][2] == {
+        "material_id": 999,
+        "exito": False,
+        "mensaje": "El material no existe.",
+    }
+    date.fromisoformat(datos["resultados"][0]["fecha_vencimiento"])
+
+    respuesta = cliente.post(
+        "/api/circulacion/devoluciones",
+        json={"usuario_id": profesor_id, "materiales": [101, 102]},
+    )
+    assert respuesta.get_json()["procesados"] == 2
+
+
+def test_api_de_mostrador_valida_la_peticion(entrar):
+    cliente, _ = entrar("Estudiante")
+    respuesta = cliente.post(
+        "/api/circulacion/prestamos", json={"usuario_id": 1, "materiales": [101]}
+    )
+    assert respuesta.status_code == 403
+
+    cliente, _ = entrar("Administrativo")
+    respuesta = cliente.post("/api/circulacion/prestamos", json={"usuario_id": 2})
+    assert respuesta.status_code == 400
+    respuesta = cliente.post(
+        "/api/circulacion/prestamos", json={"usuario_id": 99, "materiales": [101]}
+    )
+    assert respuesta.status_code == 404
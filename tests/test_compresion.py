@@ -0,0 +1,110 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from flask import Response
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import compresion
+from compresion import Compresor, comprimir_respuesta, elegir_codificacion
+
+
+def aceptadas(valor):
+    return parse_accept_header(valor, Accept)
+
+
+@pytest.fixture
+def sin_brotli(monkeypatch):
+    monkeypatch.setattr(compresion, "brotli", None)
+
+
+def test_negociacion(sin_brotli):
+    assert elegir_codificacion(aceptadas("gzip, deflate, br")) == "gzip"
+    assert elegir_codificacion(aceptadas("br;q=1.0, gzip;q=0")) is None
+    assert elegir_codificacion(aceptadas("deflate")) is None
+    assert elegir_codificacion(aceptadas("")) is None
+
+
+def test_brotli_preferido_si_esta_instalado():
+    brotli = pytest.importorskip("brotli")
+    assert elegir_codificacion(aceptadas("gzip, br")) == "br"
+    compresor = Compresor("br")
+    datos = compresor.comprimir(b"hola " * 200) + compresor.terminar()
+    assert brotli.decompress(datos) == b"hola " * 200
+
+
+def test_cada_trozo_se_puede_descomprimir_al_llegar():
+    compresor = Compresor("gzip")
+    lector = zlib.decompressobj(31)
+
+    # Con el vaciado por trozo, lo recibido hasta ahora ya se descomprime.
+    assert lector.decompress(compresor.comprimir(b"<html>")) == b"<html>"
+    assert lector.decompress(compresor.comprimir(b"<body>")) == b"<body>"
+    assert lector.decompress(compresor.terminar()) == b""
+    assert lector.eof
+
+
+def test_respuesta_json_comprimida_con_vary(sin_brotli):
+    cuerpo = json.dumps([{"id": i, "titulo": "Libro"} for i in range(50)])
+    respuesta = Response(cuerpo, mimetype="application/json")
+
+    comprimir_respuesta(respuesta, aceptadas("gzip"))
+
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in respuesta.headers["Vary"]
+    assert gzip.decompress(respuesta.get_data()).decode() == cuerpo
+    assert int(respuesta.headers["Content-Length"]) == len(respuesta.get_data())
+
+
+@pytest.mark.parametrize(
+    "respuesta",
+    [
+        Response("corto", mimetype="text/html"),
+        Response(b"\x89PNG" * 500, mimetype="image/png"),
+        Response("x" * 1000, status=404, mimetype="text/html"),
+    ],
+    ids=["pequeña", "imagen", "error"],
+)
+def test_respuestas_que_no_se_comprimen(sin_brotli, respuesta):
+    antes = respuesta.get_data()
+    comprimir_respuesta(respuesta, aceptadas("gzip"))
+    assert "Content-Encoding" not in respuesta.headers
+    assert respuesta.get_data() == antes
+
+
+def test_streaming_comprimido_por_trozos(sin_brotli):
+    cerrado = []
+
+    class Flujo:
+        def __iter__(self):
+            yield "<p>ñandú</p>"
+            yield b"<p>fin</p>"
+
+        def close(self):
+            cerrado.append(True)
+
+    respuesta = Response(Flujo(), mimetype="text/html")
+    comprimir_respuesta(respuesta, aceptadas("gzip"))
+
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    trozos = list(respuesta.response)
+    assert len(trozos) == 3  # dos trozos y el cierre del flujo gzip
+    assert gzip.decompress(b"".join(trozos)).decode() == "<p>ñandú</p><p>fin</p>"
+    assert cerrado == [True]
+
+
+def test_pagina_de_inicio_comprimida(entrar, sin_brotli):
+    cliente, _ = entrar("Estudiante")
+
+    comprimida = cliente.get("/", headers={"Accept-Encoding": "gzip"})
+    assert comprimida.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in comprimida.headers["Vary"]
+    html = gzip.decompress(comprimida.data).decode()
+
+    plana = cliente.get("/", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plana.headers
+    assert plana.data.decode() == html
+    # El ETag débil vale para ambas versiones.
+    assert comprimida.headers["ETag"] == plana.headers["ETag"]
@@ -0,0 +1,158 @@
+import sys
+import threading
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from models import Biblioteca, Ejemplar, Estudiante, Libro, PrestamoActivo
+
+# Préstamos, devoluciones, reservas y retiros concurrentes sobre un mismo
+# título. Tras cada fase, el stock y la cola de reservas deben cuadrar: ninguna
+# unidad se pierde ni se presta dos veces, y cada reserva sale de la cola una
+# sola vez.
+
+HILOS = 50
+UNIDADES = 3
+RONDAS = 20
+HOY = date(2026, 3, 2)
+
+
+@pytest.fixture(autouse=True)
+def cambios_de_hilo_frecuentes():
+    anterior = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(anterior)
+
+
+def ejecutar_en_paralelo(funciones):
+    barrera = threading.Barrier(len(funciones))
+    errores = []
+
+    def envolver(funcion):
+        def correr():
+            barrera.wait()
+            try:
+                funcion()
+            except Exception as e:  # se reporta en el hilo principal
+                errores.append(e)
+
+        return correr
+
+    hilos = [threading.Thread(target=envolver(f)) for f in funciones]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert not errores, errores
+
+
+def crear_escenario():
+    biblioteca = Biblioteca()
+    material = Libro(
+        1, "Último ejemplar", "Autor", 2024, "", "", "Ed", "Ciencias", UNIDADES
+    )
+    biblioteca.agregar_material(material)
+    usuarios = [
+        Estudiante(i, f"E{i}", f"e{i}@uni.edu", "Ing", 1) for i in range(1, HILOS + 1)
+    ]
+    for u in usuarios:
+        biblioteca.agregar_usuario(u)
+    return biblioteca, material, usuarios
+
+
+def comprobar_stock(material, usuarios):
+    estados = Counter(e.estado for e in material.ejemplares)
+    disponibles = estados[Ejemplar.DISPONIBLE]
+    prestados = estados[Ejemplar.PRESTADO]
+    apartados = estados[Ejemplar.RESERVADO]
+    assert disponibles + prestados + apartados == material.total_unidades
+    assert material.unidades_disponibles == disponibles
+    activos = [
+        p
+        for u in usuarios
+        for p in u.prestamos
+        if isinstance(p.estado, PrestamoActivo)
+    ]
+    assert sorted(id(p.ejemplar) for p in activos) == sorted(
+        id(e) for e in material.ejemplares if e.estado == Ejemplar.PRESTADO
+    )
+    return disponibles, prestados, apartados
+
+
+@pytest.mark.parametrize("ronda", range(RONDAS))
+def test_prestamos_devoluciones_y_reservas_concurrentes(ronda):
+    biblioteca, material, usuarios = crear_escenario()
+
+    # Fase 1: todos piden las últimas unidades a la vez.
+    exitos = []
+    ejecutar_en_paralelo(
+        [
+            lambda u=u: exitos.append(biblioteca.realizar_prestamo(u, material, HOY)[0])
+            for u in usuarios
+        ]
+    )
+    assert sum(exitos) == UNIDADES
+    assert comprobar_stock(material, usuarios) == (0, UNIDADES, 0)
+
+    # Fase 2: devoluciones repetidas mientras el resto reserva.
+    prestamos = [p for u in usuarios for p in u.prestamos]
+    sin_prestamo = [u for u in usuarios if not u.prestamos]
+    reservas = []
+    estados_devueltos = []
+    ejecutar_en_paralelo(
+        [
+            lambda p=p: estados_devueltos.append(p.devolver(HOY))
+            for p in prestamos
+            for _ in range(3)
+        ]
+        + [
+            lambda u=u: reservas.append(
+                (u, biblioteca.realizar_reserva(u, material)[0])
+            )
+            for u in sin_prestamo
+        ]
+    )
+    devoluciones = [e for e in estados_devueltos if e is not None]
+    assert len(devoluciones) == len(prestamos)
+
+    reservados = [u for u, exito in reservas if exito]
+    notificados = [
+        e.usuario_notificado for e in devoluciones if e.usuario_notificado is not None
+    ]
+    en_cola = list(material.lista_reservas)
+    # Cada reserva aceptada sale de la cola exactamente una vez o sigue en ella.
+    assert len(set(map(id, notificados))) == len(notificados)
+    assert len(set(map(id, en_cola))) == len(en_cola)
+    assert not set(map(id, notificados)) & set(map(id, en_cola))
+    assert sorted(u.id for u in notificados + en_cola) == sorted(
+        u.id for u in reservados
+    )
+    # Y a cada notificado le queda apartada una copia.
+    apartados_para = [e.apartado_para for e in material.ejemplares if e.apartado_para]
+    assert sorted(u.id for u in apartados_para) == sorted(u.id for u in notificados)
+    disponibles, prestados, apartados = comprobar_stock(material, usuarios)
+    assert (prestados, apartados) == (0, len(notificados))
+
+    # Fase 3: cada notificado retira su copia por las dos vías a la vez.
+    retiros = []
+    ejecutar_en_paralelo(
+        [
+            lambda u=u: retiros.append(
+                (u, biblioteca.entregar_reserva(u, material, HOY)[0])
+            )
+            for u in notificados
+        ]
+        + [
+            lambda u=u: retiros.append(
+                (u, biblioteca.realizar_prestamo(u, material, HOY)[0])
+            )
+            for u in notificados
+        ]
+    )
+    for u in notificados:
+        activos = [p for p in u.prestamos if isinstance(p.estado, PrestamoActivo)]
+        assert len(activos) == 1
+        assert sum(exito for v, exito in retiros if v is u) == 1
+    assert comprobar_stock(material, usuarios) == (disponibles, len(notificados), 0)
@@ -0,0 +1,113 @@
+from datetime import date
+
+from models import Biblioteca, Ejemplar, Estudiante, Libro, MaterialDigital
+
+HOY = date(2026, 3, 2)
+
+
+def crear_biblioteca(unidades=2):
+    biblioteca = Biblioteca()
+    material = Libro(1, "Libro", "Autor", 2024, "", "", "Ed", "Ciencias", unidades)
+    biblioteca.agregar_material(material)
+    usuarios = [Estudiante(i, f"E{i}", f"e{i}@uni.edu", "Ing", 1) for i in (1, 2)]
+    for u in usuarios:
+        biblioteca.agregar_usuario(u)
+    return biblioteca, material, usuarios
+
+
+def test_codigos_generados_y_busqueda_por_codigo():
+    biblioteca, material, _ = crear_biblioteca()
+
+    assert [e.codigo_barras for e in material.ejemplares] == ["1-001", "1-002"]
+    ejemplar = biblioteca.buscar_ejemplar_por_codigo("1-002")
+    assert ejemplar.material is material
+    assert biblioteca.buscar_ejemplar_por_codigo("no-existe") is None
+
+
+def test_registrar_ejemplar_exige_codigo_unico():
+    biblioteca, material, _ = crear_biblioteca()
+    catalogo = biblioteca.catalogo
+
+    nuevo = catalogo.registrar_ejemplar(material, "X-1", "Sala 2")
+    assert nuevo.ubicacion == "Sala 2"
+    assert material.total_unidades == 3
+    assert catalogo.registrar_ejemplar(material, "X-1", "Sala 3") is None
+    assert catalogo.registrar_ejemplar(material, "1-001", "Sala 3") is None
+    digital = MaterialDigital(2, "Ebook", "Autor", 2024, "", "", "PDF", "Ciencias")
+    biblioteca.agregar_material(digital)
+    assert catalogo.registrar_ejemplar(digital, "D-1", "Sala 3") is None
+
+    biblioteca.retirar_material(material.id)
+    assert biblioteca.buscar_ejemplar_por_codigo("X-1") is None
+
+
+def test_prestamo_por_codigo_escaneado():
+    biblioteca, material, (usuario, _) = crear_biblioteca()
+    ejemplar = biblioteca.buscar_ejemplar_por_codigo("1-002")
+
+    (resultado,) = biblioteca.realizar_prestamos_lote(usuario, [ejemplar], HOY)
+
+    assert resultado["exito"] and resultado["codigo_barras"] == "1-002"
+    assert usuario.prestamos[-1].ejemplar is ejemplar
+    assert ejemplar.estado == Ejemplar.PRESTADO
+    assert material.unidades_disponibles == 1
+
+    (devuelto,) = biblioteca.realizar_devoluciones_lote(usuario, [ejemplar], HOY)
+    assert devuelto["exito"] and ejemplar.esta_disponible
+
+
+def test_copia_apartada_solo_la_retira_el_notificado():
+    biblioteca, material, (lector, reservante) = crear_biblioteca(unidades=1)
+    biblioteca.realizar_prestamo(lector, material, HOY)
+    assert biblioteca.realizar_reserva(reservante, material)[0]
+
+    estado = lector.prestamos[-1].devolver(HOY)
+
+    (apartado,) = material.ejemplares
+    assert estado.usuario_notificado is reservante
+    assert apartado.estado == Ejemplar.RESERVADO
+    assert apartado.apartado_para is reservante
+    assert not biblioteca.realizar_prestamo(lector, material, HOY)[0]
+
+    otra = biblioteca.catalogo.registrar_ejemplar(material, "1-900", "Sala")
+    (resultado,) = biblioteca.realizar_prestamos_lote(reservante, [otra], HOY)
+    assert not resultado["exito"] and "1-001" in resultado["mensaje"]
+
+    assert biblioteca.realizar_prestamo(reservante, material, HOY)[0]
+    assert reservante.prestamos[-1].ejemplar is apartado
+    assert apartado.estado == Ejemplar.PRESTADO and apartado.apartado_para is None
+    assert otra.esta_disponible
+
+
+def test_api_de_ejemplares(entrar):
+    cliente, _ = entrar("Administrativo")
+
+    respuesta = cliente.post(
+        "/api/ejemplares",
+        json={"material_id": 101, "codigo_barras": "PY-500", "ubicacion": "Sala 4"},
+    )
+    assert respuesta.status_code == 201
+    assert cliente.get("/api/ejemplares/PY-500").get_json() == {
+        "codigo_barras": "PY-500",
+        "ubicacion": "Sala 4",
+        "estado": Ejemplar.DISPONIBLE,
+        "material_id": 101,
+        "titulo": "Python para Principiantes",
+    }
+    repetido = cliente.post(
+        "/api/ejemplares", json={"material_id": 103, "codigo_barras": "PY-500"}
+    )
+    assert repetido.status_code == 409
+    assert cliente.get("/api/ejemplares/NADA").status_code == 404
+
+    prestamo = cliente.post(
+        "/api/circulacion/prestamos", json={"usuario_id": 2, "codigos": ["PY-500"]}
+    )
+    (resultado,) = prestamo.get_json()["resultados"]
+    assert resultado["exito"] and resultado["codigo_barras"] == "PY-500"
+    assert cliente.get("/api/ejemplares/PY-500").get_json()["estado"] == (
+        Ejemplar.PRESTADO
+    )
+
+    cliente, _ = entrar("Estudiante")
+    assert cliente.get("/api/ejemplares/PY-500").status_code == 403
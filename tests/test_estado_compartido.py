@@ -0,0 +1,59 @@
+import pickle
+
+import pytest
+
+from estado_compartido import EstadoCompartido, serializar
+from models import Biblioteca, Estudiante, Libro
+
+
+def _op_agregar_usuario(bib, usuario_id):
+    bib.agregar_usuario(Estudiante(usuario_id, f"E{usuario_id}", "e@uni.edu", "Ing", 1))
+
+
+def _op_fallida(bib):
+    bib.agregar_material(Libro(99, "Roto", "A", 2024, "", "", "Ed", "Ciencias"))
+    raise ValueError("falla a mitad de la operación")
+
+
+OPERACIONES = {"agregar_usuario": _op_agregar_usuario, "fallida": _op_fallida}
+
+
+def test_serializar_grafos_mas_profundos_que_el_limite_de_recursion():
+    anidada = []
+    for _ in range(50_000):
+        anidada = [anidada]
+    with pytest.raises(RecursionError):
+        pickle.dumps(anidada)
+    assert pickle.loads(serializar(anidada)) is not None
+
+
+def test_operacion_fallida_restaura_en_un_objeto_nuevo(tmp_path):
+    estado = EstadoCompartido(str(tmp_path / "estado.db"), OPERACIONES)
+    original = estado.inicializar(Biblioteca())
+    estado.ejecutar("agregar_usuario", (1,))
+
+    with pytest.raises(ValueError):
+        estado.ejecutar("fallida", ())
+
+    # El grafo que tenían las peticiones en curso queda intacto (no se vacía)
+    # y el vigente no arrastra la operación a medias.
+    assert original.__dict__
+    restaurada = estado.biblioteca
+    assert restaurada is not original
+    assert restaurada.buscar_material_por_id(99) is None
+    assert [u.id for u in restaurada.usuarios] == [1]
+    assert restaurada.usuarios[0]._biblioteca is restaurada
+
+
+def test_instantanea_fallida_queda_registrada(tmp_path, monkeypatch, caplog):
+    estado = EstadoCompartido(str(tmp_path / "estado.db"), OPERACIONES)
+    estado.inicializar(Biblioteca())
+
+    def demasiado_profundo(objeto):
+        raise RecursionError("demasiado profundo")
+
+    monkeypatch.setattr("estado_compartido.serializar", demasiado_profundo)
+    monkeypatch.setattr("estado_compartido.EVENTOS_POR_INSTANTANEA", 1)
+    estado.ejecutar("agregar_usuario", (1,))
+    assert "RecursionError" in estado.error_instantanea
+    assert "instantánea" in caplog.text
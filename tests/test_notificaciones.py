@@ -0,0 +1,94 @@
+import json
+import time
+
+from notificaciones import DespachadorNotificaciones, Notificacion, TransporteArchivo
+
+
+class TransporteFalla(TransporteArchivo):
+    # Falla las primeras `fallos` entregas y luego escribe en el archivo.
+    def __init__(self, ruta, fallos):
+        super().__init__(ruta)
+        self.fallos = fallos
+        self.intentos = 0
+
+    def enviar(self, lote):
+        self.intentos += 1
+        if self.intentos <= self.fallos:
+            raise ConnectionError("servidor caído")
+        super().enviar(lote)
+
+
+def avisos(n):
+    return [
+        Notificacion(f"u{i}@uni.edu", f"U{i}", "Devolución", f"Aviso {i}")
+        for i in range(n)
+    ]
+
+
+def despachador(transporte, **opciones):
+    opciones = {"espera_lote": 0.01, "espera_reintento": 0.01, **opciones}
+    return DespachadorNotificaciones(transporte, **opciones)
+
+
+def leer(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_agrupa_en_lotes_y_entrega_todo(tmp_path):
+    ruta = tmp_path / "avisos.jsonl"
+    transporte = TransporteFalla(str(ruta), fallos=0)
+    d = despachador(transporte, tamano_lote=4, espera_lote=0.2)
+
+    for n in avisos(10):
+        d.encolar(n)
+    d.detener(timeout=5)
+
+    assert d.enviadas == 10 and d.pendientes == 0
+    assert [r["cuerpo"] for r in leer(ruta)] == [f"Aviso {i}" for i in range(10)]
+    assert transporte.intentos == 3
+
+
+def test_reintenta_el_lote_que_falla(tmp_path):
+    ruta = tmp_path / "avisos.jsonl"
+    transporte = TransporteFalla(str(ruta), fallos=2)
+    d = despachador(transporte, max_reintentos=3)
+
+    for n in avisos(3):
+        d.encolar(n)
+    d.detener(timeout=5)
+
+    assert transporte.intentos == 3
+    assert d.enviadas == 3 and d.fallidas == []
+    assert len(leer(ruta)) == 3
+
+
+def test_agotados_los_reintentos_el_lote_queda_fallido(tmp_path):
+    transporte = TransporteFalla(str(tmp_path / "avisos.jsonl"), fallos=100)
+    d = despachador(transporte, max_reintentos=2)
+
+    lote = avisos(2)
+    for n in lote:
+        d.encolar(n)
+    d.detener(timeout=5)
+
+    assert transporte.intentos == 3  # el envío original y dos reintentos
+    assert d.enviadas == 0 and d.pendientes == 0
+    assert [n.correo for n in d.fallidas] == [n.correo for n in lote]
+
+
+def test_un_lote_en_espera_no_frena_los_avisos_nuevos(tmp_path):
+    ruta = tmp_path / "avisos.jsonl"
+    transporte = TransporteFalla(str(ruta), fallos=1)
+    # El reintento tarda mucho más que la entrega de lo que llega después.
+    d = despachador(transporte, espera_reintento=0.5)
+
+    primero, segundo = avisos(2)
+    d.encolar(primero)
+    while transporte.intentos == 0:
+        time.sleep(0.001)
+    d.encolar(segundo)
+    d.detener(timeout=5)
+
+    assert [r["para"] for r in leer(ruta)] == [segundo.correo, primero.correo]
+    assert d.enviadas == 2
@@ -0,0 +1,93 @@
+import io
+import os
+
+import pytest
+
+import portadas
+from models import Libro, Revista
+from portadas import AlmacenPortadas
+
+
+def libro(titulo="Cálculo Avanzado", portada_url=""):
+    return Libro(1, titulo, "Ana <Núñez>", 2024, "", portada_url, "Ed", "Ciencias", 1)
+
+
+def imagen_png(color="red", medidas=(600, 900)):
+    # Ingerir necesita Pillow; las portadas generadas, no.
+    Image = pytest.importorskip("PIL.Image")
+    salida = io.BytesIO()
+    Image.new("RGB", medidas, color).save(salida, "PNG")
+    return salida.getvalue()
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    # Sin espera entre revisiones de origenes.json.
+    monkeypatch.setattr(portadas, "INTERVALO_REVISION", 0)
+    return AlmacenPortadas(str(tmp_path))
+
+
+def test_portada_generada_por_contenido(almacen, tmp_path):
+    nombre = almacen.nombre_archivo(libro())
+
+    assert nombre.endswith(".svg")
+    assert almacen.nombre_archivo(libro(), "miniatura") == nombre
+    svg = (tmp_path / nombre).read_text()
+    assert "Ana &lt;Núñez&gt;" in svg
+    assert almacen.nombre_archivo(libro("Otro título")) != nombre
+    revista = Revista(2, "Cálculo Avanzado", "Ana <Núñez>", 2024, "", "", 1, "X", 1)
+    assert almacen.nombre_archivo(revista) != nombre  # otro color por tipo
+
+
+def test_ingerir_reduce_y_nombra_por_hash(almacen, tmp_path):
+    datos = imagen_png()
+
+    digesto = almacen.ingerir(datos, origen="https://ejemplo.org/a.png")
+
+    for tamano, medidas in portadas.TAMANOS.items():
+        with portadas.Image.open(tmp_path / f"{digesto}-{tamano}.jpg") as imagen:
+            assert imagen.size == medidas
+    con_origen = libro(portada_url="https://ejemplo.org/a.png")
+    miniatura = almacen.nombre_archivo(con_origen, "miniatura")
+    assert miniatura == f"{digesto}-miniatura.jpg"
+    assert almacen.tiene_origen("https://ejemplo.org/a.png")
+
+    # El mismo contenido no se vuelve a codificar.
+    ruta = tmp_path / f"{digesto}-portada.jpg"
+    os.utime(ruta, (0, 0))
+    assert almacen.ingerir(datos) == digesto
+    assert os.stat(ruta).st_mtime == 0
+    assert almacen.ingerir(imagen_png("blue")) != digesto
+
+
+def test_ruta_local_de_una_subida(almacen):
+    digesto = almacen.ingerir(imagen_png())
+    subida = libro(portada_url=almacen.url_local(digesto))
+
+    assert almacen.nombre_archivo(subida) == f"{digesto}-portada.jpg"
+    assert almacen.nombre_archivo(subida, "miniatura") == f"{digesto}-miniatura.jpg"
+
+
+def test_otro_proceso_ve_los_origenes_nuevos(almacen, tmp_path):
+    otro = AlmacenPortadas(str(tmp_path))
+    version = otro.version
+
+    digesto = almacen.ingerir(imagen_png(), origen="https://ejemplo.org/b.png")
+
+    assert otro.version > version
+    con_origen = libro(portada_url="https://ejemplo.org/b.png")
+    assert otro.nombre_archivo(con_origen) == f"{digesto}-portada.jpg"
+
+
+def test_ruta_de_portadas_con_cache_de_un_ano(entrar):
+    cliente, _ = entrar("Estudiante")
+    datos = cliente.get("/api/catalogo/buscar?titulo=python&campos=portada")
+    (resultado,) = datos.get_json()["resultados"]
+
+    respuesta = cliente.get(resultado["portada"])
+
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == "image/svg+xml"
+    cache = respuesta.cache_control
+    assert cache.public and cache.immutable and cache.max_age == 365 * 24 * 3600
+    assert cliente.get("/portadas/no-existe.jpg").status_code == 404
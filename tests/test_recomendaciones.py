@@ -0,0 +1,305 @@
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from models import Biblioteca, Estudiante, Libro
+from recomendaciones import (
+    ARCHIVO_ACTUAL,
+    FiltroColaborativo,
+    IndiceVecinos,
+    Recomendador,
+    _limpiar_artefactos_antiguos,
+    _publicar_version,
+    cargar_artefactos,
+    construir_artefactos,
+    guardar_artefactos,
+    mezclar_recomendaciones,
+    reducir_lsa,
+    suma_verificacion,
+)
+
+# Tres temas con vocabulario propio: los vecinos de un documento deben
+# salir de su mismo tema.
+TEMAS = {
+    "python": "python programming code functions variables loops",
+    "calculo": "calculus integrals derivatives limits series",
+    "medicina": "medicine diagnosis patients clinical treatment",
+}
+
+
+def documentos_sinteticos(por_tema=12):
+    documentos, ids, temas = [], [], []
+    for t, (tema, vocabulario) in enumerate(TEMAS.items()):
+        palabras = vocabulario.split()
+        for i in range(por_tema):
+            # Cada documento combina las palabras del tema en otro orden.
+            rotadas = palabras[i % len(palabras) :] + palabras[: i % len(palabras)]
+            documentos.append(" ".join(rotadas[:4] + [f"{tema}{i}"]))
+            ids.append(1000 * (t + 1) + i)
+            temas.append(tema)
+    return documentos, ids, temas
+
+
+# --- Embeddings LSA e índice de vecinos aproximados ---
+def test_reducir_lsa_devuelve_vectores_unitarios():
+    documentos, _, _ = documentos_sinteticos()
+    matriz = construir_artefactos(documentos, list(range(len(documentos)))).matriz
+
+    embeddings = reducir_lsa(matriz, dimensiones=8)
+
+    assert embeddings.shape == (len(documentos), 8)
+    assert embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+    assert reducir_lsa(matriz[:2], dimensiones=8) is None
+
+
+def test_indice_ivf_con_todas_las_listas_es_exacto():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(200, 16)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = np.arange(5000, 5200)
+    indice = IndiceVecinos.construir(embeddings, ids, n_listas=10)
+
+    exactos = embeddings @ embeddings[7]
+    exactos[7] = -np.inf
+    esperados = [int(ids[i]) for i in np.argsort(-exactos)[:5]]
+
+    obtenidos = indice.vecinos(5007, k=5, n_sondeos=10)
+    assert [i for i, _ in obtenidos] == esperados
+    assert 5007 not in [i for i, _ in indice.vecinos(5007, k=5, n_sondeos=2)]
+    assert indice.vecinos(1, k=5) == []
+
+
+def test_indice_ivf_se_guarda_y_carga_con_mmap(tmp_path):
+    documentos, ids, _ = documentos_sinteticos()
+    indice = construir_artefactos(documentos, ids, usar_embeddings=True).indice_ann
+
+    indice.guardar(str(tmp_path))
+    cargado = IndiceVecinos.cargar(str(tmp_path))
+
+    assert cargado.vecinos(ids[0], k=3) == indice.vecinos(ids[0], k=3)
+    assert IndiceVecinos.cargar(str(tmp_path / "vacio")) is None
+
+
+def test_vecinos_aproximados_del_mismo_tema():
+    documentos, ids, temas = documentos_sinteticos()
+    tema_por_id = dict(zip(ids, temas))
+    con_ann = Recomendador().con_artefactos(
+        construir_artefactos(documentos, ids, usar_embeddings=True)
+    )
+    exacto = Recomendador().con_artefactos(construir_artefactos(documentos, ids))
+
+    for material_id in ids[::5]:
+        vecinos = con_ann.vecinos_aproximados(material_id, k=3)
+        assert len(vecinos) == 3
+        assert all(tema_por_id[v] == tema_por_id[material_id] for v, _ in vecinos)
+    # Sin embeddings se usa la tabla exacta.
+    assert exacto.vecinos_aproximados(ids[0]) == exacto.vecinos_contenido(ids[0])
+
+
+# --- Artefactos persistidos (arranque en caliente) ---
+def test_artefactos_guardados_se_cargan_iguales(tmp_path):
+    documentos, ids, _ = documentos_sinteticos()
+    artefactos = construir_artefactos(documentos, ids)
+    suma = suma_verificacion(ids, documentos)
+
+    guardar_artefactos(artefactos, str(tmp_path), suma)
+    cargados = cargar_artefactos(str(tmp_path), suma)
+
+    assert (tmp_path / ARCHIVO_ACTUAL).read_text() == suma
+    assert list(cargados.ids) == ids
+    assert np.array_equal(cargados.vecinos, artefactos.vecinos)
+    assert (cargados.matriz != artefactos.matriz).nnz == 0
+    consulta = ["calculus integrals"]
+    assert (
+        cargados.vectorizador.transform(consulta)
+        != artefactos.vectorizador.transform(consulta)
+    ).nnz == 0
+
+
+def test_suma_depende_del_catalogo_y_los_parametros():
+    documentos, ids, _ = documentos_sinteticos()
+    suma = suma_verificacion(ids, documentos)
+
+    assert suma_verificacion(ids, documentos) == suma
+    assert suma_verificacion(ids, documentos[:-1] + ["otro"]) != suma
+    assert suma_verificacion(ids, documentos, usar_embeddings=True) != suma
+
+
+def test_version_ausente_o_incompleta_no_se_carga(tmp_path):
+    documentos, ids, _ = documentos_sinteticos()
+    suma = suma_verificacion(ids, documentos)
+    assert cargar_artefactos(str(tmp_path), suma) is None
+
+    guardar_artefactos(construir_artefactos(documentos, ids), str(tmp_path), suma)
+    (tmp_path / suma / "vecinos.npy").unlink()
+    assert cargar_artefactos(str(tmp_path), suma) is None
+
+
+def test_guardar_limpia_las_versiones_antiguas(tmp_path):
+    documentos, ids, _ = documentos_sinteticos(por_tema=4)
+    sumas = []
+    for n in range(4):
+        variante = documentos[:-1] + [f"documento {n}"]
+        suma = suma_verificacion(ids, variante)
+        guardar_artefactos(construir_artefactos(variante, ids), str(tmp_path), suma)
+        os.utime(tmp_path / suma, (n, n))
+        sumas.append(suma)
+
+    assert {p.name for p in tmp_path.iterdir() if p.is_dir()} == set(sumas[-2:])
+    assert (tmp_path / ARCHIVO_ACTUAL).read_text() == sumas[-1]
+
+
+def test_limpieza_nunca_borra_la_version_publicada(tmp_path):
+    # Otro worker publicó una versión vieja entre el guardado y la limpieza.
+    for n, nombre in enumerate(["a", "b", "c", "d"]):
+        (tmp_path / nombre).mkdir()
+        os.utime(tmp_path / nombre, (n, n))
+    _publicar_version(str(tmp_path), "a")
+
+    _limpiar_artefactos_antiguos(str(tmp_path))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [ARCHIVO_ACTUAL, "a", "c", "d"]
+
+
+def test_arranque_en_caliente_no_reentrena(app_modulo, monkeypatch):
+    app_modulo.reconstruir_recomendaciones()
+
+    def reentrenar(*argumentos, **opciones):
+        raise AssertionError("los artefactos de disco no se usaron")
+
+    monkeypatch.setattr(app_modulo, "construir_artefactos", reentrenar)
+    version = app_modulo.recomendador.version
+    app_modulo.reconstruir_recomendaciones()
+    assert app_modulo.recomendador.version == version + 1
+    assert app_modulo.recomendador.vecinos_contenido(101)
+
+
+# --- Filtro colaborativo ---
+def test_quienes_pidieron_esto_tambien_pidieron():
+    pares = [
+        (1, 10), (1, 20),
+        (2, 10), (2, 20), (2, 30),
+        (3, 30), (3, 40),
+        (1, 10), (1, 10),  # pedir de nuevo no suma
+    ]  # fmt: skip
+    filtro = FiltroColaborativo.construir(iter(pares))
+
+    assert len(filtro) == 4
+    vecinos = filtro.vecinos(10, k=3)
+    assert [i for i, _ in vecinos] == [20, 30]
+    assert vecinos[0][1] == pytest.approx(1.0)
+    assert vecinos[1][1] == pytest.approx(1 / np.sqrt(2 * 2))
+    assert [i for i, _ in filtro.vecinos(40, k=3)] == [30]
+    assert filtro.vecinos(99) == []
+
+
+def test_filtro_sin_prestamos():
+    filtro = FiltroColaborativo.construir([])
+    assert len(filtro) == 0
+    assert filtro.vecinos(10) == []
+    assert Recomendador().vecinos_colaborativos(10) == []
+
+
+def test_mezcla_ponderada():
+    contenido = [(1, 0.9), (2, 0.5)]
+    colaborativo = [(2, 0.8), (3, 0.6)]
+
+    assert mezclar_recomendaciones(contenido, colaborativo, 0.5, k=3) == [2, 1, 3]
+    assert mezclar_recomendaciones(contenido, colaborativo, 0.0, k=2) == [1, 2]
+    assert mezclar_recomendaciones(contenido, colaborativo, 1.0, k=1) == [2]
+
+
+def test_version_de_prestamos_solo_sube_con_prestamos_nuevos():
+    biblioteca = Biblioteca()
+    material = Libro(1, "Libro", "Autor", 2024, "", "", "Ed", "Ciencias", 2)
+    biblioteca.agregar_material(material)
+    usuario = Estudiante(1, "E1", "e1@uni.edu", "Ing", 1)
+    biblioteca.agregar_usuario(usuario)
+    hoy = date(2026, 3, 2)
+
+    version = biblioteca.version_prestamos
+    biblioteca.realizar_prestamo(usuario, material, hoy)
+    assert biblioteca.version_prestamos == version + 1
+    prestamo = usuario.prestamos[-1]
+    prestamo.realizar_renovacion(hoy)
+    prestamo.devolver(hoy)
+    assert biblioteca.version_prestamos == version + 1
+
+
+def test_reconstruir_colaborativo_desde_el_historial(app_modulo):
+    biblioteca = app_modulo.biblioteca
+    for usuario_id in (1, 2):
+        biblioteca.realizar_prestamos_lote(
+            biblioteca.buscar_usuario_por_id(usuario_id),
+            [biblioteca.buscar_material_por_id(102)],
+            date.today(),
+        )
+
+    app_modulo.reconstruir_colaborativo()
+
+    vecinos = dict(app_modulo.recomendador.vecinos_colaborativos(102))
+    # Ana (101, 103) y el Dr. Pérez (104) pidieron también la revista.
+    assert set(vecinos) == {101, 103, 104}
+    assert app_modulo.hilo_colaborativo is None  # desactivado en las pruebas
+
+
+# --- "Para ti" en caché por usuario ---
+def contar_calculos(app_modulo, monkeypatch):
+    llamadas = []
+    original = app_modulo._calcular_para_ti
+
+    def calcular(usuario, modelo):
+        llamadas.append(usuario.id)
+        return original(usuario, modelo)
+
+    monkeypatch.setattr(app_modulo, "_calcular_para_ti", calcular)
+    return llamadas
+
+
+def test_para_ti_se_recalcula_solo_si_el_usuario_cambia(app_modulo, monkeypatch):
+    llamadas = contar_calculos(app_modulo, monkeypatch)
+    biblioteca = app_modulo.biblioteca
+    ana = biblioteca.buscar_usuario_por_id(1)
+
+    primera = app_modulo.recomendaciones_para_ti(ana)
+    assert app_modulo.recomendaciones_para_ti(ana) == primera
+    assert llamadas == [1]
+    # Lo que ya pidió no se le recomienda.
+    assert not {101, 103} & {m.id for m in primera}
+
+    revista = biblioteca.buscar_material_por_id(102)
+    biblioteca.realizar_prestamo(ana, revista, date.today())
+    despues = app_modulo.recomendaciones_para_ti(ana)
+    assert llamadas == [1, 1]
+    assert 102 not in [m.id for m in despues]
+
+
+def test_para_ti_por_usuario_y_version_del_modelo(app_modulo, monkeypatch):
+    llamadas = contar_calculos(app_modulo, monkeypatch)
+    ana, perez = (app_modulo.biblioteca.buscar_usuario_por_id(i) for i in (1, 2))
+
+    app_modulo.recomendaciones_para_ti(ana)
+    app_modulo.recomendaciones_para_ti(perez)
+    app_modulo.recomendaciones_para_ti(perez)
+    assert llamadas == [1, 2]
+
+    app_modulo.reconstruir_colaborativo()
+    app_modulo.recomendaciones_para_ti(ana)
+    assert llamadas == [1, 2, 1]
+
+
+def test_buscar_por_materia_usa_el_indice():
+    biblioteca = Biblioteca()
+    for i, materia in enumerate(["Matemáticas", "Ciencias", "matematicas"], start=1):
+        biblioteca.agregar_material(
+            Libro(i, f"Libro {i}", "Autor", 2024, "", "", "Ed", materia, 1)
+        )
+    catalogo = biblioteca.catalogo
+
+    assert [m.id for m in catalogo.buscar_por_materia("MATEMÁTICAS")] == [1, 3]
+    assert catalogo.buscar_por_materia("Historia") == []
+    biblioteca.retirar_material(1)
+    assert [m.id for m in catalogo.buscar_por_materia("matemáticas")] == [3]
@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+from models import (
+    Biblioteca,
+    Estudiante,
+    IndiceVencimientos,
+    Libro,
+    PrestamoActivo,
+    PrestamoVencido,
+    Profesor,
+)
+from recordatorios import agrupar_por_usuario, enviar_recordatorios
+
+HOY = date(2026, 3, 2)
+
+
+class DespachadorEnMemoria:
+    def __init__(self):
+        self.avisos = []
+
+    def encolar(self, notificacion):
+        self.avisos.append(notificacion)
+
+
+def crear_biblioteca():
+    biblioteca = Biblioteca()
+    libros = [
+        Libro(i, f"Libro {i}", "Autor", 2024, "", "", "Ed", "Ciencias", 5)
+        for i in (1, 2, 3)
+    ]
+    for libro in libros:
+        biblioteca.agregar_material(libro)
+    ana = Estudiante(1, "Ana", "ana@uni.edu", "Ing", 1)
+    luis = Estudiante(2, "Luis", "luis@uni.edu", "Ing", 1)
+    pedro = Profesor(3, "Pedro", "pedro@uni.edu", "Física", "Tiempo Completo")
+    for u in (ana, luis, pedro):
+        biblioteca.agregar_usuario(u)
+    return biblioteca, libros, (ana, luis, pedro)
+
+
+# --- Índice de vencimientos ---
+def test_vencen_hasta_ordenado_y_sin_devueltos():
+    biblioteca, (l1, l2, l3), (ana, luis, pedro) = crear_biblioteca()
+    # Estudiantes: 15 días; profesores: 90.
+    biblioteca.realizar_prestamo(ana, l1, HOY - timedelta(days=20))
+    biblioteca.realizar_prestamo(luis, l2, HOY - timedelta(days=13))
+    biblioteca.realizar_prestamo(pedro, l3, HOY)
+    atrasado, por_vencer, lejano = (u.prestamos[-1] for u in (ana, luis, pedro))
+
+    assert biblioteca.prestamos_por_vencer(HOY) == [atrasado]
+    assert biblioteca.prestamos_por_vencer(HOY + timedelta(days=3)) == [
+        atrasado,
+        por_vencer,
+    ]
+    assert lejano not in biblioteca.prestamos_por_vencer(HOY + timedelta(days=89))
+
+    atrasado.devolver(HOY)
+    assert biblioteca.prestamos_por_vencer(HOY + timedelta(days=3)) == [por_vencer]
+
+
+def test_una_renovacion_mueve_el_prestamo_de_dia():
+    indice = IndiceVencimientos()
+    biblioteca, (libro, _, _), (ana, _, _) = crear_biblioteca()
+    biblioteca.realizar_prestamo(ana, libro, HOY)
+    prestamo = ana.prestamos[-1]
+    indice.agregar(prestamo)
+    vence = prestamo.fecha_vencimiento
+
+    assert prestamo.realizar_renovacion(HOY)[0]
+    indice.agregar(prestamo)
+
+    assert indice.vencen_hasta(vence) == []
+    assert len(indice) == 1  # la entrada vieja se descartó al consultar
+    assert indice.vencen_hasta(prestamo.fecha_vencimiento) == [prestamo]
+
+
+# --- Recordatorios agrupados por usuario ---
+def test_un_aviso_por_usuario_con_vencidos_y_por_vencer():
+    biblioteca, (l1, l2, l3), (ana, luis, pedro) = crear_biblioteca()
+    biblioteca.realizar_prestamo(ana, l1, HOY - timedelta(days=20))
+    biblioteca.realizar_prestamo(ana, l2, HOY - timedelta(days=14))
+    biblioteca.realizar_prestamo(luis, l3, HOY - timedelta(days=14))
+    biblioteca.realizar_prestamo(pedro, l3, HOY)
+
+    grupos = agrupar_por_usuario(biblioteca, HOY)
+    assert {u.id: len(p) for u, p in grupos.items()} == {1: 2, 2: 1}
+
+    despachador = DespachadorEnMemoria()
+    assert enviar_recordatorios(biblioteca, despachador, HOY) == 2
+    avisos = {n.correo: n for n in despachador.avisos}
+    assert avisos["ana@uni.edu"].asunto == "Tienes 1 préstamo(s) vencido(s)"
+    assert "5 día(s) de retraso" in avisos["ana@uni.edu"].cuerpo
+    assert "'Libro 2': vence el 03-03-2026" in avisos["ana@uni.edu"].cuerpo
+    assert avisos["luis@uni.edu"].asunto == "1 préstamo(s) por vencer"
+
+
+def test_vencer_atrasados_desde_el_indice(app_modulo, monkeypatch):
+    biblioteca = app_modulo.biblioteca
+    ana = biblioteca.buscar_usuario_por_id(1)
+    atrasado = next(p for p in ana.prestamos if p.material.id == 103)
+    assert isinstance(atrasado.estado, PrestamoActivo)
+    vencimientos = biblioteca.resumenes.totales.vencimientos
+
+    assert app_modulo.vencer_atrasados(date.today()) == 1
+    assert isinstance(atrasado.estado, PrestamoVencido)
+    assert biblioteca.resumenes.totales.vencimientos == vencimientos + 1
+
+    # Sin atrasados no se ejecuta ninguna operación.
+    def no_ejecutar(*argumentos):
+        raise AssertionError("no debía tomar el lock de escritura")
+
+    monkeypatch.setattr(app_modulo, "ejecutar_operacion", no_ejecutar)
+    assert app_modulo.vencer_atrasados(date.today()) == 0
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from models import Estudiante, Libro, Resena
+
+HOY = date(2026, 3, 2)
+
+
+def crear_material(n=12):
+    material = Libro(1, "Libro", "Autor", 2024, "", "", "Ed", "Ciencias", 1)
+    lectores = [Estudiante(i, f"E{i}", f"e{i}@uni.edu", "Ing", 1) for i in range(n)]
+    for i, lector in enumerate(lectores):
+        resena = Resena(lector, 1 + i % 5, f"Reseña {i}", HOY + timedelta(days=i))
+        material.agregar_resena(resena)
+    return material, lectores
+
+
+def recorrer(material, orden, limite):
+    paginas, despues = [], None
+    while True:
+        pagina = material.resenas_pagina(orden, despues, limite)
+        if not pagina:
+            return paginas
+        paginas.append([i for i, _ in pagina])
+        despues = material.clave_resena(orden, pagina[-1][0])
+
+
+def test_recientes_por_cursor():
+    material, _ = crear_material()
+
+    paginas = recorrer(material, "recientes", limite=5)
+
+    assert paginas == [[11, 10, 9, 8, 7], [6, 5, 4, 3, 2], [1, 0]]
+
+
+def test_una_resena_nueva_no_desplaza_la_pagina_siguiente():
+    material, lectores = crear_material()
+    primera = material.resenas_pagina("recientes", None, 5)
+    despues = material.clave_resena("recientes", primera[-1][0])
+
+    material.agregar_resena(Resena(lectores[0], 5, "Nueva", HOY))
+
+    segunda = material.resenas_pagina("recientes", despues, 5)
+    assert [i for i, _ in segunda] == [6, 5, 4, 3, 2]
+
+
+def test_utiles_por_votos_fecha_e_indice():
+    material, lectores = crear_material()
+    resenas = material.resenas
+    for votante in lectores[:3]:
+        resenas[2].marcar_util(votante)
+    resenas[7].marcar_util(lectores[0])
+    assert not resenas[7].marcar_util(lectores[0])  # un voto por usuario
+    assert not resenas[7].marcar_util(lectores[7])  # ni a la propia
+
+    paginas = recorrer(material, "utiles", limite=4)
+
+    assert paginas[0] == [2, 7, 11, 10]
+    assert sum(paginas, []) == [2, 7, 11, 10, 9, 8, 6, 5, 4, 3, 1, 0]
+
+
+def test_histograma_y_promedio():
+    material, _ = crear_material(n=7)  # calificaciones 1..5, 1, 2
+
+    assert material.histograma_calificaciones == {5: 1, 4: 1, 3: 1, 2: 2, 1: 2}
+    assert material.promedio_calificacion == 2.6
+
+
+def test_api_de_resenas_con_cursor(entrar):
+    cliente, _ = entrar("Profesor")
+    url = "/api/materiales/101/resenas?limite=1"
+
+    primera = cliente.get(url).get_json()
+    assert primera["total"] == 2
+    assert primera["histograma"] == {"5": 1, "4": 1, "3": 0, "2": 0, "1": 0}
+    assert [r["comentario"] for r in primera["resultados"]] == ["Muy bueno."]
+    assert primera["siguiente_cursor"] == "1"
+    segunda = cliente.get(f"{url}&cursor=1").get_json()
+    assert [r["id"] for r in segunda["resultados"]] == [0]
+    assert segunda["siguiente_cursor"] is None
+    # Un cursor ilegible vuelve a la primera página.
+    assert cliente.get(f"{url}&cursor=x-1").get_json() == primera
+
+    cliente.post("/resenas/101/1/util", data={"orden_resenas": "utiles"})
+    utiles = cliente.get(f"{url}&orden=utiles").get_json()
+    (resena,) = utiles["resultados"]
+    assert (resena["id"], resena["votos_utiles"]) == (1, 1)
+    votos, _, indice = utiles["siguiente_cursor"].split("-")
+    assert (votos, indice) == ("1", "1")
+    siguiente = cliente.get(f"{url}&orden=utiles&cursor={utiles['siguiente_cursor']}")
+    assert [r["id"] for r in siguiente.get_json()["resultados"]] == [0]
+
+
+def test_api_de_resenas_errores(entrar):
+    cliente, _ = entrar("Estudiante")
+
+    assert cliente.get("/api/materiales/999/resenas").status_code == 404
+    respuesta = cliente.get("/api/materiales/101/resenas?orden=peores")
+    assert respuesta.status_code == 400
+    assert "recientes, utiles" in respuesta.get_json()["error"]
+    anonimo = cliente.application.test_client()
+    assert anonimo.get("/api/materiales/101/resenas").status_code == 401
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+import pytest
+
+from models import Biblioteca, Estudiante, Libro, Profesor, Revista
+
+HOY = date(2026, 3, 2)
+
+
+def crear_biblioteca():
+    biblioteca = Biblioteca()
+    libro = Libro(1, "Libro", "Autor", 2024, "", "", "Ed", "Ciencias", 5)
+    revista = Revista(2, "Revista", "Varios", 2024, "", "", 3, "Historia", 5)
+    for m in (libro, revista):
+        biblioteca.agregar_material(m)
+    ana = Estudiante(1, "Ana", "ana@uni.edu", "Ing", 1)
+    pedro = Profesor(2, "Pedro", "pedro@uni.edu", "Física", "Tiempo Completo")
+    for u in (ana, pedro):
+        biblioteca.agregar_usuario(u)
+    return biblioteca, (libro, revista), (ana, pedro)
+
+
+def test_serie_diaria_con_desgloses_y_dias_sin_movimiento():
+    biblioteca, (libro, revista), (ana, pedro) = crear_biblioteca()
+    biblioteca.realizar_prestamo(ana, libro, HOY)
+    biblioteca.realizar_prestamo(pedro, revista, HOY)
+    biblioteca.realizar_prestamo(pedro, libro, HOY + timedelta(days=2))
+    assert ana.prestamos[-1].realizar_renovacion(HOY + timedelta(days=2))[0]
+    pedro.prestamos[0].devolver(HOY + timedelta(days=2))
+
+    resumenes = biblioteca.resumenes
+    serie = resumenes.serie(HOY, HOY + timedelta(days=2))
+
+    assert [f for f, _ in serie] == [HOY + timedelta(days=d) for d in range(3)]
+    (_, primero), (_, vacio), (_, tercero) = serie
+    assert primero.prestamos == 2
+    assert primero.por_tipo == {"Libro": 1, "Revista": 1}
+    assert primero.por_materia == {"Ciencias": 1, "Historia": 1}
+    assert primero.por_rol == {"Estudiante": 1, "Profesor": 1}
+    assert (vacio.prestamos, vacio.devoluciones) == (0, 0)
+    assert (tercero.prestamos, tercero.renovaciones, tercero.devoluciones) == (1, 1, 1)
+    assert resumenes.totales.prestamos == 3
+    assert resumenes.abiertos == 2
+
+
+@pytest.mark.parametrize("marcado_antes", [True, False])
+def test_devolucion_tardia_cuenta_un_vencimiento(marcado_antes):
+    biblioteca, (libro, _), (ana, _) = crear_biblioteca()
+    biblioteca.realizar_prestamo(ana, libro, HOY)
+    prestamo = ana.prestamos[-1]
+    devolucion = prestamo.fecha_vencimiento + timedelta(days=4)
+    if marcado_antes:
+        assert prestamo.marcar_vencido(devolucion)
+    multa = prestamo.calcular_multa(devolucion)
+
+    prestamo.devolver(devolucion)
+
+    resumenes = biblioteca.resumenes
+    assert resumenes.totales.vencimientos == 1
+    # Se cuenta el día en que venció, no el de la devolución.
+    ((_, dia),) = resumenes.serie(
+        prestamo.fecha_vencimiento + timedelta(days=1),
+        prestamo.fecha_vencimiento + timedelta(days=1),
+    )
+    assert dia.vencimientos == 1
+    assert resumenes.totales.multas == pytest.approx(multa) and multa > 0
+    assert resumenes.abiertos == 0
+
+
+def test_devolucion_a_tiempo_no_cuenta_vencimiento():
+    biblioteca, (libro, _), (ana, _) = crear_biblioteca()
+    biblioteca.realizar_prestamo(ana, libro, HOY)
+    prestamo = ana.prestamos[-1]
+
+    prestamo.devolver(prestamo.fecha_vencimiento)
+
+    assert biblioteca.resumenes.totales.vencimientos == 0
+    assert biblioteca.resumenes.totales.multas == 0
+
+
+def test_api_de_resumen(entrar):
+    cliente, _ = entrar("Administrativo")
+
+    datos = cliente.get("/api/circulacion/resumen?dias=7").get_json()
+    assert len(datos["dias"]) == 7
+    assert datos["hasta"] == date.today().isoformat()
+    assert datos["dias"][-1]["fecha"] == datos["hasta"]
+    assert sum(d["prestamos"] for d in datos["dias"]) >= 1  # Ana, hace 5 días
+
+    cliente, _ = entrar("Estudiante")
+    assert cliente.get("/api/circulacion/resumen").status_code == 403